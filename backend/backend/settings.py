@@ -46,6 +46,9 @@ INSTALLED_APPS = [
     'recipes.apps.RecipesConfig',
     'ingredients.apps.IngredientsConfig',
     'follows.apps.FollowsConfig',
+    'images.apps.ImagesConfig',
+    'benchmarks.apps.BenchmarksConfig',
+    'monitoring.apps.MonitoringConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -59,6 +62,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,14 +96,48 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Подключение через PgBouncer (infra/docker-compose.pgbouncer.yml)
+# в режиме пулинга транзакций. Между транзакциями соединение с сервером
+# может смениться, поэтому серверные курсоры (QuerySet.iterator())
+# вне транзакции не работают и отключаются
+DB_PGBOUNCER = os.getenv('DB_PGBOUNCER', '') == '1'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': os.getenv('POSTGRES_DB'),
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
-        'HOST': 'db',
+        # Хост по умолчанию - сервис из infra/docker-compose.yml,
+        # вне Docker (например, в CI) он задается в POSTGRES_HOST
+        'HOST': os.getenv(
+            'POSTGRES_HOST', 'pgbouncer' if DB_PGBOUNCER else 'db',
+        ),
         'PORT': os.getenv('DB_PORT'),
+        # Время жизни постоянных соединений в секундах. Под ASGI
+        # синхронный код каждого запроса выполняется в новом потоке
+        # и постоянные соединения не переиспользуются, поэтому
+        # по умолчанию они выключены, а соединения с сервером
+        # переиспользует PgBouncer. Имеет смысл под WSGI
+        # и для потоков process_images
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0')),
+        # Проверка постоянного соединения перед первым запросом
+        # к БД в очередном запросе к API
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': DB_PGBOUNCER,
+    }
+}
+
+# При нескольких процессах-обработчиках нужен общий кеш
+# (например, CACHE_BACKEND=django.core.cache.backends.redis.RedisCache),
+# иначе сброс закешированных данных виден только одному процессу
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
@@ -131,6 +169,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'monitoring.renderers.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
@@ -140,6 +182,94 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 2,
 }
 
+# Поиск ингредиентов по началу названия: максимальное число результатов
+# (None - без ограничения) и время жизни индекса в памяти в секундах
+INGREDIENT_SEARCH_LIMIT = 50
+INGREDIENT_SEARCH_INDEX_TTL = 300
+
+# Подбор рецептов по ингредиентам: максимальное число подобранных
+# рецептов и время жизни индекса в памяти в секундах
+RECIPE_MATCH_LIMIT = 1000
+RECIPE_MATCH_INDEX_TTL = 300
+
+# Число потоков, в которых декодируются и сохраняются картинки
+# при импорте рецептов и читаются картинки при экспорте
+RECIPE_IMPORT_WORKERS = 4
+
+# Время хранения закешированных ответов рецептов в секундах
+RECIPE_DETAIL_CACHE_TIMEOUT = 60 * 60
+
+# Лента подписок: первые RECIPE_FEED_CACHED_PAGES страниц кешируются
+# для каждого пользователя на RECIPE_FEED_CACHE_TIMEOUT секунд.
+# Изменения автора сбрасывают одно его поколение, которое ленты
+# подписчиков проверяют при чтении
+RECIPE_FEED_CACHED_PAGES = 3
+RECIPE_FEED_CACHE_TIMEOUT = 5 * 60
+
+# Ограничения загружаемых изображений: размер файла в байтах (совпадает
+# с client_max_body_size в nginx), число пикселей и размер, после которого
+# декодируемый файл хранится на диске, а не в памяти
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_UPLOAD_MAX_PIXELS = 40 * 1000 * 1000
+IMAGE_UPLOAD_SPOOL_SIZE = 1024 * 1024
+
+# Уменьшенные копии изображений рецептов и аватаров: ширина каждого
+# размера в пикселях, форматы (используются только поддерживаемые Pillow)
+# и качество. Копии строит команда process_images в IMAGE_WORKERS потоков,
+# задача повторяется до IMAGE_JOB_MAX_ATTEMPTS раз и возвращается
+# в очередь, если не завершилась за IMAGE_JOB_TIMEOUT секунд
+IMAGE_RENDITION_SIZES = {
+    'thumbnail': 160,
+    'card': 480,
+    'full': 1200,
+}
+IMAGE_RENDITION_FORMATS = ('avif', 'webp')
+IMAGE_RENDITION_QUALITY = 80
+IMAGE_WORKERS = 2
+IMAGE_WORKER_POLL_INTERVAL = 2
+IMAGE_JOB_MAX_ATTEMPTS = 3
+IMAGE_JOB_TIMEOUT = 10 * 60
+
+# Для таблиц без фильтрации с числом строк не меньше порога поле count
+# в пагинации берется из оценки (reltuples в PostgreSQL) или из кеша,
+# время хранения которого задается в секундах
+PAGINATION_ESTIMATED_COUNT_THRESHOLD = 10000
+PAGINATION_COUNT_CACHE_TIMEOUT = 30
+
+# Замеры запросов: доля запросов (от 0 до 1), для которых считаются
+# число запросов к БД, время в БД и время отрисовки ответа, и добавление
+# этих замеров в заголовок Server-Timing. Гистограммы по маршрутам
+# отдаются по /metrics/ в формате Prometheus (nginx этот путь наружу
+# не проксирует) и ведутся отдельно в каждом процессе-обработчике
+REQUEST_METRICS_SAMPLE_RATE = float(
+    os.getenv('REQUEST_METRICS_SAMPLE_RATE', '0')
+)
+REQUEST_METRICS_SERVER_TIMING = (
+    os.getenv('REQUEST_METRICS_SERVER_TIMING', '') == '1'
+)
+# Пороги поиска проблем с запросами к БД в замеряемых запросах:
+# шаблон SQL, выполненный столько раз за запрос (N+1), и запрос,
+# выполнявшийся дольше стольких миллисекунд
+DUPLICATE_QUERY_THRESHOLD = int(os.getenv('DUPLICATE_QUERY_THRESHOLD', '5'))
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '100'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'monitoring': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
 }
@@ -163,6 +293,19 @@ USE_TZ = True
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Загруженные файлы называются по хешу содержимого и хранятся один раз.
+# Файлы без ссылок удаляет команда gc_media не раньше, чем через
+# MEDIA_GC_GRACE_PERIOD секунд после удаления последней ссылки
+STORAGES = {
+    'default': {
+        'BACKEND': 'images.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+MEDIA_GC_GRACE_PERIOD = 60 * 60
+
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'all_static'
 
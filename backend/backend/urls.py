@@ -18,11 +18,14 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from monitoring.views import metrics, query_findings
 from recipes.views import redirect_from_short_link
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics/', metrics, name='metrics'),
+    path('metrics/queries/', query_findings, name='query_findings'),
     path(
         's/<int:id>/',
         redirect_from_short_link,
@@ -0,0 +1,27 @@
+# Синтетические данные: пароль всех созданных пользователей,
+# размер порции при вставке, показатель распределения Ципфа
+# для популярности ингредиентов, авторов и рецептов
+# и размер картинки рецептов в пикселях
+DATASET_PASSWORD = 'synthetic-password'
+DATASET_BATCH_SIZE = 5000
+DATASET_ZIPF_EXPONENT = 1.1
+DATASET_IMAGE_SIZE = (64, 64)
+DATASET_USERNAME_PREFIX = 'synthetic'
+DATASET_AMOUNT_RANGE = (1, 500)
+DATASET_COOKING_TIME_RANGE = (1, 180)
+# Замеры: число прогревочных и измеряемых повторов каждого сценария,
+# допустимый относительный рост времени ответа и размера ответа
+# и абсолютный допуск по времени в миллисекундах, в пределах
+# которого рост считается шумом
+BENCHMARK_WARMUP = 2
+BENCHMARK_REPEAT = 20
+BENCHMARK_THRESHOLD = 0.25
+BENCHMARK_LATENCY_TOLERANCE_MS = 2.0
+BENCHMARK_BASELINE_FILE = 'benchmark_baseline.json'
+# Число рецептов в списке покупок читателя, от имени которого
+# выполняются сценарии, независимо от случайных данных
+BENCHMARK_READER_CART = 5
+# Замер подключений к БД: число повторов и CONN_MAX_AGE
+# для постоянных соединений
+BENCHMARK_CONNECTIONS_REPEAT = 200
+BENCHMARK_CONN_MAX_AGE = 60
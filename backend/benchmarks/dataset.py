@@ -0,0 +1,405 @@
+import csv
+import io
+import json
+import random
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count, F, JSONField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from PIL import Image
+
+from follows.models import Follow
+from images.models import MediaBlob
+from ingredients.models import Ingredient
+from ingredients.search import ingredient_index
+from recipes.matching import recipe_match_index
+from recipes.models import (
+    FavouriteUserRecipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Recipe,
+)
+from recipes.search import update_search_vectors
+from recipes.shopping_list import rebuild_shopping_lists
+from .constants import (
+    DATASET_COOKING_TIME_RANGE,
+    DATASET_USERNAME_PREFIX,
+    DATASET_AMOUNT_RANGE,
+    DATASET_ZIPF_EXPONENT,
+    DATASET_BATCH_SIZE,
+    DATASET_IMAGE_SIZE,
+    DATASET_PASSWORD,
+)
+
+User = get_user_model()
+
+INGREDIENTS_FILE = settings.BASE_DIR.parent / 'data' / 'ingredients.csv'
+
+DISHES = (
+    'Салат', 'Суп', 'Рагу', 'Пирог', 'Запеканка', 'Каша', 'Омлет',
+    'Паста', 'Плов', 'Соус', 'Смузи', 'Оладьи',
+)
+
+
+def image_bytes(size=DATASET_IMAGE_SIZE, color=(200, 120, 40)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def count_subquery(model, field):
+    """
+    Число строк model, ссылающихся полем field на текущую строку
+    """
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')},
+            ).order_by().values(
+                field,
+            ).annotate(
+                count=Count('pk'),
+            ).values('count'),
+        ),
+        0,
+    )
+
+
+def recount_counters():
+    """
+    Пересчет счетчиков пользователей и рецептов, которые при обычной
+    работе обновляются сигналами
+    """
+    User.objects.update(
+        recipes_count=count_subquery(Recipe, 'author'),
+        followers_count=count_subquery(Follow, 'following'),
+    )
+    Recipe.objects.update(
+        favorites_count=count_subquery(FavouriteUserRecipe, 'recipe'),
+        shopping_cart_count=count_subquery(ShoppingCart, 'recipe'),
+    )
+
+
+class ZipfSampler:
+    """
+    Выбор элементов с вероятностью, обратно пропорциональной рангу
+    элемента в степени exponent. Ранги раздаются элементам
+    в случайном порядке
+    """
+
+    def __init__(self, items, exponent, rng):
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cum_weights = list(accumulate(
+            rank ** -exponent for rank in range(1, len(self.items) + 1)
+        ))
+        self.random = rng
+
+    def choice(self):
+        return self.items[bisect_left(
+            self.cum_weights, self.random.random() * self.cum_weights[-1],
+        )]
+
+    def sample(self, count):
+        """
+        count различных элементов
+        """
+        count = min(count, len(self.items))
+        if count * 2 > len(self.items):
+            return self.random.sample(self.items, count)
+        chosen = {}
+        while len(chosen) < count:
+            chosen.update(dict.fromkeys(self.random.choices(
+                self.items,
+                cum_weights=self.cum_weights,
+                k=count - len(chosen),
+            )))
+        return list(chosen)
+
+
+def column_defaults(model, fields, prepare):
+    """
+    Значения по умолчанию для столбцов модели, не входящих в fields
+    (кроме первичного ключа), преобразованные функцией prepare(field, value)
+    """
+    now = timezone.now()
+    columns = {}
+    for field in model._meta.concrete_fields:
+        if field.primary_key or field.attname in fields:
+            continue
+        if getattr(field, 'auto_now', False) or getattr(
+            field, 'auto_now_add', False,
+        ):
+            value = now
+        elif field.has_default():
+            value = field.get_default()
+        else:
+            value = None
+        columns[field.column] = prepare(field, value)
+    return columns
+
+
+class InsertWriter:
+    """
+    Вставка строк через bulk_create, если нужны идентификаторы новых
+    строк, и одним INSERT с executemany - если не нужны: так строки
+    не превращаются в экземпляры моделей
+    """
+
+    def write(self, model, fields, rows, returning=False):
+        if returning:
+            return [
+                obj.pk for obj in model.objects.bulk_create(
+                    model(**dict(zip(fields, row))) for row in rows
+                )
+            ]
+        opts = model._meta
+        quote = connection.ops.quote_name
+        defaults = column_defaults(
+            model, fields,
+            lambda field, value: field.get_db_prep_save(value, connection),
+        )
+        columns = [opts.get_field(name).column for name in fields]
+        columns.extend(defaults)
+        values = list(defaults.values())
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {quote(opts.db_table)} '
+                f'({", ".join(quote(column) for column in columns)}) '
+                f'VALUES ({", ".join(["%s"] * len(columns))})',
+                [(*row, *values) for row in rows],
+            )
+
+
+def copy_value(field, value):
+    if isinstance(field, JSONField):
+        return json.dumps(value)
+    return value
+
+
+class CopyWriter:
+    """
+    Вставка строк через COPY (PostgreSQL). Идентификаторы новых строк
+    заранее берутся из последовательности таблицы, остальные поля
+    модели заполняются значениями по умолчанию
+    """
+
+    def write(self, model, fields, rows, returning=False):
+        opts = model._meta
+        quote = connection.ops.quote_name
+        defaults = column_defaults(model, fields, copy_value)
+        columns = [opts.get_field(name).column for name in fields]
+        columns.extend(defaults)
+        values = list(defaults.values())
+        ids = None
+        with connection.cursor() as cursor:
+            if returning:
+                cursor.execute(
+                    'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+                    'FROM generate_series(1, %s)',
+                    [opts.db_table, opts.pk.column, len(rows)],
+                )
+                ids = [pk for pk, in cursor.fetchall()]
+                columns.insert(0, opts.pk.column)
+                rows = [(pk, *row) for pk, row in zip(ids, rows)]
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow([*row, *values])
+            buffer.seek(0)
+            cursor.copy_expert(
+                f'COPY {quote(opts.db_table)} '
+                f'({", ".join(quote(column) for column in columns)}) '
+                'FROM STDIN WITH (FORMAT csv)',
+                buffer,
+            )
+        return ids
+
+
+class SyntheticDataset:
+    """
+    Генератор синтетических данных: пользователей, рецептов
+    с ингредиентами из таблицы Ingredient, подписок, избранного
+    и списков покупок.
+    Популярность ингредиентов, авторов и рецептов распределена по закону
+    Ципфа с показателем zipf: популярные ингредиенты чаще встречаются
+    в рецептах, популярные авторы чаще пишут рецепты и на них чаще
+    подписываются, популярные рецепты чаще добавляют в избранное
+    и списки покупок. Число подписок, рецептов в избранном и в списке
+    покупок у пользователя распределено экспоненциально со средними
+    follows, favorites и cart.
+    Данные вставляются порциями по batch_size строк через INSERT
+    или COPY (copy=True, только PostgreSQL) в обход сигналов, после чего
+    счетчики, списки покупок, поисковые векторы и индексы в памяти
+    пересчитываются целиком. При одинаковом seed создаются одинаковые
+    данные
+    """
+
+    def __init__(self, users, recipes, ingredients_per_recipe=8,
+                 follows=10, favorites=20, cart=5, seed=0,
+                 zipf=DATASET_ZIPF_EXPONENT, batch_size=DATASET_BATCH_SIZE,
+                 copy=False, progress=None):
+        self.users = users
+        self.recipes = recipes
+        self.ingredients_per_recipe = ingredients_per_recipe
+        self.follows = follows
+        self.favorites = favorites
+        self.cart = cart
+        self.zipf = zipf
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.writer = CopyWriter() if copy else InsertWriter()
+        self.progress = progress or (lambda message: None)
+        self.created = Counter()
+
+    def create(self, ingredients_file=INGREDIENTS_FILE):
+        if not Ingredient.objects.exists():
+            call_command('ingredients', str(ingredients_file),
+                         stdout=io.StringIO())
+        ingredients = dict(
+            Ingredient.objects.order_by('pk').values_list('pk', 'name')
+        )
+        with transaction.atomic():
+            user_ids = self.create_users()
+            authors = ZipfSampler(user_ids, self.zipf, self.random)
+            recipe_ids = self.create_recipes(
+                authors,
+                ZipfSampler(ingredients, self.zipf, self.random),
+                ingredients,
+            )
+            recipes = ZipfSampler(recipe_ids, self.zipf, self.random)
+            self.create_relations(Follow, 'following', user_ids, authors,
+                                  self.follows)
+            self.create_relations(FavouriteUserRecipe, 'recipe', user_ids,
+                                  recipes, self.favorites)
+            self.create_relations(ShoppingCart, 'recipe', user_ids,
+                                  recipes, self.cart)
+            self.progress('Пересчет счетчиков и списков покупок')
+            recount_counters()
+            rebuild_shopping_lists()
+            update_search_vectors(
+                Recipe.objects.filter(search_vector__isnull=True),
+            )
+        ingredient_index.invalidate()
+        recipe_match_index.invalidate()
+        return user_ids, recipe_ids
+
+    def batches(self, count):
+        for start in range(0, count, self.batch_size):
+            yield range(start, min(start + self.batch_size, count))
+
+    def write(self, model, fields, rows, returning=False):
+        ids = self.writer.write(model, fields, rows, returning)
+        self.created[model._meta.verbose_name_plural] += len(rows)
+        return ids
+
+    def create_users(self):
+        offset = User.objects.count()
+        password = make_password(DATASET_PASSWORD)
+        user_ids = []
+        for batch in self.batches(self.users):
+            user_ids.extend(self.write(
+                User,
+                ('username', 'email', 'first_name', 'last_name', 'password'),
+                [
+                    (
+                        f'{DATASET_USERNAME_PREFIX}{offset + index}',
+                        f'{DATASET_USERNAME_PREFIX}{offset + index}'
+                        '@example.com',
+                        'Имя',
+                        'Фамилия',
+                        password,
+                    )
+                    for index in batch
+                ],
+                returning=True,
+            ))
+        self.progress(f'Пользователей: {len(user_ids)}')
+        return user_ids
+
+    def create_recipes(self, authors, ingredients, names):
+        field = Recipe._meta.get_field('image')
+        image = field.storage.save(
+            field.generate_filename(None, 'synthetic.png'),
+            ContentFile(image_bytes()),
+        )
+        low = max(1, self.ingredients_per_recipe // 2)
+        high = max(low, self.ingredients_per_recipe * 3 // 2)
+        recipe_ids = []
+        for batch in self.batches(self.recipes):
+            recipes = []
+            compositions = []
+            for _ in batch:
+                composition = ingredients.sample(
+                    self.random.randint(low, high),
+                )
+                recipes.append((
+                    authors.choice(),
+                    f'{self.random.choice(DISHES)}: '
+                    f'{names[composition[0]]}',
+                    ', '.join(names[pk] for pk in composition),
+                    self.random.randint(*DATASET_COOKING_TIME_RANGE),
+                    image,
+                ))
+                compositions.append(composition)
+            ids = self.write(
+                Recipe,
+                ('author_id', 'name', 'text', 'cooking_time', 'image'),
+                recipes,
+                returning=True,
+            )
+            self.write(
+                RecipeIngredient,
+                ('recipe_id', 'ingredient_id', 'amount'),
+                [
+                    (
+                        recipe_id,
+                        ingredient_id,
+                        self.random.randint(*DATASET_AMOUNT_RANGE),
+                    )
+                    for recipe_id, composition in zip(ids, compositions)
+                    for ingredient_id in composition
+                ],
+            )
+            recipe_ids.extend(ids)
+            self.progress(f'Рецептов: {len(recipe_ids)}')
+        # Одна ссылка на картинку уже учтена при сохранении файла
+        MediaBlob.objects.filter(name=image).update(
+            references=F('references') + len(recipe_ids) - 1,
+        )
+        return recipe_ids
+
+    def create_relations(self, model, field, user_ids, targets, mean):
+        """
+        Для каждого пользователя - в среднем mean различных строк model,
+        ссылающихся полем field на выбранные из targets объекты
+        """
+        if mean <= 0:
+            return
+        rows = []
+        for user_id in user_ids:
+            count = round(self.random.expovariate(1 / mean))
+            # Одна цель берется про запас: подписка на себя пропускается
+            rows.extend([
+                (user_id, target_id)
+                for target_id in targets.sample(count + 1)
+                if target_id != user_id or model is not Follow
+            ][:count])
+            if len(rows) >= self.batch_size:
+                self.write(model, ('user_id', f'{field}_id'), rows)
+                rows = []
+        if rows:
+            self.write(model, ('user_id', f'{field}_id'), rows)
+        self.progress(
+            f'{model._meta.verbose_name_plural}: '
+            f'{self.created[model._meta.verbose_name_plural]}'
+        )
@@ -0,0 +1,377 @@
+import json
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+    override_settings,
+)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from benchmarks.constants import (
+    BENCHMARK_LATENCY_TOLERANCE_MS,
+    BENCHMARK_BASELINE_FILE,
+    BENCHMARK_READER_CART,
+    BENCHMARK_THRESHOLD,
+    BENCHMARK_WARMUP,
+    BENCHMARK_REPEAT,
+)
+from benchmarks.dataset import SyntheticDataset
+from benchmarks.scenarios import (
+    SCENARIOS,
+    recipe_data,
+    uncovered_routes,
+)
+from follows.models import Follow
+from monitoring.testing import QueryBudgetExceeded, query_budget
+from recipes.models import Recipe, RecipeIngredient, ShoppingCart
+
+User = get_user_model()
+
+DATASET_OPTIONS = (
+    'users', 'recipes', 'ingredients_per_recipe', 'follows', 'favorites',
+    'cart', 'seed',
+)
+
+# Кеш на время замеров - в памяти процесса, чтобы не сбрасывать
+# общий кеш приложения
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    },
+}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def regressions(results, baseline, threshold, tolerance):
+    """
+    Сравнение замеров с базовыми: число запросов и число повторов
+    одного шаблона SQL не должны расти, время ответа (p50, p95) и размер
+    ответа - больше чем на threshold, а время - еще и больше чем
+    на tolerance миллисекунд
+    """
+    found = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['queries'] > base['queries']:
+            found.append(
+                f'{name}: запросов {result["queries"]}, '
+                f'было {base["queries"]}'
+            )
+        if result['repeats'] > base.get('repeats', result['repeats']):
+            found.append(
+                f'{name}: повторов шаблона SQL {result["repeats"]}, '
+                f'было {base["repeats"]}'
+            )
+        for metric in ('p50', 'p95'):
+            if (
+                result[metric] > base[metric] * (1 + threshold)
+                and result[metric] - base[metric] > tolerance
+            ):
+                found.append(
+                    f'{name}: {metric} {result[metric]:.1f} мс, '
+                    f'было {base[metric]:.1f} мс'
+                )
+        if result['bytes'] > base['bytes'] * (1 + threshold):
+            found.append(
+                f'{name}: размер ответа {result["bytes"]} байт, '
+                f'было {base["bytes"]} байт'
+            )
+    return found
+
+
+class Command(BaseCommand):
+    """
+    Команда замеров API: создает тестовую БД с синтетическими данными,
+    выполняет сценарии для всех маршрутов API через тестовый клиент
+    и сравнивает число запросов к БД, время ответа и размер ответа
+    с базовыми замерами
+    """
+    help = (
+        'Замеряет число запросов к БД, p50/p95 времени ответа и размер '
+        'ответа для всех маршрутов API на синтетических данных '
+        'в тестовой БД и сравнивает их с базовыми замерами'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help='Число подписок каждого пользователя',
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Число рецептов в избранном каждого пользователя',
+        )
+        parser.add_argument(
+            '--cart', type=int, default=5,
+            help='Число рецептов в списке покупок каждого пользователя',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--warmup', type=int, default=BENCHMARK_WARMUP)
+        parser.add_argument('--repeat', type=int, default=BENCHMARK_REPEAT)
+        parser.add_argument(
+            '--only',
+            action='append',
+            help='Выполнить только сценарии с этим началом названия',
+        )
+        parser.add_argument(
+            '--baseline',
+            type=Path,
+            default=Path(BENCHMARK_BASELINE_FILE),
+            help='Файл с базовыми замерами',
+        )
+        parser.add_argument(
+            '--update-baseline',
+            action='store_true',
+            help='Записать результаты в файл базовых замеров',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=BENCHMARK_THRESHOLD,
+            help='Допустимый относительный рост времени и размера ответа',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=BENCHMARK_LATENCY_TOLERANCE_MS,
+            help='Допустимый рост времени ответа в миллисекундах',
+        )
+        parser.add_argument(
+            '--max-repeats',
+            type=int,
+            help=(
+                'Бюджет: сколько раз один шаблон SQL может выполняться '
+                'за запрос'
+            ),
+        )
+        parser.add_argument(
+            '--slow-ms',
+            type=float,
+            help='Бюджет: наибольшее время одного запроса к БД в мс',
+        )
+        parser.add_argument(
+            '--output',
+            type=Path,
+            help='Файл, в который записываются результаты',
+        )
+
+    def handle(self, *args, **options):
+        scenarios = SCENARIOS
+        if options['only']:
+            scenarios = [
+                scenario for scenario in SCENARIOS
+                if scenario.name.startswith(tuple(options['only']))
+            ]
+        else:
+            uncovered = uncovered_routes(SCENARIOS)
+            if uncovered:
+                raise CommandError(
+                    'Нет сценариев для маршрутов:\n' + '\n'.join(uncovered)
+                )
+        dataset = {name: options[name] for name in DATASET_OPTIONS}
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with TemporaryDirectory() as media_root, override_settings(
+                MEDIA_ROOT=media_root,
+                CACHES=BENCHMARK_CACHES,
+            ):
+                started = time.perf_counter()
+                SyntheticDataset(**dataset).create()
+                self.stderr.write(
+                    'Синтетические данные созданы за '
+                    f'{time.perf_counter() - started:.1f} с'
+                )
+                client = APIClient()
+                context = self.prepare_context(client)
+                budget = {
+                    'repeats': options['max_repeats'],
+                    'slow_ms': options['slow_ms'],
+                }
+                violations = {}
+                results = {
+                    scenario.name: self.measure(
+                        client, scenario, context,
+                        options['warmup'], options['repeat'],
+                        budget, violations,
+                    )
+                    for scenario in scenarios
+                }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {'dataset': dataset, 'scenarios': results}
+        if options['output']:
+            self.write_json(options['output'], report)
+        for name, message in violations.items():
+            self.stderr.write(f'{name}: {message}')
+        if violations:
+            raise CommandError(
+                f'Бюджет запросов превышен в сценариях: {len(violations)}'
+            )
+        if options['update_baseline']:
+            self.write_json(options['baseline'], report)
+            self.stdout.write(
+                f'Базовые замеры записаны в {options["baseline"]}'
+            )
+            return
+        if not options['baseline'].exists():
+            self.stderr.write(
+                f'Нет файла базовых замеров {options["baseline"]}, '
+                'создайте его с --update-baseline'
+            )
+            return
+        baseline = json.loads(options['baseline'].read_text())
+        if baseline['dataset'] != dataset:
+            self.stderr.write(
+                'Базовые замеры сняты на других синтетических данных: '
+                f'{baseline["dataset"]}'
+            )
+        found = regressions(
+            results, baseline['scenarios'],
+            options['threshold'], options['tolerance'],
+        )
+        for message in found:
+            self.stderr.write(message)
+        if found:
+            raise CommandError(f'Регрессий: {len(found)}')
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def prepare_context(self, client):
+        """
+        Пользователи, рецепты и ингредиенты, к которым обращаются
+        сценарии: читатель с подпиской на самого активного автора,
+        непустым списком покупок и собственным рецептом
+        """
+        reader = User.objects.order_by('pk').first()
+        author = User.objects.exclude(
+            pk=reader.pk,
+        ).order_by('-recipes_count', 'pk').first()
+        Follow.objects.get_or_create(user=reader, following=author)
+        recipe = Recipe.objects.filter(author=author).order_by('-pk').first()
+        # Рецепт сценариев добавляется в список покупок и удаляется
+        # из него, поэтому в постоянный список берутся другие рецепты
+        for cart_recipe in Recipe.objects.exclude(
+            pk=recipe.pk,
+        ).order_by('pk')[:BENCHMARK_READER_CART]:
+            ShoppingCart.objects.get_or_create(
+                user=reader, recipe=cart_recipe,
+            )
+        ingredients = list(
+            RecipeIngredient.objects.filter(
+                recipe=recipe,
+            ).order_by('pk').values_list(
+                'ingredient_id',
+                'ingredient__name',
+                'ingredient__measurement_unit',
+            )
+        )
+        context = {
+            'reader': reader.pk,
+            'reader_email': reader.email,
+            'author': author.pk,
+            'recipe': recipe.pk,
+            'ingredient': ingredients[0][0],
+            'ingredient_ids': [pk for pk, _, _ in ingredients],
+            'ingredient_names': [
+                (name, measurement_unit)
+                for _, name, measurement_unit in ingredients
+            ],
+            'match': ','.join(str(pk) for pk, _, _ in ingredients),
+            'search': ingredients[0][1].split()[0],
+        }
+        self.authenticate(client, 'reader', context)
+        response = client.post(
+            '/api/recipes/',
+            {**recipe_data(context), 'name': 'Рецепт читателя'},
+            format='json',
+        )
+        context['own_recipe'] = response.json()['id']
+        return context
+
+    @staticmethod
+    def authenticate(client, user, context):
+        if user is None:
+            client.credentials()
+            return
+        token, _ = Token.objects.get_or_create(user_id=context[user])
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def measure(
+        self, client, scenario, context, warmup, repeat, budget, violations,
+    ):
+        latencies = []
+        queries = repeats = size = 0
+        for iteration in range(warmup + repeat):
+            request_context = context
+            if scenario.setup is not None:
+                self.authenticate(client, 'reader', context)
+                request_context = {
+                    **context, **(scenario.setup(client, context) or {}),
+                }
+            self.authenticate(client, scenario.user, context)
+            captured = query_budget(**budget)
+            try:
+                with captured:
+                    started = time.perf_counter()
+                    response = scenario.request(client, request_context)
+                    if response.streaming:
+                        content = b''.join(response.streaming_content)
+                    else:
+                        content = response.content
+                    elapsed = time.perf_counter() - started
+            except QueryBudgetExceeded as error:
+                violations.setdefault(scenario.name, str(error))
+            if response.status_code != scenario.status:
+                raise CommandError(
+                    f'{scenario.name}: статус {response.status_code}, '
+                    f'ожидался {scenario.status}: {content[:500]!r}'
+                )
+            if iteration >= warmup:
+                latencies.append(elapsed * 1000)
+                queries = max(queries, captured.metrics.queries)
+                templates = captured.metrics.templates.values()
+                repeats = max(repeats, max(
+                    (count for count, _ in templates), default=0,
+                ))
+                size = max(size, len(content))
+        result = {
+            'queries': queries,
+            'repeats': repeats,
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+            'bytes': size,
+        }
+        self.stdout.write(
+            f'{scenario.name:<40} запросов: {queries:>4}  '
+            f'повторов: {repeats:>4}  '
+            f'p50: {result["p50"]:>8.1f} мс  p95: {result["p95"]:>8.1f} мс  '
+            f'{size:>9} байт'
+        )
+        return result
+
+    @staticmethod
+    def write_json(path, report):
+        path.write_text(
+            json.dumps(report, ensure_ascii=False, indent=2) + '\n',
+        )
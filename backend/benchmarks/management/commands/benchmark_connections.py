@@ -0,0 +1,121 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.test import Client
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from benchmarks.constants import (
+    BENCHMARK_CONN_MAX_AGE,
+    BENCHMARK_CONNECTIONS_REPEAT,
+    BENCHMARK_WARMUP,
+)
+from benchmarks.management.commands.benchmark import percentile
+
+
+class Command(BaseCommand):
+    """
+    Команда замера затрат на подключение к БД: время установки
+    соединения и время ответа на GET-запрос, когда соединение
+    закрывается после каждого запроса (CONN_MAX_AGE = 0)
+    и когда оно переиспользуется (постоянные соединения)
+    """
+    help = (
+        'Замеряет время подключения к БД из настроек (или к PgBouncer) '
+        'и p50/p95 времени ответа на GET-запрос с новым соединением '
+        'на каждый запрос и с постоянным соединением'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default='/api/recipes/',
+            help='Путь GET-запроса, данные не изменяются',
+        )
+        parser.add_argument('--warmup', type=int, default=BENCHMARK_WARMUP)
+        parser.add_argument(
+            '--repeat', type=int, default=BENCHMARK_CONNECTIONS_REPEAT,
+        )
+        parser.add_argument(
+            '--conn-max-age',
+            type=int,
+            default=BENCHMARK_CONN_MAX_AGE,
+            help='CONN_MAX_AGE для замера постоянных соединений',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[DEFAULT_DB_ALIAS]
+        conn_max_age = connection.settings_dict['CONN_MAX_AGE']
+        setup_test_environment()
+        try:
+            connect = self.measure_connect(connection, options['repeat'])
+            self.report('Подключение к БД', connect)
+            results = {}
+            for max_age in (0, options['conn_max_age']):
+                results[max_age] = self.measure_requests(
+                    connection, options['path'], max_age,
+                    options['warmup'], options['repeat'],
+                )
+                self.report(f'CONN_MAX_AGE={max_age}', results[max_age])
+        finally:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+            teardown_test_environment()
+        saved = (
+            results[0]['p50'] - results[options['conn_max_age']]['p50']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Постоянные соединения уменьшают p50 на {saved:.2f} мс '
+            f'(подключение p50: {connect["p50"]:.2f} мс)'
+        ))
+
+    @staticmethod
+    def measure_connect(connection, repeat):
+        latencies = []
+        for _ in range(repeat):
+            connection.close()
+            started = time.perf_counter()
+            connection.ensure_connection()
+            latencies.append((time.perf_counter() - started) * 1000)
+        return {
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+        }
+
+    @staticmethod
+    def measure_requests(connection, path, max_age, warmup, repeat):
+        """
+        Запросы через тестовый клиент. Как и обработчик WSGI, перед
+        запросом и после него закрываются соединения, срок жизни
+        которых истек: при CONN_MAX_AGE = 0 каждый запрос подключается
+        к БД заново
+        """
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        client = Client()
+        latencies = []
+        for iteration in range(warmup + repeat):
+            close_old_connections()
+            started = time.perf_counter()
+            response = client.get(path)
+            elapsed = time.perf_counter() - started
+            close_old_connections()
+            if response.status_code != 200:
+                raise CommandError(
+                    f'{path}: статус {response.status_code}'
+                )
+            if iteration >= warmup:
+                latencies.append(elapsed * 1000)
+        return {
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+        }
+
+    def report(self, title, result):
+        self.stdout.write(
+            f'{title:<24} p50: {result["p50"]:>8.2f} мс  '
+            f'p95: {result["p95"]:>8.2f} мс'
+        )
@@ -0,0 +1,103 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from benchmarks.constants import DATASET_BATCH_SIZE, DATASET_ZIPF_EXPONENT
+from benchmarks.dataset import INGREDIENTS_FILE, SyntheticDataset
+
+
+class Command(BaseCommand):
+    """
+    Команда заполнения БД синтетическими данными для нагрузочного
+    тестирования
+    """
+    help = (
+        'Создает пользователей, рецепты, подписки, избранное и списки '
+        'покупок с распределением популярности по закону Ципфа. '
+        'При одинаковом --seed создаются одинаковые данные'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--ingredients-per-recipe',
+            type=int,
+            default=10,
+            help='Среднее число ингредиентов рецепта',
+        )
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=20,
+            help='Среднее число подписок пользователя',
+        )
+        parser.add_argument(
+            '--favorites',
+            type=int,
+            default=50,
+            help='Среднее число рецептов в избранном пользователя',
+        )
+        parser.add_argument(
+            '--cart',
+            type=int,
+            default=5,
+            help='Среднее число рецептов в списке покупок пользователя',
+        )
+        parser.add_argument(
+            '--zipf',
+            type=float,
+            default=DATASET_ZIPF_EXPONENT,
+            help='Показатель распределения популярности',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DATASET_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Вставлять строки через COPY (PostgreSQL)',
+        )
+        parser.add_argument(
+            '--ingredients-file',
+            type=Path,
+            default=INGREDIENTS_FILE,
+            help='Файл ингредиентов, если таблица ингредиентов пуста',
+        )
+
+    def handle(self, *args, **options):
+        use_copy = options['copy']
+        if use_copy and connection.vendor != 'postgresql':
+            self.stderr.write(
+                'COPY доступен только в PostgreSQL, '
+                'используется bulk_create'
+            )
+            use_copy = False
+        dataset = SyntheticDataset(
+            users=options['users'],
+            recipes=options['recipes'],
+            ingredients_per_recipe=options['ingredients_per_recipe'],
+            follows=options['follows'],
+            favorites=options['favorites'],
+            cart=options['cart'],
+            seed=options['seed'],
+            zipf=options['zipf'],
+            batch_size=options['batch_size'],
+            copy=use_copy,
+            progress=self.stderr.write,
+        )
+        started = time.perf_counter()
+        dataset.create(options['ingredients_file'])
+        elapsed = time.perf_counter() - started
+        rows = sum(dataset.created.values())
+        for name, count in dataset.created.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано строк: {rows}, время: {elapsed:.1f} с, '
+            f'{rows / elapsed if elapsed else 0:.0f} строк/с'
+        ))
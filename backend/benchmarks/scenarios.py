@@ -0,0 +1,309 @@
+import json
+from base64 import b64encode
+from collections import defaultdict
+from itertools import count
+
+from django.contrib.auth import get_user_model
+from django.urls import URLResolver, get_resolver
+
+from follows.models import Follow
+from recipes.models import FavouriteUserRecipe, Recipe, ShoppingCart
+from recipes.transfer import NDJSON_CONTENT_TYPE
+from users.toggles import add_relation, remove_relation
+from .constants import DATASET_PASSWORD
+from .dataset import image_bytes
+
+User = get_user_model()
+
+HTTP_METHODS = ('get', 'post', 'put', 'patch', 'delete')
+
+# Приложения, все маршруты которых должны быть покрыты сценариями
+API_NAMESPACES = ('recipes', 'users', 'follows', 'ingredients')
+
+SCENARIO_RECIPE_NAME = 'Рецепт для замеров'
+IMPORT_RECIPES = 10
+IMAGE = 'data:image/png;base64,' + b64encode(
+    image_bytes(color=(40, 120, 200)),
+).decode()
+
+
+class Scenario:
+    """
+    Запрос к API для замеров. В path и data подставляются значения
+    из контекста (идентификаторы пользователей, рецептов, ингредиентов),
+    data может быть функцией от контекста. Функция setup(client, context)
+    выполняется перед каждым запросом вне замера и готовит состояние,
+    например удаляет рецепт из избранного перед его добавлением.
+    Запрос выполняется от имени пользователя context[user]
+    или анонимно, если user не задан
+    """
+
+    def __init__(self, name, method, path, user='reader', data=None,
+                 content_type=None, status=200, setup=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.user = user
+        self.data = data
+        self.content_type = content_type
+        self.status = status
+        self.setup = setup
+
+    def request(self, client, context):
+        path = self.path.format(**context)
+        data = self.data(context) if callable(self.data) else self.data
+        if self.content_type is not None:
+            return client.generic(
+                self.method, path, data, content_type=self.content_type,
+            )
+        return getattr(client, self.method.lower())(path, data, format='json')
+
+
+def recipe_data(context):
+    return {
+        'name': SCENARIO_RECIPE_NAME,
+        'text': 'Описание',
+        'cooking_time': 10,
+        'image': IMAGE,
+        'ingredients': [
+            {'id': ingredient_id, 'amount': 100}
+            for ingredient_id in context['ingredient_ids']
+        ],
+    }
+
+
+def import_data(context):
+    line = json.dumps({
+        'name': SCENARIO_RECIPE_NAME,
+        'text': 'Описание',
+        'cooking_time': 10,
+        'image': IMAGE,
+        'ingredients': [
+            {'name': name, 'measurement_unit': measurement_unit,
+             'amount': 100}
+            for name, measurement_unit in context['ingredient_names']
+        ],
+    }, ensure_ascii=False)
+    return (line + '\n') * IMPORT_RECIPES
+
+
+def delete_scenario_recipes(client, context):
+    for recipe in Recipe.objects.filter(
+        author_id=context['reader'],
+        name=SCENARIO_RECIPE_NAME,
+    ):
+        recipe.delete()
+
+
+def create_scenario_recipe(client, context):
+    response = client.post('/api/recipes/', recipe_data(context),
+                           format='json')
+    return {'created': response.json()['id']}
+
+
+def reset_password(client, context):
+    user = User.objects.get(pk=context['reader'])
+    user.set_password(DATASET_PASSWORD)
+    user.save(update_fields=['password'])
+
+
+def request_before(method, path, data=None):
+    """
+    Подготовка состояния запросом к API, например загрузка аватара
+    перед замером его удаления
+    """
+    def setup(client, context):
+        getattr(client, method)(path.format(**context), data, format='json')
+    return setup
+
+
+def relation_before(add, model, target_field, target):
+    """
+    Добавление или удаление связи читателя с объектом context[target]
+    перед замером обратного действия. Повторное добавление
+    и удаление ничего не меняют
+    """
+    def setup(client, context):
+        toggle = add_relation if add else remove_relation
+        toggle(model, target_field, context['reader'], context[target])
+    return setup
+
+
+_usernames = count()
+
+
+def user_data(context):
+    username = f'benchmark{next(_usernames)}'
+    return {
+        'email': f'{username}@example.com',
+        'username': username,
+        'first_name': 'Имя',
+        'last_name': 'Фамилия',
+        'password': DATASET_PASSWORD,
+    }
+
+
+SCENARIOS = (
+    Scenario('api.root', 'GET', '/api/', user=None),
+
+    Scenario('auth.login', 'POST', '/api/auth/token/login/', user=None,
+             data=lambda context: {
+                 'email': context['reader_email'],
+                 'password': DATASET_PASSWORD,
+             }),
+    Scenario('auth.logout', 'POST', '/api/auth/token/logout/', status=204),
+
+    Scenario('users.list', 'GET', '/api/users/?limit=6', user=None),
+    Scenario('users.create', 'POST', '/api/users/', user=None, status=201,
+             data=user_data),
+    Scenario('users.detail', 'GET', '/api/users/{author}/', user=None),
+    Scenario('users.detail.auth', 'GET', '/api/users/{author}/'),
+    Scenario('users.me', 'GET', '/api/users/me/'),
+    Scenario('users.set_password', 'POST', '/api/users/set_password/',
+             status=204, setup=reset_password, data={
+                 'current_password': DATASET_PASSWORD,
+                 'new_password': f'new-{DATASET_PASSWORD}',
+             }),
+    Scenario('users.avatar.put', 'PUT', '/api/users/me/avatar/',
+             data={'avatar': IMAGE}),
+    Scenario('users.avatar.delete', 'DELETE', '/api/users/me/avatar/',
+             status=204,
+             setup=request_before('put', '/api/users/me/avatar/',
+                                  {'avatar': IMAGE})),
+
+    Scenario('follows.subscriptions', 'GET',
+             '/api/users/subscriptions/?limit=6&recipes_limit=3'),
+    Scenario('follows.subscribe', 'POST', '/api/users/{author}/subscribe/',
+             status=201,
+             setup=relation_before(False, Follow, 'following', 'author')),
+    Scenario('follows.unsubscribe', 'DELETE',
+             '/api/users/{author}/subscribe/', status=204,
+             setup=relation_before(True, Follow, 'following', 'author')),
+
+    Scenario('ingredients.list', 'GET', '/api/ingredients/', user=None),
+    Scenario('ingredients.search', 'GET', '/api/ingredients/?name=мо',
+             user=None),
+    Scenario('ingredients.detail', 'GET', '/api/ingredients/{ingredient}/',
+             user=None),
+
+    Scenario('recipes.list', 'GET', '/api/recipes/?limit=6', user=None),
+    Scenario('recipes.list.auth', 'GET', '/api/recipes/?limit=6'),
+    Scenario('recipes.list.author', 'GET',
+             '/api/recipes/?limit=6&author={author}'),
+    Scenario('recipes.list.favorited', 'GET',
+             '/api/recipes/?limit=6&is_favorited=1'),
+    Scenario('recipes.list.shopping_cart', 'GET',
+             '/api/recipes/?limit=6&is_in_shopping_cart=1'),
+    Scenario('recipes.list.popular', 'GET',
+             '/api/recipes/?limit=6&ordering=popular'),
+    Scenario('recipes.list.search', 'GET',
+             '/api/recipes/?limit=6&search={search}'),
+    Scenario('recipes.create', 'POST', '/api/recipes/', status=201,
+             data=recipe_data, setup=delete_scenario_recipes),
+    Scenario('recipes.detail', 'GET', '/api/recipes/{recipe}/', user=None),
+    Scenario('recipes.detail.auth', 'GET', '/api/recipes/{recipe}/'),
+    Scenario('recipes.update', 'PUT', '/api/recipes/{own_recipe}/',
+             data=lambda context: {
+                 **recipe_data(context), 'name': 'Измененный рецепт',
+             }),
+    Scenario('recipes.partial_update', 'PATCH', '/api/recipes/{own_recipe}/',
+             data=lambda context: {
+                 'cooking_time': 15,
+                 'ingredients': recipe_data(context)['ingredients'],
+             }),
+    Scenario('recipes.delete', 'DELETE', '/api/recipes/{created}/',
+             status=204, setup=create_scenario_recipe),
+    Scenario('recipes.get_link', 'GET', '/api/recipes/{recipe}/get-link/'),
+    Scenario('recipes.feed', 'GET', '/api/recipes/feed/?limit=6'),
+    Scenario('recipes.match', 'GET',
+             '/api/recipes/match/?limit=6&ingredients={match}'),
+    Scenario('recipes.import', 'POST', '/api/recipes/import/', status=201,
+             data=import_data, content_type=NDJSON_CONTENT_TYPE,
+             setup=delete_scenario_recipes),
+    Scenario('recipes.export', 'GET', '/api/recipes/export/?author={reader}'),
+    Scenario('recipes.favorite.add', 'POST', '/api/recipes/{recipe}/favorite/',
+             status=201,
+             setup=relation_before(False, FavouriteUserRecipe, 'recipe',
+                                   'recipe')),
+    Scenario('recipes.favorite.remove', 'DELETE',
+             '/api/recipes/{recipe}/favorite/', status=204,
+             setup=relation_before(True, FavouriteUserRecipe, 'recipe',
+                                   'recipe')),
+    Scenario('recipes.shopping_cart.add', 'POST',
+             '/api/recipes/{recipe}/shopping_cart/', status=201,
+             setup=relation_before(False, ShoppingCart, 'recipe',
+                                   'recipe')),
+    Scenario('recipes.shopping_cart.remove', 'DELETE',
+             '/api/recipes/{recipe}/shopping_cart/', status=204,
+             setup=relation_before(True, ShoppingCart, 'recipe',
+                                   'recipe')),
+    Scenario('recipes.download_shopping_cart', 'GET',
+             '/api/recipes/download_shopping_cart/'),
+    Scenario('recipes.download_shopping_cart.json', 'GET',
+             '/api/recipes/download_shopping_cart/?format=json'),
+)
+
+
+def route_methods(callback):
+    actions = getattr(callback, 'actions', None)
+    if actions is not None:
+        return set(actions)
+    view_class = getattr(callback, 'cls', None)
+    return {
+        method for method in HTTP_METHODS
+        if view_class is not None and hasattr(view_class, method)
+    }
+
+
+def api_routes(patterns=None, chain=()):
+    """
+    Маршруты приложений API_NAMESPACES: цепочка шаблонов маршрута
+    и обрабатываемые им методы. Маршруты с суффиксом формата
+    (.json, .api) пропускаются
+    """
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            module = getattr(pattern.urlconf_module, '__name__', '')
+            if chain or module.split('.')[0] in API_NAMESPACES:
+                yield from api_routes(pattern.url_patterns,
+                                      chain + (pattern,))
+        elif chain and 'format' not in pattern.pattern.regex.groupindex:
+            yield chain + (pattern,), route_methods(pattern.callback)
+
+
+def route_matches(chain, path):
+    path = path.split('?')[0].lstrip('/')
+    for pattern in chain:
+        match = pattern.pattern.match(path)
+        if match is None:
+            return False
+        path = match[0]
+    return True
+
+
+def route_name(chain):
+    return ''.join(str(pattern.pattern) for pattern in chain)
+
+
+def uncovered_routes(scenarios):
+    """
+    Маршруты и методы, для которых нет сценария. Маршрут считается
+    покрытым, если путь сценария с тем же методом подходит под его
+    шаблон, даже если запрос обработает раньше объявленный маршрут
+    """
+    placeholders = defaultdict(lambda: 1)
+    requests = [
+        (scenario.method.lower(), scenario.path.format_map(placeholders))
+        for scenario in scenarios
+    ]
+    uncovered = set()
+    for chain, methods in api_routes():
+        for method in methods:
+            if not any(
+                method == scenario_method and route_matches(chain, path)
+                for scenario_method, path in requests
+            ):
+                uncovered.add(f'{method.upper()} /{route_name(chain)}')
+    return sorted(uncovered)
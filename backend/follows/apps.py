@@ -5,3 +5,6 @@ class FollowsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'follows'
     verbose_name = 'Подписки'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -1,6 +1,5 @@
 from rest_framework.serializers import (
     SerializerMethodField,
-    IntegerField
 )
 from django.contrib.auth import get_user_model
 
@@ -16,7 +15,6 @@ class FollowSerializer(UserSerializer):
     Возвращает данные автора и его рецепты.
     """
     recipes = SerializerMethodField()
-    recipes_count = IntegerField(source='user_recipes.count')
 
     class Meta(UserSerializer.Meta):
         fields = [
@@ -29,12 +27,18 @@ class FollowSerializer(UserSerializer):
             'recipes',
             'recipes_count',
             'avatar',
+            'avatar_srcset',
         ]
 
     def get_recipes(self, obj):
         """
-        Метод, возвращающий рецепты, созданные пользователем
+        Метод, возвращающий рецепты, созданные пользователем.
+        Если рецепты уже подгружены во вьюсете, запрос не выполняется
         """
+        if hasattr(obj, 'limited_recipes'):
+            return SimpleRecipeSerializer(
+                obj.limited_recipes, many=True,
+            ).data
         query_params = self.context['request'].query_params
         recipes_limit = query_params.get('recipes_limit')
         recipes = obj.user_recipes.all()
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.toggles import (
+    relation_removed,
+    relation_added,
+    change_counter,
+)
+from recipes.cache import invalidate_feeds
+from .models import Follow
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Follow)
+def increment_followers_count(sender, instance, created, raw=False,
+                              **kwargs):
+    """
+    Увеличение счетчика подписчиков пользователя
+    """
+    if created and not raw:
+        change_counter(User, instance.following_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_followers_count(sender, instance, **kwargs):
+    """
+    Уменьшение счетчика подписчиков пользователя
+    """
+    change_counter(User, instance.following_id, 'followers_count', -1)
+
+
+@receiver(relation_added, sender=Follow)
+def increment_toggled_followers_count(sender, target_id, **kwargs):
+    change_counter(User, target_id, 'followers_count', 1)
+
+
+@receiver(relation_removed, sender=Follow)
+def decrement_toggled_followers_count(sender, target_id, **kwargs):
+    change_counter(User, target_id, 'followers_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_feed_on_follow(sender, instance, raw=False, **kwargs):
+    """
+    Сброс ленты пользователя при изменении его подписок
+    """
+    if not raw:
+        invalidate_feeds([instance.user_id])
+
+
+@receiver(relation_added, sender=Follow)
+@receiver(relation_removed, sender=Follow)
+def invalidate_toggled_feed(sender, user_id, **kwargs):
+    invalidate_feeds([user_id])
@@ -1,12 +1,26 @@
 from django.contrib.auth import get_user_model
+from django.db.models import (
+    Prefetch,
+    Window,
+    Value,
+    F,
+)
+from django.db.models.functions import RowNumber
+from django.http import Http404
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework import status, viewsets
 
 from .models import Follow
+from recipes.models import Recipe
 from .serializers import FollowSerializer
-from users.paginators import PageLimitPagination
+from users.paginators import EstimatedCountPagination
+from users.toggles import (
+    remove_relation,
+    add_relation,
+    Toggle,
+)
 
 User = get_user_model()
 
@@ -20,69 +34,97 @@ class FollowViewSet(viewsets.GenericViewSet):
     """
     queryset = User.objects.all()
     permission_classes = [IsAuthenticated]
-    pagination_class = PageLimitPagination
+    pagination_class = EstimatedCountPagination
+
+    def get_subscriptions_queryset(self, request):
+        """
+        Подписки текущего пользователя:
+            - число рецептов автора хранится в самой модели пользователя
+            - рецепты всех авторов страницы подгружаются одним запросом,
+              ограничение recipes_limit на каждого автора применяется
+              через ROW_NUMBER() OVER (PARTITION BY author_id)
+            - признак подписки заведомо истинный
+        """
+        recipes = Recipe.objects.all()
+        recipes_limit = request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes.annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by=F('author'),
+                    order_by=(F('pub_date').desc(), F('id').desc()),
+                ),
+            ).filter(
+                row_number__lte=int(recipes_limit),
+            )
+        return User.objects.filter(
+            followers__user=request.user,
+        ).annotate(
+            is_subscribed=Value(True),
+        ).prefetch_related(
+            Prefetch(
+                'user_recipes',
+                queryset=recipes,
+                to_attr='limited_recipes',
+            )
+        )
 
     @action(detail=True, methods=['POST', 'DELETE'], url_path='subscribe')
     def subscription(self, request, pk=None):
         """
-        Функция подписки на пользователя
+        Функция подписки на пользователя.
+        Подписка и отписка выполняются одним запросом
         """
-        author = self.get_object()
+        if not str(pk).isdigit():
+            raise Http404
         if request.method == 'POST':
-            if request.user == author:
+            if str(request.user.pk) == str(pk):
                 return Response(
                     {
                         'detail': 'Нельзя подписаться на самого себя'
                     },
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            if Follow.objects.filter(
-                user=request.user,
-                following=author
-            ).exists():
-                return Response(
-                    {
-                        'detail': 'Такая подписка уже существует!',
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            Follow.objects.create(
-                user=request.user,
-                following=author
+            result = add_relation(Follow, 'following', request.user.pk, pk)
+        else:
+            result = remove_relation(
+                Follow, 'following', request.user.pk, pk,
             )
-            data = FollowSerializer(
-                author,
-                context={
-                    'request': request
-                }
-            ).data
+        if result is Toggle.NOT_FOUND:
+            raise Http404
+        if result is Toggle.EXISTS:
             return Response(
-                data,
-                status=status.HTTP_201_CREATED
+                {
+                    'detail': 'Такая подписка уже существует!',
+                },
+                status=status.HTTP_400_BAD_REQUEST,
             )
-        elif request.method == 'DELETE':
-            if not Follow.objects.filter(
-                user=request.user,
-                following=author
-            ).exists():
-                return Response(
-                    {
-                        'detail': 'Такой подписки не существует!'
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            Follow.objects.filter(
-                user=request.user,
-                following=author
-            ).delete()
+        if result is Toggle.ABSENT:
+            return Response(
+                {
+                    'detail': 'Такой подписки не существует!'
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if result is Toggle.REMOVED:
             return Response(status=status.HTTP_204_NO_CONTENT)
+        data = FollowSerializer(
+            self.get_subscriptions_queryset(request).get(pk=pk),
+            context={
+                'request': request
+            }
+        ).data
+        return Response(
+            data,
+            status=status.HTTP_201_CREATED
+        )
 
     @action(detail=False, methods=['GET'], url_path='subscriptions')
     def list_subscriptions(self, request):
         """
         Функция получения списка подписок текущего пользователя
         """
-        authors = User.objects.filter(followers__user=request.user)
+        authors = self.get_subscriptions_queryset(request)
         page = self.paginate_queryset(authors)
         serializer = FollowSerializer(
             page,
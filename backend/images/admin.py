@@ -0,0 +1,26 @@
+from django.contrib import admin
+
+from .models import ImageJob, MediaBlob
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    """
+    Админка для задач обработки изображений
+    """
+    list_display = [
+        'source', 'content_type', 'object_id', 'status', 'attempts',
+        'updated_at',
+    ]
+    list_filter = ['status', 'content_type']
+    readonly_fields = ['error']
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    """
+    Админка для файлов хранилища
+    """
+    list_display = ['name', 'size', 'references', 'updated_at']
+    search_fields = ['name']
+    readonly_fields = ['name', 'size', 'references', 'updated_at']
@@ -0,0 +1,29 @@
+IMAGE_JOB_FIELD_NAME_MAX_LENGTH = 64
+IMAGE_JOB_SOURCE_MAX_LENGTH = 255
+IMAGE_JOB_STATUS_MAX_LENGTH = 16
+
+# Каталог хранилища для уменьшенных копий изображений
+RENDITIONS_DIR = 'renditions'
+
+
+# Размер порции base64-строки, декодируемой за один раз (кратен 4)
+BASE64_CHUNK_SIZE = 64 * 1024
+
+# Длина начала строки, в которой ищется заголовок data:...;base64,
+DATA_URI_HEADER_MAX_LENGTH = 256
+
+# Форматы изображений, которые принимаются при загрузке,
+# и расширения сохраняемых файлов
+UPLOAD_IMAGE_FORMATS = {
+    'JPEG': 'jpeg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+}
+
+# Каталог хранилища для файлов, названных по хешу содержимого,
+# и число уровней вложенных каталогов из первых символов хеша
+BLOBS_DIR = 'blobs'
+BLOB_FANOUT_LEVELS = 2
+BLOB_FANOUT_WIDTH = 2
+BLOB_NAME_MAX_LENGTH = 255
@@ -0,0 +1,168 @@
+import binascii
+import os
+import re
+import uuid
+from base64 import b64decode
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers
+
+from .constants import (
+    DATA_URI_HEADER_MAX_LENGTH,
+    UPLOAD_IMAGE_FORMATS,
+    BASE64_CHUNK_SIZE,
+)
+
+WHITESPACE = re.compile(r'\s+')
+
+
+class Base64ImageStreamField(serializers.ImageField):
+    """
+    Поле загрузки изображения в base64 (в том числе в виде data URI).
+    Пробельные символы (переносы строк base64 по RFC 2045) удаляются,
+    строка декодируется порциями во временный файл, который хранится
+    в памяти до IMAGE_UPLOAD_SPOOL_SIZE байт, а дальше - на диске.
+    Слишком длинные строки отклоняются до декодирования, формат и размеры
+    изображения проверяются по заголовку из первой порции, пиксели
+    изображения при проверке не декодируются
+    """
+    default_error_messages = {
+        'invalid_image': 'Загрузите корректное изображение.',
+        'invalid_type': 'Изображение должно быть передано строкой base64.',
+        'too_large': 'Размер изображения не должен превышать {max_size} байт.',
+        'too_many_pixels': (
+            'Изображение не должно содержать больше {max_pixels} пикселей.'
+        ),
+        'invalid_format': 'Допустимые форматы изображений: {formats}.',
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid_type')
+        # Порции декодируются строго, поэтому переносы строк удаляются
+        # заранее; копия строки создается, только если они есть
+        if WHITESPACE.search(data):
+            data = WHITESPACE.sub('', data)
+        start = data.find(';base64,', 0, DATA_URI_HEADER_MAX_LENGTH)
+        start = 0 if start == -1 else start + len(';base64,')
+        size = (len(data) - start) * 3 // 4 - data[-2:].count('=')
+        if size <= 0:
+            self.fail('invalid_image')
+        if size > settings.IMAGE_UPLOAD_MAX_SIZE:
+            self.fail('too_large', max_size=settings.IMAGE_UPLOAD_MAX_SIZE)
+        file = SpooledTemporaryFile(
+            max_size=settings.IMAGE_UPLOAD_SPOOL_SIZE,
+        )
+        try:
+            image_format = self.decode(data, start, file)
+        except BaseException:
+            file.close()
+            raise
+        file.seek(0)
+        # Изображение уже проверено, поэтому проверка ImageField, читающая
+        # файл в память целиком, пропускается
+        return super(serializers.ImageField, self).to_internal_value(
+            UploadedFile(
+                file=file,
+                name=f'{uuid.uuid4()}.{UPLOAD_IMAGE_FORMATS[image_format]}',
+                content_type=Image.MIME[image_format],
+                size=size,
+            )
+        )
+
+    def decode(self, data, start, file):
+        """
+        Декодирование строки в файл с проверкой заголовка после первой
+        порции и проверкой структуры файла после декодирования
+        """
+        image_format = None
+        for position in range(start, len(data), BASE64_CHUNK_SIZE):
+            try:
+                file.write(b64decode(
+                    data[position:position + BASE64_CHUNK_SIZE],
+                    validate=True,
+                ))
+            except (binascii.Error, ValueError):
+                self.fail('invalid_image')
+            if position == start:
+                image_format = self.check_header(file, final=False)
+        if image_format is None:
+            image_format = self.check_header(file, final=True)
+        file.seek(0)
+        try:
+            with Image.open(file) as image:
+                image.verify()
+        except Exception:
+            self.fail('invalid_image')
+        return image_format
+
+    def check_header(self, file, final):
+        """
+        Проверка формата и размеров изображения по заголовку.
+        Возвращает формат изображения или None, если заголовок прочитать
+        не удалось, а файл декодирован не полностью
+        """
+        file.seek(0)
+        try:
+            with Image.open(file) as image:
+                image_format, (width, height) = image.format, image.size
+        except Image.DecompressionBombError:
+            self.fail(
+                'too_many_pixels',
+                max_pixels=settings.IMAGE_UPLOAD_MAX_PIXELS,
+            )
+        except (UnidentifiedImageError, OSError):
+            if final:
+                self.fail('invalid_image')
+            return None
+        finally:
+            file.seek(0, os.SEEK_END)
+        if image_format not in UPLOAD_IMAGE_FORMATS:
+            self.fail(
+                'invalid_format',
+                formats=', '.join(UPLOAD_IMAGE_FORMATS.values()),
+            )
+        if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+            self.fail(
+                'too_many_pixels',
+                max_pixels=settings.IMAGE_UPLOAD_MAX_PIXELS,
+            )
+        return image_format
+
+
+class RenditionsField(serializers.Field):
+    """
+    Поле с уменьшенными копиями изображения в виде
+    {размер: {'width': ширина, 'height': высота, формат: ссылка}}.
+    Пока копии текущего изображения не построены, возвращается
+    пустой словарь и используется исходное изображение
+    """
+
+    def __init__(self, image_field, renditions_field, **kwargs):
+        self.image_field = image_field
+        self.renditions_field = renditions_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        image = getattr(instance, self.image_field)
+        renditions = getattr(instance, self.renditions_field) or {}
+        if not image or renditions.get('source') != image.name:
+            return {}
+        request = self.context.get('request')
+        result = {}
+        for name, rendition in renditions.items():
+            if name == 'source':
+                continue
+            result[name] = {}
+            for key, value in rendition.items():
+                if key not in ('width', 'height'):
+                    value = image.storage.url(value)
+                    if request is not None:
+                        value = request.build_absolute_uri(value)
+                result[name][key] = value
+        return result
@@ -0,0 +1,160 @@
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from images.constants import BLOBS_DIR, RENDITIONS_DIR
+from images.models import MediaBlob
+from images.renditions import IMAGE_FIELDS, rendition_files
+from images.storage import is_blob
+
+
+def stored_references():
+    """
+    Число ссылок на каждый файл по данным зарегистрированных моделей
+    """
+    references = Counter()
+    for model, fields in IMAGE_FIELDS.items():
+        for field_name, renditions_field in fields.items():
+            for name, renditions in model.objects.values_list(
+                field_name, renditions_field,
+            ).iterator():
+                if name:
+                    references[name] += 1
+                references.update(rendition_files(renditions))
+    return references
+
+
+def walk_files(storage, directory):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield f'{directory}/{name}'
+    for name in directories:
+        yield from walk_files(storage, f'{directory}/{name}')
+
+
+class Command(BaseCommand):
+    """
+    Команда удаления файлов хранилища, на которые не осталось ссылок
+    """
+    help = (
+        'Удаляет файлы без ссылок, последняя ссылка на которые удалена '
+        'больше MEDIA_GC_GRACE_PERIOD секунд назад'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=settings.MEDIA_GC_GRACE_PERIOD,
+            help='Сколько секунд хранить файл после удаления ссылок',
+        )
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Пересчитать ссылки по данным в базе',
+        )
+        parser.add_argument(
+            '--legacy',
+            action='store_true',
+            help=(
+                'Удалить файлы без ссылок, сохраненные до перехода '
+                'на хранилище с именами по хешу'
+            ),
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только вывести файлы, которые будут удалены',
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        if options['recount'] or options['legacy']:
+            references = stored_references()
+            if options['recount']:
+                self.recount(references)
+            if options['legacy']:
+                self.collect_legacy(references)
+        self.collect(options['grace'])
+
+    def recount(self, references):
+        blobs = {
+            blob.name: blob
+            for blob in MediaBlob.objects.only('name', 'references')
+        }
+        changed = []
+        for name, blob in blobs.items():
+            if blob.references != references[name]:
+                blob.references = references[name]
+                changed.append(blob)
+        missing = [
+            MediaBlob(
+                name=name,
+                size=default_storage.size(name),
+                references=count,
+            )
+            for name, count in references.items()
+            if is_blob(name) and name not in blobs
+            and default_storage.exists(name)
+        ]
+        if os.path.isdir(default_storage.path(BLOBS_DIR)):
+            missing.extend(
+                MediaBlob(name=name, size=default_storage.size(name))
+                for name in walk_files(default_storage, BLOBS_DIR)
+                if name not in blobs and name not in references
+                and not name.endswith('.tmp')
+            )
+        if not self.dry_run:
+            MediaBlob.objects.bulk_update(changed, ['references'])
+            MediaBlob.objects.bulk_create(missing, ignore_conflicts=True)
+        self.stdout.write(
+            f'Исправлено ссылок: {len(changed)}, '
+            f'найдено файлов без записи: {len(missing)}'
+        )
+
+    def collect(self, grace):
+        names = MediaBlob.objects.filter(
+            references__lte=0,
+            updated_at__lt=timezone.now() - timedelta(seconds=grace),
+        ).values_list('name', flat=True)
+        deleted = size = 0
+        for name in names.iterator():
+            with transaction.atomic():
+                blob = MediaBlob.objects.select_for_update().filter(
+                    name=name,
+                    references__lte=0,
+                ).first()
+                if blob is None:
+                    continue
+                if not self.dry_run:
+                    blob.delete()
+                    default_storage.purge(name)
+            deleted += 1
+            size += blob.size
+            self.stdout.write(f'Удален: {name}')
+        self.stdout.write(
+            f'Удалено файлов: {deleted}, освобождено байт: {size}'
+        )
+
+    def collect_legacy(self, references):
+        directories = {
+            model._meta.get_field(field_name).upload_to.strip('/')
+            for model, fields in IMAGE_FIELDS.items()
+            for field_name in fields
+        }
+        directories.add(RENDITIONS_DIR)
+        for directory in sorted(directories):
+            if not os.path.isdir(default_storage.path(directory)):
+                continue
+            for name in walk_files(default_storage, directory):
+                if name in references:
+                    continue
+                if not self.dry_run:
+                    default_storage.purge(name)
+                self.stdout.write(f'Удален: {name}')
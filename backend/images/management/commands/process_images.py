@@ -0,0 +1,94 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from images.renditions import (
+    enqueue_renditions,
+    requeue_stale_jobs,
+    IMAGE_FIELDS,
+    process_job,
+    claim_jobs,
+    finish_job,
+)
+
+
+def run_job(job):
+    """
+    Обработка задачи в потоке пула. Pillow освобождает GIL при
+    масштабировании и кодировании, поэтому потоки работают параллельно
+    """
+    try:
+        process_job(job)
+    except Exception as error:
+        finish_job(job, error)
+        return job, error
+    else:
+        finish_job(job)
+        return job, None
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    """
+    Команда обработки очереди изображений: строит уменьшенные копии
+    загруженных изображений рецептов и аватаров
+    """
+    help = (
+        'Обрабатывает очередь изображений: строит уменьшенные копии '
+        'в форматах IMAGE_RENDITION_FORMATS без метаданных EXIF'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.IMAGE_WORKERS,
+            help='Число потоков обработки',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Обработать очередь и завершиться',
+        )
+        parser.add_argument(
+            '--enqueue-missing',
+            action='store_true',
+            help='Поставить в очередь изображения без уменьшенных копий',
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue_missing']:
+            self.enqueue_missing()
+        workers = options['workers']
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                close_old_connections()
+                requeue_stale_jobs()
+                jobs = claim_jobs(workers * 2)
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(settings.IMAGE_WORKER_POLL_INTERVAL)
+                    continue
+                for job, error in pool.map(run_job, jobs):
+                    if error is None:
+                        self.stdout.write(f'Обработано: {job.source}')
+                    else:
+                        self.stderr.write(f'Ошибка {job.source}: {error!r}')
+
+    def enqueue_missing(self):
+        for model, fields in IMAGE_FIELDS.items():
+            for field_name, renditions_field in fields.items():
+                queryset = model.objects.exclude(
+                    **{field_name: ''},
+                ).exclude(
+                    **{field_name: None},
+                ).only(
+                    'pk', field_name, renditions_field,
+                )
+                for instance in queryset.iterator():
+                    enqueue_renditions(instance, field_name, renditions_field)
@@ -0,0 +1,113 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+
+from .constants import (
+    BLOB_NAME_MAX_LENGTH,
+    IMAGE_JOB_FIELD_NAME_MAX_LENGTH,
+    IMAGE_JOB_SOURCE_MAX_LENGTH,
+    IMAGE_JOB_STATUS_MAX_LENGTH,
+)
+
+
+class ImageJob(models.Model):
+    """
+    Модель задачи на построение уменьшенных копий изображения.
+    Для каждого поля изображения объекта хранится одна задача,
+    при загрузке нового изображения она снова ставится в очередь
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        PROCESSING = 'processing', 'Обрабатывается'
+        DONE = 'done', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        verbose_name='Тип объекта',
+    )
+    object_id = models.PositiveBigIntegerField(
+        verbose_name='Идентификатор объекта',
+    )
+    field_name = models.CharField(
+        max_length=IMAGE_JOB_FIELD_NAME_MAX_LENGTH,
+        verbose_name='Поле изображения',
+    )
+    source = models.CharField(
+        max_length=IMAGE_JOB_SOURCE_MAX_LENGTH,
+        verbose_name='Исходный файл',
+    )
+    status = models.CharField(
+        max_length=IMAGE_JOB_STATUS_MAX_LENGTH,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name='Статус',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Число попыток',
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка',
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Время изменения',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_type', 'object_id', 'field_name'],
+                name='unique_image_job',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['status', 'updated_at'],
+                name='image_job_status_idx',
+            ),
+        ]
+        verbose_name = 'Обработка изображения'
+        verbose_name_plural = 'Обработка изображений'
+
+    def __str__(self) -> str:
+        return f'{self.source} ({self.get_status_display()})'
+
+
+class MediaBlob(models.Model):
+    """
+    Модель файла хранилища ContentAddressedStorage.
+    Одинаковые файлы хранятся один раз, references - число ссылок
+    на файл. Файлы без ссылок удаляет команда gc_media
+    """
+    name = models.CharField(
+        max_length=BLOB_NAME_MAX_LENGTH,
+        unique=True,
+        verbose_name='Имя файла',
+    )
+    size = models.PositiveBigIntegerField(
+        verbose_name='Размер',
+    )
+    references = models.IntegerField(
+        default=0,
+        verbose_name='Число ссылок',
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Время изменения',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['references', 'updated_at'],
+                name='media_blob_references_idx',
+            ),
+        ]
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self) -> str:
+        return self.name
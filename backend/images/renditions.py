@@ -0,0 +1,260 @@
+import traceback
+from datetime import timedelta
+from functools import cache
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from .constants import RENDITIONS_DIR
+from .models import ImageJob
+
+
+# Отправляется после сохранения уменьшенных копий изображения объекта.
+# Аргументы: instance_id - идентификатор объекта
+renditions_ready = Signal()
+
+# {модель: {поле изображения: поле с уменьшенными копиями}}
+IMAGE_FIELDS = {}
+
+
+def register_image_field(model, field_name, renditions_field):
+    """
+    Регистрация поля изображения, для которого строятся уменьшенные копии
+    """
+    IMAGE_FIELDS.setdefault(model, {})[field_name] = renditions_field
+
+
+@cache
+def available_formats():
+    """
+    Форматы из IMAGE_RENDITION_FORMATS, которые поддерживает
+    установленная сборка Pillow
+    """
+    return tuple(
+        image_format for image_format in settings.IMAGE_RENDITION_FORMATS
+        if features.check(image_format)
+    )
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def render_renditions(storage, source):
+    """
+    Построение уменьшенных копий изображения source для каждой ширины
+    из IMAGE_RENDITION_SIZES в каждом доступном формате.
+    Изображение поворачивается согласно EXIF, сами метаданные в копии
+    не переносятся. Копии не бывают больше исходного изображения,
+    копии одинакового размера сохраняются один раз
+    """
+    with storage.open(source, 'rb') as file, Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if has_alpha(image) else 'RGB')
+    base_name = PurePosixPath(RENDITIONS_DIR, source)
+    renditions = {'source': source}
+    saved = {}
+    for name, width in settings.IMAGE_RENDITION_SIZES.items():
+        if image.width > width:
+            size = (width, max(1, round(image.height * width / image.width)))
+        else:
+            size = image.size
+        if size not in saved:
+            copy = image if size == image.size else image.resize(
+                size, Image.Resampling.LANCZOS,
+            )
+            saved[size] = {'width': size[0], 'height': size[1]}
+            for image_format in available_formats():
+                buffer = BytesIO()
+                copy.save(
+                    buffer,
+                    image_format.upper(),
+                    quality=settings.IMAGE_RENDITION_QUALITY,
+                )
+                saved[size][image_format] = storage.save(
+                    f'{base_name}/{name}.{image_format}',
+                    ContentFile(buffer.getvalue()),
+                )
+        renditions[name] = saved[size]
+    return renditions
+
+
+def rendition_files(renditions):
+    return {
+        path
+        for name, rendition in (renditions or {}).items()
+        if name != 'source'
+        for key, path in rendition.items()
+        if key not in ('width', 'height')
+    }
+
+
+def delete_renditions(storage, renditions):
+    for path in rendition_files(renditions):
+        storage.delete(path)
+
+
+def enqueue_renditions(instance, field_name, renditions_field):
+    """
+    Постановка изображения объекта в очередь на обработку.
+    Если изображение удалено, удаляются и его уменьшенные копии
+    """
+    file = getattr(instance, field_name)
+    renditions = getattr(instance, renditions_field) or {}
+    if file and renditions.get('source') == file.name:
+        return
+    model = type(instance)
+    key = {
+        'content_type': ContentType.objects.get_for_model(model),
+        'object_id': instance.pk,
+        'field_name': field_name,
+    }
+    if not file:
+        if renditions:
+            model.objects.filter(pk=instance.pk).update(
+                **{renditions_field: {}},
+            )
+            delete_renditions(file.storage, renditions)
+        ImageJob.objects.filter(**key).delete()
+        return
+    if ImageJob.objects.filter(
+        **key,
+    ).filter(
+        source=file.name,
+    ).exclude(
+        status=ImageJob.Status.FAILED,
+    ).exists():
+        return
+    ImageJob.objects.update_or_create(
+        **key,
+        defaults={
+            'source': file.name,
+            'status': ImageJob.Status.PENDING,
+            'attempts': 0,
+            'error': '',
+        },
+    )
+
+
+def bulk_enqueue_renditions(model, field_name, instances):
+    """
+    Постановка в очередь изображений новых объектов одним запросом,
+    например после bulk_create, при котором post_save не отправляется
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    ImageJob.objects.bulk_create(
+        [
+            ImageJob(
+                content_type=content_type,
+                object_id=instance.pk,
+                field_name=field_name,
+                source=getattr(instance, field_name).name,
+            )
+            for instance in instances
+            if getattr(instance, field_name)
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def claim_jobs(limit):
+    """
+    Выбор задач из очереди. Задачи, взятые другими обработчиками,
+    пропускаются без ожидания блокировки
+    """
+    with transaction.atomic():
+        jobs = list(
+            ImageJob.objects.select_for_update(
+                skip_locked=True,
+            ).filter(
+                status=ImageJob.Status.PENDING,
+            ).order_by(
+                'updated_at',
+            )[:limit]
+        )
+        ImageJob.objects.filter(
+            pk__in=[job.pk for job in jobs],
+        ).update(
+            status=ImageJob.Status.PROCESSING,
+            attempts=F('attempts') + 1,
+            updated_at=timezone.now(),
+        )
+    return jobs
+
+
+def requeue_stale_jobs():
+    """
+    Возврат в очередь задач, обработка которых не завершилась
+    за IMAGE_JOB_TIMEOUT секунд (например, из-за остановки обработчика)
+    """
+    return ImageJob.objects.filter(
+        status=ImageJob.Status.PROCESSING,
+        updated_at__lt=timezone.now() - timedelta(
+            seconds=settings.IMAGE_JOB_TIMEOUT,
+        ),
+    ).update(
+        status=ImageJob.Status.PENDING,
+    )
+
+
+def process_job(job):
+    """
+    Построение уменьшенных копий изображения из задачи.
+    Копии сохраняются, только если изображение объекта за время обработки
+    не изменилось, старые копии после этого удаляются
+    """
+    model = ContentType.objects.get_for_id(job.content_type_id).model_class()
+    renditions_field = IMAGE_FIELDS[model][job.field_name]
+    storage = model._meta.get_field(job.field_name).storage
+    current = model.objects.filter(
+        pk=job.object_id,
+    ).values(
+        job.field_name, renditions_field,
+    ).first()
+    if current is None or current[job.field_name] != job.source:
+        return False
+    renditions = render_renditions(storage, job.source)
+    updated = model.objects.filter(
+        pk=job.object_id,
+        **{job.field_name: job.source},
+    ).update(
+        **{renditions_field: renditions},
+    )
+    if not updated:
+        delete_renditions(storage, renditions)
+        return False
+    delete_renditions(storage, current[renditions_field])
+    renditions_ready.send(sender=model, instance_id=job.object_id)
+    return True
+
+
+def finish_job(job, error=None):
+    """
+    Завершение задачи. Если изображение за время обработки заменили,
+    задача уже снова стоит в очереди и не изменяется
+    """
+    if error is None:
+        status, message = ImageJob.Status.DONE, ''
+    else:
+        status = ImageJob.Status.PENDING
+        if job.attempts + 1 >= settings.IMAGE_JOB_MAX_ATTEMPTS:
+            status = ImageJob.Status.FAILED
+        message = ''.join(traceback.format_exception(error))
+    ImageJob.objects.filter(
+        pk=job.pk,
+        source=job.source,
+        status=ImageJob.Status.PROCESSING,
+    ).update(
+        status=status,
+        error=message,
+    )
@@ -0,0 +1,83 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import ImageJob
+from .renditions import (
+    enqueue_renditions,
+    delete_renditions,
+    IMAGE_FIELDS,
+)
+
+
+def changed_image_fields(sender, update_fields):
+    return [
+        field_name for field_name in IMAGE_FIELDS[sender]
+        if update_fields is None or field_name in update_fields
+    ]
+
+
+@receiver(pre_save)
+def remember_stored_images(sender, instance, raw=False, update_fields=None,
+                           **kwargs):
+    """
+    Запоминание сохраненных в базе изображений объекта, чтобы после
+    замены изображения удалить ссылку на старый файл. Повторная загрузка
+    того же файла тоже добавляет ссылку, поэтому старая ссылка
+    удаляется и в этом случае
+    """
+    if raw or sender not in IMAGE_FIELDS or instance.pk is None:
+        return
+    field_names = changed_image_fields(sender, update_fields)
+    if not field_names:
+        return
+    stored = sender.objects.filter(
+        pk=instance.pk,
+    ).values(
+        *field_names,
+    ).first() or {}
+    instance._stored_images = {
+        field_name: (name, not getattr(instance, field_name)._committed)
+        for field_name, name in stored.items()
+        if name
+    }
+
+
+@receiver(post_save)
+def enqueue_image_renditions(sender, instance, raw=False, update_fields=None,
+                             **kwargs):
+    """
+    Постановка в очередь изображений зарегистрированных моделей
+    и удаление ссылок на замененные изображения
+    """
+    if raw or sender not in IMAGE_FIELDS:
+        return
+    stored = instance.__dict__.pop('_stored_images', {})
+    for field_name in changed_image_fields(sender, update_fields):
+        file = getattr(instance, field_name)
+        if field_name in stored:
+            name, uploaded = stored[field_name]
+            if uploaded or name != file.name:
+                file.storage.delete(name)
+        enqueue_renditions(
+            instance, field_name, IMAGE_FIELDS[sender][field_name],
+        )
+
+
+@receiver(post_delete)
+def delete_image_renditions(sender, instance, **kwargs):
+    """
+    Удаление изображений, их уменьшенных копий и задач обработки
+    при удалении объекта
+    """
+    if sender not in IMAGE_FIELDS:
+        return
+    for field_name, renditions_field in IMAGE_FIELDS[sender].items():
+        file = getattr(instance, field_name)
+        if file:
+            file.storage.delete(file.name)
+        delete_renditions(file.storage, getattr(instance, renditions_field))
+    ImageJob.objects.filter(
+        content_type=ContentType.objects.get_for_model(sender),
+        object_id=instance.pk,
+    ).delete()
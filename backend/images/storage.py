@@ -0,0 +1,117 @@
+import hashlib
+import os
+import tempfile
+from pathlib import PurePosixPath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .constants import (
+    BLOB_FANOUT_LEVELS,
+    BLOB_FANOUT_WIDTH,
+    BLOBS_DIR,
+)
+
+
+def blob_name(digest, extension):
+    """
+    Имя файла по хешу содержимого: blobs/ab/cd/abcd...ext
+    """
+    parts = [
+        digest[level * BLOB_FANOUT_WIDTH:(level + 1) * BLOB_FANOUT_WIDTH]
+        for level in range(BLOB_FANOUT_LEVELS)
+    ]
+    return str(PurePosixPath(BLOBS_DIR, *parts, f'{digest}{extension}'))
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(f'{BLOBS_DIR}/')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище, в котором файлы называются по хешу SHA-256
+    содержимого. Одинаковые файлы хранятся один раз и не меняются,
+    поэтому их можно кешировать бессрочно.
+    Каждое сохранение добавляет ссылку на файл, а delete удаляет ссылку.
+    Сами файлы без ссылок удаляет команда gc_media. Файлы, сохраненные
+    до появления хранилища, delete не затрагивает
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        directory = self.path(BLOBS_DIR)
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    size += len(chunk)
+                    temp_file.write(chunk)
+            name = blob_name(
+                digest.hexdigest(), PurePosixPath(name).suffix.lower(),
+            )
+            self.acquire(name, size)
+            full_path = self.path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.chmod(temp_path, self.file_permissions_mode or 0o644)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return name
+
+    def delete(self, name):
+        if not name:
+            raise ValueError('The name must be given to delete().')
+        self.release(name)
+
+    def purge(self, name):
+        """
+        Удаление файла с диска
+        """
+        super().delete(name)
+
+    @staticmethod
+    def acquire(name, size):
+        """
+        Добавление ссылки на файл. Выполняется до записи файла на место,
+        чтобы gc_media не удалил файл, который сохраняется прямо сейчас.
+        Ссылка добавляется в транзакции вызывающего кода и отменяется
+        вместе с ней, если сохранение объекта не удалось, поэтому
+        объекты с загружаемыми файлами сохраняются в transaction.atomic.
+        Файл, запись о котором отменена, находит gc_media --recount
+        """
+        from .models import MediaBlob
+
+        with transaction.atomic():
+            blobs = MediaBlob.objects.select_for_update()
+            blob, created = blobs.get_or_create(
+                name=name,
+                defaults={'size': size, 'references': 1},
+            )
+            if not created:
+                MediaBlob.objects.filter(pk=blob.pk).update(
+                    references=F('references') + 1,
+                    updated_at=timezone.now(),
+                )
+
+    @staticmethod
+    def release(name):
+        from .models import MediaBlob
+
+        if is_blob(name):
+            MediaBlob.objects.filter(name=name).update(
+                references=F('references') - 1,
+                updated_at=timezone.now(),
+            )
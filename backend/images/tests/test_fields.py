@@ -0,0 +1,95 @@
+import os
+import tracemalloc
+from base64 import b64encode
+from io import BytesIO
+
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from images.fields import Base64ImageStreamField
+
+IMAGE_SIDE = 2000
+MEMORY_LIMIT = 1024 * 1024
+BOMB_SIDE = 20000
+
+
+def encode_image(image, image_format='PNG'):
+    buffer = BytesIO()
+    image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def data_uri(content):
+    return 'data:image/png;base64,' + b64encode(content).decode()
+
+
+@override_settings(IMAGE_UPLOAD_SPOOL_SIZE=64 * 1024)
+class Base64ImageStreamFieldTests(SimpleTestCase):
+    """
+    Загрузка изображения в base64: декодирование порциями, переносы
+    строк и отклонение слишком больших файлов и изображений
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Шум почти не сжимается, поэтому PNG весит около 4 МБ
+        cls.content = encode_image(Image.frombytes(
+            'L', (IMAGE_SIDE, IMAGE_SIDE), os.urandom(IMAGE_SIDE ** 2),
+        ))
+        cls.data = data_uri(cls.content)
+
+    def decode(self, data):
+        file = Base64ImageStreamField().to_internal_value(data)
+        self.addCleanup(file.close)
+        return file
+
+    def assert_fails(self, data, code):
+        with self.assertRaises(ValidationError) as context:
+            self.decode(data)
+        self.assertEqual(context.exception.detail[0].code, code)
+
+    def test_decodes_image(self):
+        file = self.decode(self.data)
+        self.assertEqual(file.size, len(self.content))
+        self.assertTrue(file.name.endswith('.png'))
+        self.assertEqual(file.read(), self.content)
+
+    def test_accepts_line_wrapped_base64(self):
+        encoded = b64encode(self.content).decode()
+        wrapped = '\r\n'.join(
+            encoded[position:position + 76]
+            for position in range(0, len(encoded), 76)
+        )
+        file = self.decode('data:image/png;base64,' + wrapped)
+        self.assertEqual(file.size, len(self.content))
+        self.assertEqual(file.read(), self.content)
+
+    def test_peak_memory_does_not_depend_on_image_size(self):
+        tracemalloc.start()
+        try:
+            self.decode(self.data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, MEMORY_LIMIT)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=1024 * 1024)
+    def test_rejects_oversize_before_decoding(self):
+        # Строка не является base64: отказ по длине до декодирования
+        self.assert_fails('!' * 2 * 1024 * 1024, 'too_large')
+        self.assert_fails(self.data, 'too_large')
+
+    def test_rejects_decompression_bomb(self):
+        # Несколько десятков килобайт PNG, 400 миллионов пикселей
+        bomb = encode_image(Image.new('1', (BOMB_SIDE, BOMB_SIDE)))
+        self.assertLess(len(bomb), MEMORY_LIMIT)
+        self.assert_fails(data_uri(bomb), 'too_many_pixels')
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=IMAGE_SIDE ** 2 - 1)
+    def test_rejects_too_many_pixels(self):
+        self.assert_fails(self.data, 'too_many_pixels')
+
+    def test_rejects_invalid_base64(self):
+        self.assert_fails('data:image/png;base64,@@@@', 'invalid_image')
@@ -0,0 +1,65 @@
+from base64 import b64encode
+
+from django.db import DatabaseError
+from django.db.models.signals import post_save
+from django.test import TransactionTestCase
+
+from benchmarks.dataset import image_bytes
+from images.models import MediaBlob
+from recipes.models import Recipe
+from recipes.tests.factories import (
+    TemporaryMediaMixin,
+    auth_client,
+    create_ingredients,
+    create_user,
+)
+
+IMAGE = 'data:image/png;base64,' + b64encode(image_bytes()).decode()
+
+
+def fail_save(sender, **kwargs):
+    raise DatabaseError('Сохранение не удалось')
+
+
+class ReferenceRollbackTests(TemporaryMediaMixin, TransactionTestCase):
+    """
+    Ссылка на загруженный файл не остается, если объект
+    не удалось сохранить
+    """
+
+    def setUp(self):
+        self.user = create_user('author')
+        self.client = auth_client(self.user)
+
+    def fail_saves(self, model):
+        post_save.connect(fail_save, sender=model)
+        self.addCleanup(post_save.disconnect, fail_save, sender=model)
+
+    def assert_no_references(self):
+        self.assertFalse(
+            MediaBlob.objects.filter(references__gt=0).exists(),
+        )
+
+    def test_recipe(self):
+        ingredient, = create_ingredients(1)
+        self.fail_saves(Recipe)
+        with self.assertRaises(DatabaseError):
+            self.client.post('/api/recipes/', {
+                'name': 'Рецепт',
+                'text': 'Описание',
+                'cooking_time': 10,
+                'image': IMAGE,
+                'ingredients': [{'id': ingredient.pk, 'amount': 10}],
+            }, format='json')
+        self.assertFalse(Recipe.objects.exists())
+        self.assert_no_references()
+
+    def test_avatar(self):
+        self.fail_saves(type(self.user))
+        with self.assertRaises(DatabaseError):
+            self.client.put(
+                '/api/users/me/avatar/', {'avatar': IMAGE}, format='json',
+            )
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.avatar)
+        self.assert_no_references()
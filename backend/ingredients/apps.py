@@ -5,3 +5,11 @@ class IngredientsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ingredients'
     verbose_name = 'Ингредиенты'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import signals  # noqa: F401
+        from .search import ingredient_index
+
+        ingredient_index.ttl = settings.INGREDIENT_SEARCH_INDEX_TTL
@@ -1,3 +1,4 @@
-INGREDIENT_NAME_MAX_LENGTH = 32
-INGREDIENT_MEASURE_UNIT_MAX_LENGTH = 8
+INGREDIENT_NAME_MAX_LENGTH = 128
+INGREDIENT_MEASURE_UNIT_MAX_LENGTH = 64
 INGREDIENT_MIN_VALUE = 1
+INGREDIENT_IMPORT_BATCH_SIZE = 5000
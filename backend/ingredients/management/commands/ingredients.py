@@ -0,0 +1,197 @@
+import csv
+import io
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from ingredients.constants import (
+    INGREDIENT_MEASURE_UNIT_MAX_LENGTH,
+    INGREDIENT_IMPORT_BATCH_SIZE,
+    INGREDIENT_NAME_MAX_LENGTH,
+)
+from ingredients.models import Ingredient
+from ingredients.search import ingredient_index
+
+
+JSON_READ_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    """
+    Чтение строк вида "название,единица измерения"
+    """
+    for row in csv.reader(file):
+        if len(row) >= 2:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    """
+    Потоковое чтение JSON-массива объектов
+    {"name": ..., "measurement_unit": ...} без загрузки файла целиком
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != '[':
+                raise CommandError('Ожидается JSON-массив ингредиентов')
+            started = True
+            position += 1
+            continue
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                if buffer[position:].strip():
+                    raise CommandError('Некорректный JSON-файл')
+                return
+            chunk = file.read(JSON_READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        position = end
+        yield item.get('name', ''), item.get('measurement_unit', '')
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
+
+class Command(BaseCommand):
+    """
+    Команда загрузки ингредиентов из CSV- или JSON-файла.
+    Повторный запуск не создает дубликатов
+    """
+    help = 'Загружает ингредиенты из CSV- или JSON-файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=Path)
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help='Формат файла (по умолчанию определяется по расширению)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=INGREDIENT_IMPORT_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Загружать через COPY во временную таблицу (PostgreSQL)',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        use_copy = options['copy']
+        if use_copy and connection.vendor != 'postgresql':
+            self.stderr.write(
+                'COPY доступен только в PostgreSQL, '
+                'используется bulk_create'
+            )
+            use_copy = False
+
+        started = time.perf_counter()
+        count_before = Ingredient.objects.count()
+        self.read = self.skipped = 0
+        try:
+            with path.open(encoding='utf-8', newline='') as file:
+                rows = self.clean(READERS[file_format](file))
+                with transaction.atomic():
+                    if use_copy:
+                        self.copy(rows, options['batch_size'])
+                    else:
+                        self.bulk_create(rows, options['batch_size'])
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать файл: {error}')
+        ingredient_index.invalidate()
+        elapsed = time.perf_counter() - started
+        created = Ingredient.objects.count() - count_before
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {self.read}, добавлено: {created}, '
+            f'пропущено: {self.skipped}, время: {elapsed:.2f} с, '
+            f'{self.read / elapsed if elapsed else 0:.0f} строк/с'
+        ))
+
+    def clean(self, rows):
+        """
+        Нормализация строк, отбрасывание некорректных строк
+        и повторов внутри файла
+        """
+        seen = set()
+        for name, measurement_unit in rows:
+            self.read += 1
+            name = str(name).strip()
+            measurement_unit = str(measurement_unit).strip()
+            key = (name, measurement_unit)
+            if (
+                not name or not measurement_unit
+                or len(name) > INGREDIENT_NAME_MAX_LENGTH
+                or len(measurement_unit) > INGREDIENT_MEASURE_UNIT_MAX_LENGTH
+                or key in seen
+            ):
+                self.skipped += 1
+                continue
+            seen.add(key)
+            yield key
+
+    def batches(self, rows, batch_size):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def bulk_create(self, rows, batch_size):
+        for batch in self.batches(rows, batch_size):
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in batch
+                ],
+                ignore_conflicts=True,
+            )
+
+    def copy(self, rows, batch_size):
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE ingredients_import '
+                '(name text, measurement_unit text) ON COMMIT DROP'
+            )
+            for batch in self.batches(rows, batch_size):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY ingredients_import (name, measurement_unit) '
+                    'FROM STDIN WITH (FORMAT csv)',
+                    buffer,
+                )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT name, measurement_unit FROM ingredients_import '
+                'ON CONFLICT ON CONSTRAINT unique_name_mu DO NOTHING'
+            )
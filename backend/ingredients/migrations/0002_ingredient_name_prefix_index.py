@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+def create_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS ingredient_name_upper_prefix_idx '
+        'ON ingredients_ingredient (UPPER(name::text) text_pattern_ops)'
+    )
+
+
+def drop_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'DROP INDEX IF EXISTS ingredient_name_upper_prefix_idx'
+    )
+
+
+class Migration(migrations.Migration):
+    """
+    Индекс для поиска ингредиентов по началу названия без учета регистра.
+    Lookup istartswith в PostgreSQL строится как
+    UPPER(name::text) LIKE UPPER('x%'), поэтому индекс строится по тому же
+    выражению с классом операторов text_pattern_ops
+    """
+
+    dependencies = [
+        ('ingredients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_prefix_index,
+            drop_prefix_index,
+        ),
+    ]
@@ -0,0 +1,71 @@
+import threading
+import time
+from bisect import bisect_left
+
+from .models import Ingredient
+
+
+class IngredientSearchIndex:
+    """
+    Индекс ингредиентов в памяти процесса для поиска по началу названия.
+    Хранит отсортированный по названию список ингредиентов, поиск
+    выполняется двоичным поиском без обращения к БД.
+    Индекс сбрасывается сигналами при изменении ингредиентов в текущем
+    процессе и перестраивается не реже, чем раз в ttl секунд
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._keys = []
+        self._rows = []
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._built_at = None
+
+    def is_stale(self):
+        if self._built_at is None:
+            return True
+        if self.ttl is None:
+            return False
+        return time.monotonic() - self._built_at > self.ttl
+
+    @staticmethod
+    def get_queryset():
+        return Ingredient.objects.values('id', 'name', 'measurement_unit')
+
+    def build(self):
+        self.load(self.get_queryset())
+
+    def load(self, rows):
+        rows = sorted(
+            rows, key=lambda row: (row['name'].lower(), row['id']),
+        )
+        with self._lock:
+            self._rows = rows
+            self._keys = [row['name'].lower() for row in rows]
+            self._built_at = time.monotonic()
+
+    def search(self, prefix, limit=None):
+        """
+        Функция поиска ингредиентов, название которых начинается с prefix
+        """
+        if self.is_stale():
+            self.build()
+        return self.find(prefix, limit)
+
+    def find(self, prefix, limit=None):
+        keys, rows = self._keys, self._rows
+        prefix = prefix.lower()
+        result = []
+        for index in range(bisect_left(keys, prefix), len(keys)):
+            if not keys[index].startswith(prefix):
+                break
+            result.append(rows[index])
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+
+
+ingredient_index = IngredientSearchIndex()
@@ -2,16 +2,18 @@ from rest_framework.serializers import (
     ModelSerializer,
     IntegerField,
     Serializer,
+    ListSerializer,
     PrimaryKeyRelatedField,
     ReadOnlyField,
 )
 
+from monitoring.serializers import TimedSerializerMixin
 from .models import Ingredient
 from .constants import INGREDIENT_MIN_VALUE
 from recipes.models import RecipeIngredient
 
 
-class IngredientSerializer(ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, ModelSerializer):
     """
     Сериализатор для получения списка ингредиентов и получения
     отдельного ингредиента
@@ -51,6 +53,48 @@ class IngredientForRecipeSerializer(ModelSerializer):
         )
 
 
+class IngredientIdField(PrimaryKeyRelatedField):
+    """
+    Поле идентификатора ингредиента. Ингредиент берется из загруженных
+    заранее списком ингредиентов рецепта, а без списка - из БД
+    """
+
+    def to_internal_value(self, data):
+        loaded = getattr(self.parent, 'loaded', None)
+        if loaded is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in loaded:
+            self.fail('does_not_exist', pk_value=data)
+        return loaded[pk]
+
+
+class IngredientPatchListSerializer(ListSerializer):
+    """
+    Список ингредиентов рецепта: все ингредиенты загружаются одним
+    запросом, а не отдельным запросом для каждого
+    """
+
+    def to_internal_value(self, data):
+        ids = []
+        if isinstance(data, list):
+            for item in data:
+                try:
+                    ids.append(int(item['id']))
+                except (KeyError, TypeError, ValueError):
+                    continue
+        self.child.loaded = Ingredient.objects.in_bulk(ids)
+        try:
+            return super().to_internal_value(data)
+        finally:
+            self.child.loaded = None
+
+
 class IngredientPatchSerializer(Serializer):
     """
     Сериализатор для методов "post" и "patch" вюьсета рецептов.
@@ -62,10 +106,13 @@ class IngredientPatchSerializer(Serializer):
             f'быть меньше {INGREDIENT_MIN_VALUE}'
         }
     )
-    id = PrimaryKeyRelatedField(
+    id = IngredientIdField(
         queryset=Ingredient.objects.all()
     )
 
+    class Meta:
+        list_serializer_class = IngredientPatchListSerializer
+
     def to_internal_value(self, data):
         """
         Переопределяем метод "to_internal_value"
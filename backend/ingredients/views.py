@@ -1,9 +1,12 @@
+from django.conf import settings
 from rest_framework import viewsets, mixins
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 
 from .serializers import IngredientSerializer
 from .models import Ingredient
 from .filters import IngredientFilter
+from .search import ingredient_index
 
 
 class IngredientListViewSet(viewsets.GenericViewSet,
@@ -21,3 +24,19 @@ class IngredientListViewSet(viewsets.GenericViewSet,
     filter_backends = (IngredientFilter,)
     search_fields = ('^name',)
     pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        """
+        Поиск по началу названия выполняется по индексу в памяти процесса,
+        без обращения к БД. Число результатов ограничено настройкой
+        INGREDIENT_SEARCH_LIMIT
+        """
+        name = request.query_params.get(IngredientFilter.search_param)
+        if not name:
+            return super().list(request, *args, **kwargs)
+        return Response(
+            ingredient_index.search(
+                name,
+                limit=settings.INGREDIENT_SEARCH_LIMIT,
+            )
+        )
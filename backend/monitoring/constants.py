@@ -0,0 +1,18 @@
+# Границы корзин гистограмм: время в секундах и число запросов к БД
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+# Метка маршрута для запросов, не подошедших ни к одному маршруту
+UNMATCHED_ROUTE = 'unmatched'
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Виды найденных проблем с запросами к БД: повторяющийся в одном
+# запросе шаблон SQL и медленный запрос
+DUPLICATE_QUERY = 'duplicate'
+SLOW_QUERY = 'slow'
+# Число кадров стека проекта, сохраняемых для найденного запроса
+QUERY_STACK_LIMIT = 8
+# Размер кеша шаблонов SQL
+QUERY_TEMPLATE_CACHE_SIZE = 1024
+# Число шаблонов SQL на маршрут, хранимых в сводке найденных проблем
+QUERY_FINDINGS_PER_ROUTE = 20
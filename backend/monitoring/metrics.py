@@ -0,0 +1,306 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from .constants import (
+    DURATION_BUCKETS,
+    DUPLICATE_QUERY,
+    QUERY_COUNT_BUCKETS,
+    QUERY_FINDINGS_PER_ROUTE,
+    SLOW_QUERY,
+)
+from .queries import QueryFinding, query_stack, sql_template
+
+
+# Замеры текущего запроса. Переменная контекста, а не атрибут
+# соединения: в асинхронных представлениях запросы к БД выполняются
+# в другом потоке, куда контекст копируется sync_to_async
+current_request = ContextVar('current_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Замеры одного запроса: число запросов к БД, время в БД, время
+    сериализации и время кодирования ответа в JSON в секундах
+    (время сериализации не включает запросы к БД, выполненные
+    сериализаторами), а также найденные проблемы
+    с запросами к БД: шаблоны SQL, выполненные не меньше
+    duplicate_threshold раз, и запросы не короче slow_threshold секунд.
+    По умолчанию пороги берутся из настроек DUPLICATE_QUERY_THRESHOLD
+    и SLOW_QUERY_THRESHOLD_MS
+    """
+    __slots__ = (
+        'started', 'queries', 'db_time', 'serialize_time', 'serializing',
+        'render_time', 'templates', 'duplicates', 'findings',
+        'duplicate_threshold', 'slow_threshold',
+    )
+
+    def __init__(self, duplicate_threshold=None, slow_threshold=None):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.serializing = False
+        self.render_time = 0.0
+        self.templates = {}
+        self.duplicates = {}
+        self.findings = []
+        self.duplicate_threshold = (
+            settings.DUPLICATE_QUERY_THRESHOLD
+            if duplicate_threshold is None else duplicate_threshold
+        )
+        self.slow_threshold = (
+            settings.SLOW_QUERY_THRESHOLD_MS / 1000
+            if slow_threshold is None else slow_threshold
+        )
+
+    def record_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        template = sql_template(sql)
+        count, total = self.templates.get(template, (0, 0.0))
+        count, total = count + 1, total + duration
+        self.templates[template] = count, total
+        if count >= self.duplicate_threshold:
+            finding = self.duplicates.get(template)
+            if finding is None:
+                finding = self.duplicates[template] = QueryFinding(
+                    DUPLICATE_QUERY, template, count, total, query_stack(),
+                )
+                self.findings.append(finding)
+            finding.count, finding.duration = count, total
+        if duration >= self.slow_threshold:
+            self.findings.append(QueryFinding(
+                SLOW_QUERY, template, 1, duration, query_stack(),
+            ))
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Обертка выполнения запросов к БД (connection.execute_wrapper),
+    которая учитывает запрос в замерах текущего запроса, если они ведутся
+    """
+    metrics = current_request.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - started)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Подключение обертки record_query к соединению с БД
+    (обработчик сигнала connection_created)
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def measure_serialize():
+    """
+    Учет времени сериализации в замерах текущего запроса. Вложенные
+    замеры (вложенные сериализаторы, элементы списка) не учитываются
+    повторно, а время запросов к БД внутри замера вычитается
+    """
+    metrics = current_request.get()
+    if metrics is None or metrics.serializing:
+        yield
+        return
+    metrics.serializing = True
+    db_time = metrics.db_time
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serialize_time += (
+            time.perf_counter() - started - (metrics.db_time - db_time)
+        )
+        metrics.serializing = False
+
+
+@contextmanager
+def measure_render():
+    metrics = current_request.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.render_time += time.perf_counter() - started
+
+
+class Histogram:
+    """
+    Гистограмма Prometheus: число значений в каждой корзине,
+    сумма и число значений
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+def format_labels(labels, **extra):
+    items = [*labels, *extra.items()]
+    return '{' + ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'),
+        )
+        for name, value in items
+    ) + '}'
+
+
+class MetricsRegistry:
+    """
+    Метрики процесса в памяти: гистограммы и счетчики с метками.
+    Отдаются в текстовом формате Prometheus
+    """
+
+    HISTOGRAMS = {
+        'http_request_duration_seconds': (
+            'Время обработки запроса', DURATION_BUCKETS,
+        ),
+        'http_request_db_seconds': (
+            'Время выполнения запросов к БД', DURATION_BUCKETS,
+        ),
+        'http_request_db_queries': (
+            'Число запросов к БД', QUERY_COUNT_BUCKETS,
+        ),
+        'http_request_serialize_seconds': (
+            'Время сериализации ответа без запросов к БД', DURATION_BUCKETS,
+        ),
+        'http_request_render_seconds': (
+            'Время кодирования ответа в JSON', DURATION_BUCKETS,
+        ),
+    }
+    COUNTERS = {
+        'http_requests_total': 'Число запросов',
+        'db_query_findings_total': (
+            'Число повторяющихся и медленных запросов к БД'
+        ),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {name: {} for name in self.HISTOGRAMS}
+        self._counters = {name: {} for name in self.COUNTERS}
+        self._findings = {}
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            histogram = self._histograms[name].get(labels)
+            if histogram is None:
+                histogram = self._histograms[name][labels] = Histogram(
+                    self.HISTOGRAMS[name][1],
+                )
+            histogram.observe(value)
+
+    def increment(self, name, labels, value=1):
+        with self._lock:
+            counters = self._counters[name]
+            counters[labels] = counters.get(labels, 0) + value
+
+    def observe_request(self, route, method, status, metrics, duration):
+        labels = (('route', route), ('method', method))
+        self.observe('http_request_duration_seconds', labels, duration)
+        self.observe('http_request_db_seconds', labels, metrics.db_time)
+        self.observe('http_request_db_queries', labels, metrics.queries)
+        self.observe('http_request_serialize_seconds', labels,
+                     metrics.serialize_time)
+        self.observe('http_request_render_seconds', labels,
+                     metrics.render_time)
+        self.increment('http_requests_total',
+                       labels + (('status', status),))
+
+    def observe_findings(self, route, method, findings):
+        """
+        Учет найденных проблем с запросами к БД в сводке по маршруту.
+        Возвращает проблемы, впервые найденные на этом маршруте
+        """
+        new = []
+        labels = (('route', route), ('method', method))
+        with self._lock:
+            route_findings = self._findings.setdefault(labels, {})
+            for finding in findings:
+                counters = self._counters['db_query_findings_total']
+                key = labels + (('kind', finding.kind),)
+                counters[key] = counters.get(key, 0) + 1
+                summary = route_findings.get((finding.kind, finding.template))
+                if summary is None:
+                    if len(route_findings) >= QUERY_FINDINGS_PER_ROUTE:
+                        continue
+                    summary = route_findings[
+                        finding.kind, finding.template
+                    ] = {**finding.as_dict(), 'requests': 0}
+                    new.append(finding)
+                summary['requests'] += 1
+                summary['count'] = max(summary['count'], finding.count)
+                summary['duration_ms'] = max(
+                    summary['duration_ms'],
+                    round(finding.duration * 1000, 2),
+                )
+        return new
+
+    def findings_report(self):
+        """
+        Сводка найденных проблем с запросами к БД по маршрутам:
+        сначала шаблоны SQL, найденные в большем числе запросов
+        """
+        with self._lock:
+            return {
+                f'{dict(labels)["method"]} {dict(labels)["route"]}': sorted(
+                    (dict(summary) for summary in route_findings.values()),
+                    key=lambda summary: -summary['requests'],
+                )
+                for labels, route_findings in self._findings.items()
+                if route_findings
+            }
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (description, buckets) in self.HISTOGRAMS.items():
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in self._histograms[name].items():
+                    total = 0
+                    for bound, count in zip(
+                        (*buckets, '+Inf'), histogram.counts,
+                    ):
+                        total += count
+                        lines.append(
+                            f'{name}_bucket'
+                            f'{format_labels(labels, le=bound)} {total}'
+                        )
+                    lines.append(
+                        f'{name}_sum{format_labels(labels)} {histogram.sum}'
+                    )
+                    lines.append(
+                        f'{name}_count{format_labels(labels)} {total}'
+                    )
+            for name, description in self.COUNTERS.items():
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} counter')
+                for labels, value in self._counters[name].items():
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,116 @@
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .constants import UNMATCHED_ROUTE
+from .metrics import RequestMetrics, current_request, registry
+
+
+logger = logging.getLogger('monitoring.requests')
+queries_logger = logging.getLogger('monitoring.queries')
+
+
+def route_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED_ROUTE
+    return match.route
+
+
+class RequestMetricsMiddleware:
+    """
+    Замеры запросов: для доли REQUEST_METRICS_SAMPLE_RATE запросов
+    считаются число запросов к БД, время в БД, время сериализации,
+    время кодирования ответа в JSON и общее время. Замеры попадают
+    в гистограммы по маршрутам (/metrics/), в строку журнала
+    monitoring.requests в формате JSON и, если включено
+    REQUEST_METRICS_SERVER_TIMING, в заголовок Server-Timing.
+    Повторяющиеся и медленные запросы к БД учитываются в сводке
+    по маршрутам (/metrics/queries/), а впервые найденные
+    на маршруте пишутся в журнал monitoring.queries вместе со стеком.
+    Для остальных запросов, а также если замеры уже ведутся
+    (query_budget в тестах), middleware ничего не делает.
+    Поддерживает синхронные и асинхронные обработчики
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.finish(request, response, metrics)
+
+    @staticmethod
+    def sampled():
+        if current_request.get() is not None:
+            return False
+        rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def finish(self, request, response, metrics):
+        duration = time.perf_counter() - metrics.started
+        route = route_label(request)
+        registry.observe_request(
+            route, request.method, response.status_code, metrics, duration,
+        )
+        logger.info(json.dumps({
+            'method': request.method,
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'queries': metrics.queries,
+            'serialize_ms': round(metrics.serialize_time * 1000, 2),
+            'render_ms': round(metrics.render_time * 1000, 2),
+            'query_findings': len(metrics.findings),
+        }, ensure_ascii=False))
+        if metrics.findings:
+            for finding in registry.observe_findings(
+                route, request.method, metrics.findings,
+            ):
+                queries_logger.warning(
+                    '%s %s: %s', request.method, route, finding,
+                )
+        if settings.REQUEST_METRICS_SERVER_TIMING:
+            app_time = (
+                duration - metrics.db_time - metrics.serialize_time
+                - metrics.render_time
+            )
+            response['Server-Timing'] = (
+                f'db;dur={metrics.db_time * 1000:.2f};'
+                f'desc="{metrics.queries} queries", '
+                f'serialize;dur={metrics.serialize_time * 1000:.2f}, '
+                f'render;dur={metrics.render_time * 1000:.2f}, '
+                f'app;dur={app_time * 1000:.2f}, '
+                f'total;dur={duration * 1000:.2f}'
+            )
+        return response
@@ -0,0 +1,104 @@
+import linecache
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+from .constants import (
+    DUPLICATE_QUERY,
+    QUERY_STACK_LIMIT,
+    QUERY_TEMPLATE_CACHE_SIZE,
+)
+
+
+MONITORING_DIR = str(Path(__file__).resolve().parent)
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+
+
+@lru_cache(maxsize=QUERY_TEMPLATE_CACHE_SIZE)
+def sql_template(sql):
+    """
+    Шаблон SQL: литералы заменены на ?, списки параметров IN (...)
+    любой длины свернуты, чтобы запросы, различающиеся только
+    значениями, имели один шаблон
+    """
+    sql = STRING_LITERAL.sub('?', sql)
+    sql = NUMBER_LITERAL.sub('?', sql)
+    return PLACEHOLDER_LIST.sub('(...)', sql)
+
+
+def query_stack():
+    """
+    Кадры стека кода проекта, из которого выполнен запрос к БД,
+    от внешнего к внутреннему: путь, строка, функция и текст строки.
+    Кадры Django, DRF и самого мониторинга пропускаются
+    """
+    project_dir = str(settings.BASE_DIR)
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < QUERY_STACK_LIMIT:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(project_dir)
+            and not filename.startswith(MONITORING_DIR)
+            and 'site-packages' not in filename
+        ):
+            frames.append((
+                filename[len(project_dir):].lstrip('/'),
+                frame.f_lineno,
+                frame.f_code.co_name,
+                linecache.getline(filename, frame.f_lineno).strip(),
+            ))
+        frame = frame.f_back
+    return frames[::-1]
+
+
+def format_stack(stack):
+    return '\n'.join(
+        f'  {path}:{lineno} в {name}\n    {line}'
+        for path, lineno, name, line in stack
+    )
+
+
+class QueryFinding:
+    """
+    Найденная проблема с запросом к БД в одном запросе к API:
+    шаблон SQL, выполненный count раз (для повторов) или выполнявшийся
+    duration секунд (для медленных запросов), и стек, из которого
+    он выполнен
+    """
+    __slots__ = ('kind', 'template', 'count', 'duration', 'stack')
+
+    def __init__(self, kind, template, count, duration, stack):
+        self.kind = kind
+        self.template = template
+        self.count = count
+        self.duration = duration
+        self.stack = stack
+
+    def __str__(self):
+        if self.kind == DUPLICATE_QUERY:
+            summary = f'повторяется {self.count} раз'
+        else:
+            summary = f'выполнялся {self.duration * 1000:.1f} мс'
+        return (
+            f'Запрос {summary}: {self.template}\n'
+            f'{format_stack(self.stack)}'
+        )
+
+    def as_dict(self):
+        return {
+            'kind': self.kind,
+            'template': self.template,
+            'count': self.count,
+            'duration_ms': round(self.duration * 1000, 2),
+            'stack': [
+                f'{path}:{lineno} {name}: {line}'
+                for path, lineno, name, line in self.stack
+            ],
+        }
@@ -0,0 +1,15 @@
+from rest_framework.renderers import JSONRenderer
+
+from .metrics import measure_render
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer, время работы которого учитывается в замерах запроса
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with measure_render():
+            return super().render(
+                data, accepted_media_type, renderer_context,
+            )
@@ -0,0 +1,13 @@
+from .metrics import measure_serialize
+
+
+class TimedSerializerMixin:
+    """
+    Примесь сериализатора, время to_representation которого
+    учитывается в замерах запроса. Для списка и вложенных
+    сериализаторов время учитывается один раз, во внешнем вызове
+    """
+
+    def to_representation(self, instance):
+        with measure_serialize():
+            return super().to_representation(instance)
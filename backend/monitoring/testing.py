@@ -0,0 +1,72 @@
+from contextlib import ContextDecorator
+
+from .constants import DUPLICATE_QUERY, SLOW_QUERY
+from .metrics import RequestMetrics, current_request
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Превышен бюджет запросов к БД
+    """
+
+
+class query_budget(ContextDecorator):
+    """
+    Бюджет запросов к БД для тестов и замеров: блок (или тест,
+    если используется как декоратор) не должен выполнить больше queries
+    запросов, один шаблон SQL - больше repeats раз, а один запрос -
+    выполняться дольше slow_ms миллисекунд. Не заданные ограничения
+    не проверяются. При превышении бюджета выбрасывается
+    QueryBudgetExceeded со списком нарушений и стеками, из которых
+    выполнены запросы. Учитываются и запросы асинхронных представлений.
+
+        with query_budget(queries=4, repeats=1):
+            client.get('/api/recipes/')
+    """
+
+    def __init__(self, queries=None, repeats=None, slow_ms=None):
+        self.queries = queries
+        self.repeats = repeats
+        self.slow_ms = slow_ms
+        self.metrics = None
+
+    def __enter__(self):
+        self.metrics = RequestMetrics(
+            duplicate_threshold=(
+                None if self.repeats is None else self.repeats + 1
+            ),
+            slow_threshold=(
+                None if self.slow_ms is None else self.slow_ms / 1000
+            ),
+        )
+        self._token = current_request.set(self.metrics)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        current_request.reset(self._token)
+        if exc_type is not None:
+            return False
+        violations = self.violations()
+        if violations:
+            raise QueryBudgetExceeded(
+                'Превышен бюджет запросов к БД:\n' + '\n'.join(violations)
+            )
+        return False
+
+    def violations(self):
+        violations = []
+        if self.queries is not None and self.metrics.queries > self.queries:
+            violations.append(
+                f'Запросов {self.metrics.queries}, '
+                f'допустимо {self.queries}'
+            )
+        checked = set()
+        if self.repeats is not None:
+            checked.add(DUPLICATE_QUERY)
+        if self.slow_ms is not None:
+            checked.add(SLOW_QUERY)
+        violations.extend(
+            str(finding) for finding in self.metrics.findings
+            if finding.kind in checked
+        )
+        return violations
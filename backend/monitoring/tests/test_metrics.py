@@ -0,0 +1,73 @@
+import json
+import re
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from monitoring.metrics import (
+    RequestMetrics,
+    current_request,
+    measure_serialize,
+)
+
+User = get_user_model()
+
+
+class MeasureSerializeTests(TestCase):
+    """
+    Учет времени сериализации в замерах запроса
+    """
+
+    def setUp(self):
+        self.metrics = RequestMetrics()
+        token = current_request.set(self.metrics)
+        self.addCleanup(current_request.reset, token)
+
+    def test_nested_counted_once(self):
+        with mock.patch(
+            'monitoring.metrics.time.perf_counter', side_effect=[2.0, 3.5],
+        ):
+            with measure_serialize():
+                with measure_serialize():
+                    pass
+        self.assertEqual(self.metrics.serialize_time, 1.5)
+        self.assertFalse(self.metrics.serializing)
+
+    def test_db_time_excluded(self):
+        with mock.patch(
+            'monitoring.metrics.time.perf_counter', side_effect=[2.0, 3.5],
+        ):
+            with measure_serialize():
+                self.metrics.db_time += 0.5
+        self.assertEqual(self.metrics.serialize_time, 1.0)
+
+
+@override_settings(
+    REQUEST_METRICS_SAMPLE_RATE=1, REQUEST_METRICS_SERVER_TIMING=True,
+)
+class ServerTimingTests(TestCase):
+    """
+    Время сериализации в заголовке Server-Timing
+    """
+
+    def test_serialize_timing(self):
+        User.objects.bulk_create(
+            User(
+                username=f'user{number}',
+                email=f'user{number}@example.com',
+                first_name='Имя',
+                last_name='Фамилия',
+            )
+            for number in range(10)
+        )
+        with self.assertLogs('monitoring.requests') as logs:
+            response = APIClient().get('/api/users/')
+        self.assertEqual(response.status_code, 200)
+        timing = re.search(
+            r'serialize;dur=([\d.]+)', response['Server-Timing'],
+        )
+        self.assertGreater(float(timing[1]), 0)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertGreater(record['serialize_ms'], 0)
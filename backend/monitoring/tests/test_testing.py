@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from monitoring.testing import QueryBudgetExceeded, query_budget
+
+User = get_user_model()
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Бюджет запросов к БД для тестов
+    """
+
+    def test_within_budget(self):
+        with query_budget(queries=2, repeats=1) as budget:
+            User.objects.exists()
+            list(User.objects.all())
+        self.assertEqual(budget.metrics.queries, 2)
+
+    def test_too_many_queries(self):
+        with self.assertRaises(QueryBudgetExceeded) as context:
+            with query_budget(queries=1):
+                User.objects.exists()
+                list(User.objects.all())
+        self.assertIn('Запросов 2, допустимо 1', str(context.exception))
+
+    def test_repeated_query(self):
+        with self.assertRaises(QueryBudgetExceeded) as context:
+            with query_budget(repeats=2):
+                for pk in range(3):
+                    User.objects.filter(pk=pk).exists()
+        self.assertIn('повторяется 3 раз', str(context.exception))
+
+    def test_decorator(self):
+        @query_budget(queries=0)
+        def no_queries():
+            return User.objects.none()
+
+        no_queries()
+
+        @query_budget(queries=0)
+        def one_query():
+            return User.objects.exists()
+
+        with self.assertRaises(QueryBudgetExceeded):
+            one_query()
+
+    def test_exception_inside_block_is_not_replaced(self):
+        with self.assertRaises(ZeroDivisionError):
+            with query_budget(queries=0):
+                User.objects.exists()
+                1 / 0
@@ -0,0 +1,21 @@
+from django.http import HttpResponse, JsonResponse
+
+from .constants import METRICS_CONTENT_TYPE
+from .metrics import registry
+
+
+def metrics(request):
+    """
+    Метрики процесса в текстовом формате Prometheus
+    """
+    return HttpResponse(registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+def query_findings(request):
+    """
+    Сводка повторяющихся и медленных запросов к БД по маршрутам
+    """
+    return JsonResponse(
+        registry.findings_report(),
+        json_dumps_params={'ensure_ascii': False, 'indent': 2},
+    )
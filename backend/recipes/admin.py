@@ -3,9 +3,11 @@ from django.contrib import admin
 from .models import (
     FavouriteUserRecipe,
     RecipeIngredient,
+    ShoppingListItem,
     ShoppingCart,
     Recipe,
 )
+from .signals import recipe_ingredients_changed
 
 
 class RecipeIngredientInline(admin.TabularInline):
@@ -22,7 +24,10 @@ class RecipeAdmin(admin.ModelAdmin):
         'author', 'name'
     ]
     list_display = [
-        'id', 'name', 'author', 'pub_date',
+        'id', 'name', 'author', 'pub_date', 'favorites_count',
+    ]
+    list_select_related = [
+        'author',
     ]
     list_display_links = [
         'id', 'name',
@@ -38,12 +43,33 @@ class RecipeAdmin(admin.ModelAdmin):
     inlines = [RecipeIngredientInline]
 
     def favourite_counter(self, obj) -> int:
-        return FavouriteUserRecipe.objects.filter(
-            recipe=obj
-        ).count()
+        return obj.favorites_count
 
     favourite_counter.short_description = 'Общее число добавлений в избранное'
 
+    def save_formset(self, request, form, formset, change):
+        """
+        При изменении ингредиентов рецепта обновляем списки покупок
+        """
+        if formset.model is not RecipeIngredient:
+            return super().save_formset(request, form, formset, change)
+        previous = dict(
+            RecipeIngredient.objects.filter(
+                recipe=form.instance,
+            ).values_list('ingredient_id', 'amount')
+        )
+        super().save_formset(request, form, formset, change)
+        recipe_ingredients_changed.send(
+            sender=Recipe,
+            recipe=form.instance,
+            previous=previous,
+            current=dict(
+                RecipeIngredient.objects.filter(
+                    recipe=form.instance,
+                ).values_list('ingredient_id', 'amount')
+            ),
+        )
+
 
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
@@ -87,3 +113,16 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     Админка для модели списка покупок пользователей
     """
     pass
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    """
+    Админка для модели готового списка покупок пользователей
+    """
+    list_display = [
+        'user', 'ingredient', 'total_amount',
+    ]
+    list_select_related = [
+        'user', 'ingredient',
+    ]
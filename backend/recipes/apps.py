@@ -5,3 +5,14 @@ class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
     verbose_name = 'Рецепты'
+
+    def ready(self):
+        from django.conf import settings
+
+        from images.renditions import register_image_field
+        from . import signals  # noqa: F401
+        from .matching import recipe_match_index
+        from .models import Recipe
+
+        register_image_field(Recipe, 'image', 'image_renditions')
+        recipe_match_index.ttl = settings.RECIPE_MATCH_INDEX_TTL
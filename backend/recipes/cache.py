@@ -0,0 +1,181 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils.cache import parse_etags
+
+from follows.models import Follow
+from .models import Recipe
+
+
+RECIPE_DETAIL_CACHE_PREFIX = 'recipe-detail'
+RECIPE_FEED_CACHE_PREFIX = 'recipe-feed'
+
+
+def bump_recipe_version(**filters):
+    """
+    Функция увеличения версии рецептов, подходящих под фильтры.
+    Закешированные ответы старых версий перестают использоваться
+    """
+    Recipe.objects.filter(**filters).update(version=F('version') + 1)
+
+
+def recipe_detail_cache_key(request, recipe_id, version):
+    """
+    Ключ кеша ответа рецепта. Ссылки на изображения абсолютные,
+    поэтому в ключ входит адрес сервера
+    """
+    return (
+        f'{RECIPE_DETAIL_CACHE_PREFIX}:{recipe_id}:{version}:'
+        f'{request.scheme}://{request.get_host()}'
+    )
+
+
+def get_recipe_detail(request, recipe_id, version):
+    return cache.get(recipe_detail_cache_key(request, recipe_id, version))
+
+
+def set_recipe_detail(request, recipe_id, version, data):
+    cache.set(
+        recipe_detail_cache_key(request, recipe_id, version),
+        data,
+        settings.RECIPE_DETAIL_CACHE_TIMEOUT,
+    )
+
+
+def recipe_etag(request, recipe_id, state, media_type):
+    """
+    Строгий ETag ответа рецепта: зависит от версии рецепта,
+    флагов текущего пользователя и формата ответа
+    """
+    value = ':'.join(
+        str(part) for part in (
+            recipe_id,
+            state['version'],
+            state['is_favorited'],
+            state['is_in_shopping_cart'],
+            state['author_is_subscribed'],
+            request.get_host(),
+            media_type,
+        )
+    )
+    return f'"{hashlib.md5(value.encode()).hexdigest()}"'
+
+
+def etag_matches(request, etag):
+    """
+    Проверка заголовка If-None-Match (сравнение без учета W/)
+    """
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = [
+        tag.removeprefix('W/') for tag in parse_etags(header)
+    ]
+    return '*' in etags or etag in etags
+
+
+def feed_generation_key(user_id):
+    return f'{RECIPE_FEED_CACHE_PREFIX}-generation:{user_id}'
+
+
+def author_feed_generation_key(author_id):
+    return f'{RECIPE_FEED_CACHE_PREFIX}-author-generation:{author_id}'
+
+
+def get_generations(keys):
+    """
+    Поколения из кеша по ключам. Отсутствующие поколения создаются:
+    после сброса ключа новое поколение отличается от прежнего
+    """
+    generations = cache.get_many(keys)
+    missing = {
+        key: time.time_ns() for key in keys if key not in generations
+    }
+    if missing:
+        cache.set_many(missing, None)
+        generations.update(missing)
+    return [generations[key] for key in keys]
+
+
+def feed_following(user_id, generation):
+    """
+    Авторы, на которых подписан пользователь. Изменение подписок
+    сбрасывает поколение ленты пользователя, поэтому список кешируется
+    вместе с ним
+    """
+    key = f'{RECIPE_FEED_CACHE_PREFIX}-following:{user_id}:{generation}'
+    author_ids = cache.get(key)
+    if author_ids is None:
+        author_ids = list(
+            Follow.objects.filter(
+                user_id=user_id,
+            ).order_by(
+                'following_id',
+            ).values_list(
+                'following_id', flat=True,
+            )
+        )
+        cache.set(key, author_ids, settings.RECIPE_FEED_CACHE_TIMEOUT)
+    return author_ids
+
+
+def get_feed_generation(user_id):
+    """
+    Поколение ленты пользователя для ключей закешированных страниц.
+    Собирается при чтении из поколения самого пользователя (подписки,
+    избранное, список покупок), общего поколения лент (ингредиенты)
+    и поколений авторов из подписок (их рецепты и профили). Изменения
+    автора сбрасывают один ключ, а не ленты всех его подписчиков;
+    старые страницы удаляются по истечении таймаута
+    """
+    user_generation, global_generation = get_generations([
+        feed_generation_key(user_id),
+        feed_generation_key('all'),
+    ])
+    author_ids = feed_following(user_id, user_generation)
+    generations = get_generations([
+        author_feed_generation_key(author_id) for author_id in author_ids
+    ])
+    value = ':'.join(
+        str(part) for part in (
+            user_generation, global_generation, *generations,
+        )
+    )
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def feed_cache_key(request, generation):
+    """
+    Ключ кеша страницы ленты: пользователь, поколение его ленты
+    и полный адрес запроса вместе с параметрами
+    """
+    return (
+        f'{RECIPE_FEED_CACHE_PREFIX}:{request.user.pk}:{generation}:'
+        f'{request.build_absolute_uri()}'
+    )
+
+
+def invalidate_feeds(user_ids):
+    """
+    Сброс закешированных лент пользователей
+    """
+    cache.delete_many([feed_generation_key(user_id) for user_id in user_ids])
+
+
+def invalidate_author_feeds(author_id):
+    """
+    Сброс закешированных лент подписчиков автора: сбрасывается только
+    поколение автора, ленты подписчиков проверяют его при чтении
+    """
+    cache.delete(author_feed_generation_key(author_id))
+
+
+def invalidate_all_feeds():
+    """
+    Сброс всех закешированных лент, например после изменения
+    ингредиента, который может входить в рецепты любых авторов
+    """
+    cache.delete(feed_generation_key('all'))
@@ -1,2 +1,26 @@
 RECIPE_NAME_MAX_LENGTH = 256
 COOKING_TIME_MIN_VALUE = 1
+SHOPPING_CART_FILENAME = 'shopping_cart_list'
+SHOPPING_CART_CHUNK_SIZE = 2000
+# Число строк списков покупок в одном запросе INSERT ... ON CONFLICT
+SHOPPING_LIST_UPSERT_BATCH_SIZE = 500
+POPULAR_ORDERING = ('-favorites_count', '-pub_date', '-id')
+# Конфигурация полнотекстового поиска PostgreSQL и размер порции
+# при пересчете поисковых векторов рецептов
+SEARCH_CONFIG = 'russian'
+SEARCH_UPDATE_BATCH_SIZE = 1000
+# Поиск без PostgreSQL: число учитываемых слов запроса
+# и вес совпадения слова в каждом из полей
+SEARCH_MAX_WORDS = 8
+SEARCH_FALLBACK_WEIGHTS = {
+    'name': 1.0,
+    'ingredients': 0.4,
+    'text': 0.2,
+}
+# Подбор рецептов по ингредиентам: размер порции при построении индекса
+# и максимальное число ингредиентов в запросе
+MATCH_INDEX_CHUNK_SIZE = 10000
+MATCH_MAX_INGREDIENTS = 100
+# Импорт рецептов: число рецептов, сохраняемых в одной транзакции
+RECIPE_IMPORT_CHUNK_SIZE = 200
+RECIPE_EXPORT_CHUNK_SIZE = 500
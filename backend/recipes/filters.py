@@ -1,9 +1,13 @@
 from django_filters.rest_framework import (
     NumberFilter,
+    ChoiceFilter,
+    CharFilter,
     FilterSet,
 )
 
 from recipes.models import Recipe
+from recipes.constants import POPULAR_ORDERING
+from recipes.search import search_recipes
 
 
 class RecipeFilter(FilterSet):
@@ -12,9 +16,19 @@ class RecipeFilter(FilterSet):
         - автор рецепта
         - находится ли рецепт в избранном
         - находится ли рецепт в списке покупок
+    поиск по названию, описанию и ингредиентам (?search=) с сортировкой
+    по релевантности и сортировку по популярности (?ordering=popular)
     """
+    # Фильтр по идентификатору автора без проверки его существования
+    # отдельным запросом
+    author = NumberFilter(field_name='author')
     is_favorited = NumberFilter(method='filter_by_is_favorited')
     is_in_shopping_cart = NumberFilter(method='filter_by_is_in_shopping_cart')
+    search = CharFilter(method='filter_by_search')
+    ordering = ChoiceFilter(
+        choices=(('popular', 'По популярности'),),
+        method='order_by_popularity',
+    )
 
     class Meta:
         model = Recipe
@@ -47,3 +61,9 @@ class RecipeFilter(FilterSet):
             return queryset.exclude(shopping_cart__user=user)
 
         return queryset
+
+    def filter_by_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def order_by_popularity(self, queryset, name, value):
+        return queryset.order_by(*POPULAR_ORDERING)
@@ -0,0 +1,65 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.constants import RECIPE_EXPORT_CHUNK_SIZE
+from recipes.models import Recipe
+from recipes.transfer import export_recipes
+
+
+class Command(BaseCommand):
+    """
+    Команда экспорта рецептов в NDJSON-файл для import_recipes
+    """
+    help = (
+        'Экспортирует рецепты в NDJSON (по одному рецепту в строке) '
+        'с картинками в base64'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default='-',
+            help='Путь к файлу или "-" для вывода в stdout',
+        )
+        parser.add_argument(
+            '--author',
+            help='Email автора, рецепты которого экспортируются',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.RECIPE_IMPORT_WORKERS,
+            help='Число потоков чтения картинок',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=RECIPE_EXPORT_CHUNK_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.all()
+        if options['author']:
+            recipes = recipes.filter(author__email=options['author'])
+        lines = export_recipes(
+            recipes,
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+        )
+        count = 0
+        try:
+            if options['path'] == '-':
+                for line in lines:
+                    sys.stdout.write(line)
+                    count += 1
+            else:
+                with open(options['path'], 'w', encoding='utf-8') as file:
+                    for line in lines:
+                        file.write(line)
+                        count += 1
+        except OSError as error:
+            raise CommandError(f'Не удалось записать файл: {error}')
+        self.stderr.write(f'Экспортировано рецептов: {count}')
@@ -0,0 +1,73 @@
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.constants import RECIPE_IMPORT_CHUNK_SIZE
+from recipes.transfer import RecipeImporter
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Команда импорта рецептов из NDJSON-файла, созданного export_recipes
+    """
+    help = (
+        'Импортирует рецепты из NDJSON-файла (по одному рецепту в строке) '
+        'от имени указанного автора'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Путь к файлу или "-" для чтения из stdin',
+        )
+        parser.add_argument(
+            '--author',
+            required=True,
+            help='Email автора импортируемых рецептов',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.RECIPE_IMPORT_WORKERS,
+            help='Число потоков обработки картинок',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=RECIPE_IMPORT_CHUNK_SIZE,
+            help='Число рецептов, сохраняемых в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        author = User.objects.filter(email=options['author']).first()
+        if author is None:
+            raise CommandError(
+                f'Пользователь {options["author"]} не найден'
+            )
+        importer = RecipeImporter(
+            author,
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+        )
+        started = time.perf_counter()
+        try:
+            if options['path'] == '-':
+                result = importer.run(sys.stdin.buffer)
+            else:
+                with open(options['path'], 'rb') as file:
+                    result = importer.run(file)
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать файл: {error}')
+        elapsed = time.perf_counter() - started
+        for error in result['errors']:
+            self.stderr.write(f'Строка {error["line"]}: {error["errors"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано рецептов: {result["created"]}, '
+            f'ошибок: {len(result["errors"])}, время: {elapsed:.2f} с'
+        ))
@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import ShoppingListItem
+from recipes.shopping_list import (
+    rebuild_shopping_lists,
+    live_shopping_list,
+)
+
+
+class Command(BaseCommand):
+    """
+    Команда полного пересчета готовых списков покупок пользователей
+    и их сверки с агрегацией по ингредиентам рецептов
+    """
+    help = (
+        'Пересчитывает списки покупок пользователей и сверяет их '
+        'с агрегацией по ингредиентам рецептов из списка покупок'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверить списки покупок, не пересчитывая их',
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Идентификатор пользователя (можно указать несколько раз)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        if not options['check']:
+            created = rebuild_shopping_lists(
+                user_ids,
+                batch_size=options['batch_size'],
+            )
+            self.stdout.write(f'Создано строк списка покупок: {created}')
+        mismatches = self.compare(user_ids)
+        for (user_id, ingredient_id), (stored, live) in mismatches:
+            self.stderr.write(
+                f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                f'сохранено {stored}, по рецептам {live}'
+            )
+        if mismatches:
+            raise CommandError(
+                f'Расхождений в списках покупок: {len(mismatches)}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            'Списки покупок совпадают с агрегацией по рецептам'
+        ))
+
+    def compare(self, user_ids):
+        items = ShoppingListItem.objects.all()
+        if user_ids is not None:
+            items = items.filter(user_id__in=user_ids)
+        stored = {
+            (user_id, ingredient_id): total
+            for user_id, ingredient_id, total in items.values_list(
+                'user_id', 'ingredient_id', 'total_amount',
+            ).iterator()
+        }
+        live = {
+            (user_id, ingredient_id): total
+            for user_id, ingredient_id, total in live_shopping_list(
+                user_ids
+            ).iterator()
+        }
+        return sorted(
+            (key, (stored.get(key), live.get(key)))
+            for key in stored.keys() | live.keys()
+            if stored.get(key) != live.get(key)
+        )
@@ -0,0 +1,239 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+
+from .constants import MATCH_INDEX_CHUNK_SIZE
+from .models import RecipeIngredient
+
+
+def to_bitset(positions, length):
+    """
+    Битовое множество (целое число) из номеров битов
+    """
+    buffer = bytearray((length + 7) // 8)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def highest_bits(bitset, limit=None):
+    """
+    Номера установленных битов от старшего к младшему,
+    не больше limit номеров
+    """
+    digits = bin(bitset)
+    last = len(digits) - 1
+    index = digits.find('1', 2)
+    while index != -1 and limit != 0:
+        yield last - index
+        if limit is not None:
+            limit -= 1
+        index = digits.find('1', index + 1)
+
+
+class RecipeMatchIndex:
+    """
+    Обратный индекс в памяти процесса для подбора рецептов по набору
+    ингредиентов. Рецептам присваиваются номера по возрастанию
+    идентификатора, для каждого ингредиента хранится отсортированный массив
+    номеров его рецептов, а для часто используемых ингредиентов - еще
+    и битовое множество. Число найденных ингредиентов каждого рецепта
+    считается сложением битовых множеств по разрядам, без обхода рецептов
+    в Python. Индекс обновляется сигналами при изменении ингредиентов
+    рецептов в текущем процессе и перестраивается не реже, чем раз
+    в ttl секунд
+    """
+
+    def __init__(self, ttl=None, dense_ratio=64):
+        self.ttl = ttl
+        # Ингредиент хранится и битовым множеством, если оно не больше
+        # массива номеров: в массиве 8 байт на рецепт, в множестве - 1 бит
+        self.dense_ratio = dense_ratio
+        self._recipe_ids = array('L')
+        self._positions = {}
+        self._sizes = array('H')
+        self._size_sets = {}
+        self._postings = {}
+        self._bitsets = {}
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._built_at = None
+
+    def is_stale(self):
+        if self._built_at is None:
+            return True
+        if self.ttl is None:
+            return False
+        return time.monotonic() - self._built_at > self.ttl
+
+    def build(self):
+        rows = RecipeIngredient.objects.order_by(
+            'ingredient_id', 'recipe_id',
+        ).values_list(
+            'ingredient_id', 'recipe_id',
+        ).iterator(
+            chunk_size=MATCH_INDEX_CHUNK_SIZE,
+        )
+        self.load(rows)
+
+    def load(self, rows):
+        """
+        Построение индекса по парам (ингредиент, рецепт),
+        отсортированным по ингредиенту и рецепту
+        """
+        rows = list(rows)
+        recipe_ids = array('L', sorted({recipe_id for _, recipe_id in rows}))
+        positions = {
+            recipe_id: position
+            for position, recipe_id in enumerate(recipe_ids)
+        }
+        sizes = array('H', bytes(2 * len(recipe_ids)))
+        postings = {}
+        for ingredient_id, recipe_id in rows:
+            position = positions[recipe_id]
+            recipes = postings.get(ingredient_id)
+            if recipes is None:
+                recipes = postings[ingredient_id] = array('L')
+            recipes.append(position)
+            sizes[position] += 1
+        size_positions = {}
+        for position, size in enumerate(sizes):
+            size_positions.setdefault(size, []).append(position)
+        length = len(recipe_ids)
+        size_sets = {
+            size: to_bitset(members, length)
+            for size, members in size_positions.items()
+        }
+        bitsets = {
+            ingredient_id: to_bitset(recipes, length)
+            for ingredient_id, recipes in postings.items()
+            if len(recipes) * self.dense_ratio >= length
+        }
+        with self._lock:
+            self._recipe_ids = recipe_ids
+            self._positions = positions
+            self._sizes = sizes
+            self._size_sets = size_sets
+            self._postings = postings
+            self._bitsets = bitsets
+            self._built_at = time.monotonic()
+
+    def update_recipe(self, recipe_id, previous, current):
+        """
+        Обновление индекса после изменения ингредиентов рецепта:
+        previous и current - идентификаторы ингредиентов до и после.
+        Новый рецепт получает следующий номер, поэтому порядок номеров
+        остается порядком идентификаторов
+        """
+        if self._built_at is None:
+            return
+        previous, current = set(previous), set(current)
+        with self._lock:
+            position = self._positions.get(recipe_id)
+            if position is None:
+                position = self._positions[recipe_id] = len(self._recipe_ids)
+                self._recipe_ids.append(recipe_id)
+                self._sizes.append(0)
+            bit = 1 << position
+            for ingredient_id in previous - current:
+                recipes = self._postings.get(ingredient_id)
+                if recipes is None:
+                    continue
+                index = bisect_left(recipes, position)
+                if index < len(recipes) and recipes[index] == position:
+                    del recipes[index]
+                if ingredient_id in self._bitsets:
+                    self._bitsets[ingredient_id] &= ~bit
+            for ingredient_id in current - previous:
+                recipes = self._postings.setdefault(ingredient_id, array('L'))
+                index = bisect_left(recipes, position)
+                if index == len(recipes) or recipes[index] != position:
+                    insort(recipes, position)
+                if ingredient_id in self._bitsets:
+                    self._bitsets[ingredient_id] |= bit
+            self.set_size(position, len(current))
+
+    def remove_recipe(self, recipe_id):
+        """
+        Удаление рецепта из индекса. Номер рецепта остается в массивах
+        ингредиентов до перестроения индекса, но при подборе
+        не учитывается
+        """
+        with self._lock:
+            position = self._positions.get(recipe_id)
+            if position is not None:
+                self.set_size(position, 0)
+
+    def set_size(self, position, size):
+        bit = 1 << position
+        previous = self._sizes[position]
+        if previous:
+            self._size_sets[previous] &= ~bit
+        if size:
+            self._size_sets[size] = self._size_sets.get(size, 0) | bit
+        self._sizes[position] = size
+
+    def get_bitset(self, ingredient_id):
+        bitset = self._bitsets.get(ingredient_id)
+        if bitset is None:
+            bitset = to_bitset(
+                self._postings.get(ingredient_id, ()), len(self._recipe_ids),
+            )
+        return bitset
+
+    def match(self, ingredient_ids, limit=None):
+        """
+        Подбор рецептов, в которых есть хотя бы один из ингредиентов.
+        Возвращает общее число таких рецептов и список (рецепт, число
+        найденных ингредиентов, число ингредиентов рецепта) из не более
+        чем limit рецептов, отсортированный по доле найденных ингредиентов
+        рецепта, затем по их числу и по убыванию идентификатора рецепта
+        """
+        if self.is_stale():
+            self.build()
+        with self._lock:
+            recipe_ids = self._recipe_ids
+            size_sets = dict(self._size_sets)
+            # Число найденных ингредиентов каждого рецепта по разрядам:
+            # бит рецепта в counters[digit] - разряд digit этого числа
+            counters = []
+            found = 0
+            for ingredient_id in set(ingredient_ids):
+                carry = self.get_bitset(ingredient_id)
+                found |= carry
+                for digit, counter in enumerate(counters):
+                    if not carry:
+                        break
+                    counters[digit], carry = counter ^ carry, counter & carry
+                if carry:
+                    counters.append(carry)
+        groups = []
+        for matched in range(1, 2 ** len(counters)):
+            exact = found
+            for digit, counter in enumerate(counters):
+                exact &= counter if matched >> digit & 1 else ~counter
+            if not exact:
+                continue
+            for size, members in size_sets.items():
+                if size >= matched and exact & members:
+                    groups.append(
+                        (matched / size, matched, size, exact & members),
+                    )
+        groups.sort(key=lambda group: group[:2], reverse=True)
+        total = sum(group[3].bit_count() for group in groups)
+        result = []
+        for _, matched, size, members in groups:
+            remaining = None if limit is None else limit - len(result)
+            if remaining == 0:
+                break
+            result.extend(
+                (recipe_ids[position], matched, size)
+                for position in highest_bits(members, remaining)
+            )
+        return total, result
+
+
+recipe_match_index = RecipeMatchIndex()
@@ -0,0 +1,54 @@
+# Generated by Django 4.2 on 2026-10-18 02:30
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "UPDATE recipes_recipe AS recipe SET search_vector = "
+        "setweight(to_tsvector('russian', COALESCE(recipe.name, '')), 'A') "
+        "|| setweight(to_tsvector('russian', COALESCE(("
+        "SELECT string_agg(ingredient.name, ' ') "
+        "FROM recipes_recipeingredient AS recipe_ingredient "
+        "JOIN ingredients_ingredient AS ingredient "
+        "ON ingredient.id = recipe_ingredient.ingredient_id "
+        "WHERE recipe_ingredient.recipe_id = recipe.id), '')), 'B') "
+        "|| setweight(to_tsvector('russian', COALESCE(recipe.text, '')), 'C')"
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+        'ON recipes_recipe USING gin (search_vector)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS recipe_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+    """
+    Поисковый вектор рецептов. В PostgreSQL вектор заполняется
+    для существующих рецептов и по нему строится GIN-индекс,
+    в остальных БД поле остается пустым
+    """
+
+    dependencies = [
+        ('recipes', '0008_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(
+            create_search_index,
+            drop_search_index,
+        ),
+    ]
@@ -1,14 +1,80 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.core.validators import MinValueValidator
 
 from users.models import CustomUser
 from ingredients.models import Ingredient
+from follows.models import Follow
 from .constants import (
     RECIPE_NAME_MAX_LENGTH,
     COOKING_TIME_MIN_VALUE
 )
 
 
+class RecipeQuerySet(models.QuerySet):
+    """
+    Запросы к рецептам для отображения в API
+    """
+
+    def with_related(self):
+        """
+        Автор рецепта подгружается через JOIN,
+        ингредиенты рецептов - одним дополнительным запросом
+        """
+        return self.select_related(
+            'author',
+        ).prefetch_related(
+            models.Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient',
+                ),
+            )
+        )
+
+    def with_user_flags(self, user):
+        """
+        Флаги is_favorited, is_in_shopping_cart и подписка на автора
+        вычисляются подзапросами EXISTS в основном запросе
+        """
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=models.Value(False),
+                is_in_shopping_cart=models.Value(False),
+                author_is_subscribed=models.Value(False),
+            )
+        return self.annotate(
+            is_favorited=models.Exists(
+                FavouriteUserRecipe.objects.filter(
+                    user=user,
+                    recipe=models.OuterRef('pk'),
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                ShoppingCart.objects.filter(
+                    user=user,
+                    recipe=models.OuterRef('pk'),
+                )
+            ),
+            author_is_subscribed=models.Exists(
+                Follow.objects.filter(
+                    user=user,
+                    following=models.OuterRef('author'),
+                )
+            ),
+        )
+
+
+class RecipeManager(models.Manager.from_queryset(RecipeQuerySet)):
+    """
+    Менеджер рецептов. Поисковый вектор используется только в условиях
+    запросов, поэтому по умолчанию не загружается
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
+
+
 class Recipe(models.Model):
     """
     Модель для рецептов
@@ -40,6 +106,12 @@ class Recipe(models.Model):
         null=False,
         verbose_name='Картинка',
     )
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии картинки',
+    )
     author = models.ForeignKey(
         CustomUser,
         on_delete=models.CASCADE,
@@ -59,11 +131,49 @@ class Recipe(models.Model):
         auto_created=True,
         verbose_name='Дата публикации'
     )
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name='Версия',
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число добавлений в избранное',
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число добавлений в список покупок',
+    )
+    # Заполняется только в PostgreSQL, GIN-индекс по полю создается
+    # миграцией 0009_recipe_search_vector
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор',
+    )
+
+    objects = RecipeManager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=['-favorites_count', '-pub_date', '-id'],
+                name='recipe_popular_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -175,3 +285,48 @@ class ShoppingCart(models.Model):
 
     def __str__(self) -> str:
         return f"{self.user.username} - {self.recipe.name}"
+
+
+class ShoppingListItem(models.Model):
+    """
+    Модель для хранения готового списка покупок пользователя:
+    суммарное количество каждого ингредиента по всем рецептам
+    из списка покупок. Поддерживается сигналами при изменении
+    списка покупок и ингредиентов рецептов
+    """
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        blank=False,
+        null=False,
+        related_name='shopping_list',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+        blank=False,
+        null=False,
+    )
+    total_amount = models.IntegerField(
+        blank=False,
+        null=False,
+        verbose_name='Суммарное количество',
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списка покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='user_ingredient_shopping_list_composite_pk',
+            )
+        ]
+
+    def __str__(self) -> str:
+        return (
+            f"{self.user.username} - {self.ingredient.name}, "
+            f"{self.total_amount} {self.ingredient.measurement_unit}"
+        )
@@ -0,0 +1,25 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class PlainTextRenderer(BaseRenderer):
+    """
+    Рендерер для выгрузки списка покупок в формате .txt
+    """
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        return JSONRenderer().render(data)
+
+
+class CSVRenderer(PlainTextRenderer):
+    """
+    Рендерер для выгрузки списка покупок в формате .csv
+    """
+    media_type = 'text/csv'
+    format = 'csv'
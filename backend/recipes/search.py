@@ -0,0 +1,127 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connections
+from django.db.models import (
+    Case,
+    Exists,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    OuterRef,
+    Q,
+    Subquery,
+    TextField,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast
+
+from .constants import (
+    SEARCH_CONFIG,
+    SEARCH_FALLBACK_WEIGHTS,
+    SEARCH_MAX_WORDS,
+    SEARCH_UPDATE_BATCH_SIZE,
+)
+from .models import Recipe, RecipeIngredient
+
+
+def uses_full_text_search(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def recipe_search_vector():
+    """
+    Выражение поискового вектора рецепта: название (вес A),
+    названия ингредиентов (вес B) и описание (вес C)
+    """
+    ingredient_names = Subquery(
+        RecipeIngredient.objects.filter(
+            recipe=OuterRef('pk'),
+        ).values(
+            'recipe',
+        ).annotate(
+            names=StringAgg('ingredient__name', ' '),
+        ).values(
+            'names',
+        ),
+        output_field=TextField(),
+    )
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(ingredient_names, weight='B', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(queryset):
+    """
+    Пересчет поискового вектора рецептов из queryset порциями
+    по SEARCH_UPDATE_BATCH_SIZE рецептов. В БД без полнотекстового
+    поиска ничего не делает
+    """
+    if not uses_full_text_search(queryset):
+        return
+    ids = list(queryset.order_by().values_list('pk', flat=True))
+    for start in range(0, len(ids), SEARCH_UPDATE_BATCH_SIZE):
+        Recipe.objects.filter(
+            pk__in=ids[start:start + SEARCH_UPDATE_BATCH_SIZE],
+        ).update(
+            search_vector=recipe_search_vector(),
+        )
+
+
+def search_recipes(queryset, value):
+    """
+    Поиск рецептов по названию, описанию и названиям ингредиентов.
+    Найденные рецепты сортируются по релевантности (search_rank),
+    затем по дате публикации.
+    В PostgreSQL используется поисковый вектор с GIN-индексом
+    и ts_rank, в остальных БД - поиск подстрок всех слов запроса
+    с суммой весов совпавших полей в качестве релевантности
+    """
+    if uses_full_text_search(queryset):
+        query = SearchQuery(
+            value, config=SEARCH_CONFIG, search_type='websearch',
+        )
+        queryset = queryset.filter(
+            search_vector=query,
+        ).annotate(
+            # ts_rank возвращает real: при сравнении с числом из курсора
+            # keyset-пагинации (double precision) равенство не выполняется,
+            # поэтому релевантность приводится к double precision
+            search_rank=Cast(
+                SearchRank(F('search_vector'), query), FloatField(),
+            ),
+        )
+    else:
+        words = value.split()[:SEARCH_MAX_WORDS]
+        if not words:
+            return queryset
+        rank = Value(0.0)
+        for word in words:
+            matches = {
+                'name': Q(name__icontains=word),
+                'ingredients': Exists(
+                    RecipeIngredient.objects.filter(
+                        recipe=OuterRef('pk'),
+                        ingredient__name__icontains=word,
+                    )
+                ),
+                'text': Q(text__icontains=word),
+            }
+            condition = Q()
+            for field, match in matches.items():
+                condition |= match
+                rank += Case(
+                    When(match, then=Value(SEARCH_FALLBACK_WEIGHTS[field])),
+                    default=Value(0.0),
+                )
+            queryset = queryset.filter(condition)
+        queryset = queryset.annotate(
+            search_rank=ExpressionWrapper(rank, output_field=FloatField()),
+        )
+    return queryset.order_by('-search_rank', '-pub_date', '-id')
@@ -3,12 +3,22 @@ from rest_framework.serializers import (
     ValidationError,
     ModelSerializer,
     IntegerField,
+    FloatField,
     ImageField,
+    CharField,
+    Serializer,
 )
 from django.core.validators import MinValueValidator
 from django.contrib.auth import get_user_model
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
 
+from images.fields import Base64ImageStreamField, RenditionsField
+from monitoring.serializers import TimedSerializerMixin
+from ingredients.constants import (
+    INGREDIENT_MEASURE_UNIT_MAX_LENGTH,
+    INGREDIENT_NAME_MAX_LENGTH,
+    INGREDIENT_MIN_VALUE,
+)
 from ingredients.serializers import (
     IngredientForRecipeSerializer,
     IngredientPatchSerializer
@@ -19,13 +29,15 @@ from .models import (
     Recipe,
 )
 from .constants import (
+    RECIPE_NAME_MAX_LENGTH,
     COOKING_TIME_MIN_VALUE,
 )
+from .signals import recipe_ingredients_changed
 
 User = get_user_model()
 
 
-class RecipeListDetailSerializer(ModelSerializer):
+class RecipeListDetailSerializer(TimedSerializerMixin, ModelSerializer):
     """
     Сериализатор для функций:
         - получения списка рецептов
@@ -42,6 +54,7 @@ class RecipeListDetailSerializer(ModelSerializer):
     image = ImageField(
         use_url=True,
     )
+    image_srcset = RenditionsField('image', 'image_renditions')
 
     class Meta:
         model = Recipe
@@ -53,14 +66,27 @@ class RecipeListDetailSerializer(ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_srcset',
             'text',
             'cooking_time',
         )
 
+    def to_representation(self, instance):
+        """
+        Передаем аннотированный во вьюсете признак подписки на автора
+        в объект автора, чтобы UserSerializer не выполнял запрос
+        """
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
     def get_is_favorited(self, obj):
         """
-        Функция, обеспечивающая получение значения для поля is_favorited
+        Функция, обеспечивающая получение значения для поля is_favorited.
+        Если значение уже аннотировано во вьюсете, запрос не выполняется
         """
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         user = request.user
         if user.is_anonymous:
@@ -69,8 +95,12 @@ class RecipeListDetailSerializer(ModelSerializer):
 
     def get_is_in_shopping_cart(self, obj):
         """
-        Функция, обеспечивающая получение значения для поля is_in_shopping_cart
+        Функция, обеспечивающая получение значения для поля
+        is_in_shopping_cart. Если значение уже аннотировано во вьюсете,
+        запрос не выполняется
         """
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         user = request.user
         if user.is_anonymous:
@@ -85,7 +115,7 @@ class RecipePostPatchSerializer(ModelSerializer):
         - частичного обновления объекта рецепта
     """
     ingredients = IngredientPatchSerializer(many=True, required=True)
-    image = Base64ImageField(required=True)
+    image = Base64ImageStreamField(required=True)
     cooking_time = IntegerField(
         validators=[
             MinValueValidator(
@@ -147,6 +177,11 @@ class RecipePostPatchSerializer(ModelSerializer):
         """
         Функция сохранения ингредиентов
         """
+        previous = dict(
+            RecipeIngredient.objects.filter(
+                recipe=recipe,
+            ).values_list('ingredient_id', 'amount')
+        )
         RecipeIngredient.objects.filter(
             recipe=recipe,
         ).delete()
@@ -165,16 +200,28 @@ class RecipePostPatchSerializer(ModelSerializer):
         RecipeIngredient.objects.bulk_create(
             objs=_ingredients,
         )
+        recipe_ingredients_changed.send(
+            sender=Recipe,
+            recipe=recipe,
+            previous=previous,
+            current={
+                ingredient.ingredient_id: ingredient.amount
+                for ingredient in _ingredients
+            },
+        )
 
     def create(self, validated_data):
         """
         Функция создания рецепта
         """
         ingredients = validated_data.pop('ingredients')
-        recipe = Recipe.objects.create(
-            **validated_data,
-        )
-        self.save_ingredients(recipe, ingredients)
+        # Ссылка на сохраненную картинку отменяется вместе с рецептом,
+        # если его не удалось сохранить
+        with transaction.atomic():
+            recipe = Recipe.objects.create(
+                **validated_data,
+            )
+            self.save_ingredients(recipe, ingredients)
         return recipe
 
     def validate(self, attrs):
@@ -192,25 +239,33 @@ class RecipePostPatchSerializer(ModelSerializer):
         Функция обновления данных в существующем рецепте
         """
         ingredients = validated_data.pop('ingredients', None)
-        super().update(instance, validated_data)
-        self.save_ingredients(instance, ingredients)
-        instance.save()
+        with transaction.atomic():
+            super().update(instance, validated_data)
+            self.save_ingredients(instance, ingredients)
+            instance.save()
         return instance
 
     def to_representation(self, instance):
         """
-        Переопределяем метод для возврата данных в нужном формате
+        Переопределяем метод для возврата данных в нужном формате.
+        Сохраненный рецепт перечитывается одним запросом с автором
+        и флагами пользователя и одним запросом ингредиентов,
+        а не отдельными запросами для каждого ингредиента
         """
+        instance = Recipe.objects.with_related().with_user_flags(
+            self.context['request'].user,
+        ).get(pk=instance.pk)
         return RecipeListDetailSerializer(instance, context=self.context).data
 
 
-class SimpleRecipeSerializer(ModelSerializer):
+class SimpleRecipeSerializer(TimedSerializerMixin, ModelSerializer):
     """
     Сериализатор модели РЕЦЕПТ для функции МОИ_ПОДПИСКИ
     """
     image = ImageField(
         use_url=True,
     )
+    image_srcset = RenditionsField('image', 'image_renditions')
 
     class Meta:
         model = Recipe
@@ -218,5 +273,56 @@ class SimpleRecipeSerializer(ModelSerializer):
             'id',
             'name',
             'image',
+            'image_srcset',
             'cooking_time',
         )
+
+
+class RecipeMatchSerializer(RecipeListDetailSerializer):
+    """
+    Сериализатор для функции подбора рецептов по ингредиентам:
+    рецепт, доля и число найденных ингредиентов рецепта
+    """
+    coverage = FloatField(read_only=True)
+    matched_ingredients = IntegerField(read_only=True)
+    missing_ingredients = IntegerField(read_only=True)
+
+    class Meta(RecipeListDetailSerializer.Meta):
+        fields = RecipeListDetailSerializer.Meta.fields + (
+            'coverage',
+            'matched_ingredients',
+            'missing_ingredients',
+        )
+
+
+class IngredientTransferSerializer(Serializer):
+    """
+    Сериализатор ингредиента рецепта для импорта и экспорта.
+    Ингредиент задается названием и единицей измерения, так как
+    идентификаторы ингредиентов в разных экземплярах различаются
+    """
+    name = CharField(max_length=INGREDIENT_NAME_MAX_LENGTH)
+    measurement_unit = CharField(max_length=INGREDIENT_MEASURE_UNIT_MAX_LENGTH)
+    amount = IntegerField(min_value=INGREDIENT_MIN_VALUE)
+
+
+class RecipeImportSerializer(Serializer):
+    """
+    Сериализатор строки NDJSON-файла импорта рецептов
+    """
+    name = CharField(max_length=RECIPE_NAME_MAX_LENGTH)
+    text = CharField()
+    cooking_time = IntegerField(min_value=COOKING_TIME_MIN_VALUE)
+    image = Base64ImageStreamField()
+    ingredients = IngredientTransferSerializer(many=True, allow_empty=False)
+
+    def validate_ingredients(self, value):
+        keys = [
+            (ingredient['name'], ingredient['measurement_unit'])
+            for ingredient in value
+        ]
+        if len(keys) != len(set(keys)):
+            raise ValidationError(
+                'Ингредиенты должны быть уникальными!',
+            )
+        return value
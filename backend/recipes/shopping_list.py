@@ -0,0 +1,141 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from .constants import SHOPPING_LIST_UPSERT_BATCH_SIZE
+from .models import (
+    RecipeIngredient,
+    ShoppingListItem,
+    ShoppingCart,
+)
+
+
+def recipe_amounts(recipe_id) -> Counter:
+    """
+    Функция получения количества каждого ингредиента рецепта
+    """
+    return Counter(dict(
+        RecipeIngredient.objects.filter(
+            recipe_id=recipe_id,
+        ).values_list('ingredient_id', 'amount')
+    ))
+
+
+def upsert_sql(rows_count):
+    """
+    Запрос, который добавляет строки списков покупок, а для уже
+    существующих пар (пользователь, ингредиент) прибавляет количество
+    к сохраненному. Работает в PostgreSQL и SQLite
+    """
+    quote = connection.ops.quote_name
+    table = quote(ShoppingListItem._meta.db_table)
+    user, ingredient, total = (
+        quote(ShoppingListItem._meta.get_field(name).column)
+        for name in ('user', 'ingredient', 'total_amount')
+    )
+    values = ', '.join(['(%s, %s, %s)'] * rows_count)
+    return (
+        f'INSERT INTO {table} ({user}, {ingredient}, {total}) '
+        f'VALUES {values} '
+        f'ON CONFLICT ({user}, {ingredient}) DO UPDATE '
+        f'SET {total} = {table}.{total} + EXCLUDED.{total}'
+    )
+
+
+def apply_shopping_list_delta(user_ids, delta):
+    """
+    Функция инкрементального обновления списков покупок пользователей:
+    к количеству каждого ингредиента прибавляется значение из delta
+    (отрицательное при удалении). Строки с нулевым количеством удаляются.
+    Строки добавляются и изменяются одним запросом INSERT ... ON CONFLICT,
+    поэтому одновременные изменения одного списка покупок не теряются
+    и не нарушают уникальность пары (пользователь, ингредиент).
+    Строки обрабатываются в одном порядке, чтобы одновременные
+    транзакции не блокировали друг друга взаимно
+    """
+    delta = sorted(
+        (ingredient_id, amount)
+        for ingredient_id, amount in delta.items() if amount
+    )
+    user_ids = sorted(set(user_ids))
+    if not delta or not user_ids:
+        return
+    rows = [
+        (user_id, ingredient_id, amount)
+        for user_id in user_ids
+        for ingredient_id, amount in delta
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(rows), SHOPPING_LIST_UPSERT_BATCH_SIZE):
+            batch = rows[start:start + SHOPPING_LIST_UPSERT_BATCH_SIZE]
+            cursor.execute(
+                upsert_sql(len(batch)),
+                [value for row in batch for value in row],
+            )
+        ShoppingListItem.objects.filter(
+            user_id__in=user_ids,
+            ingredient_id__in=[ingredient_id for ingredient_id, _ in delta],
+            total_amount__lte=0,
+        ).delete()
+
+
+def change_shopping_list(user_id, recipe_id, sign=1):
+    """
+    Функция добавления (sign=1) или вычитания (sign=-1) ингредиентов
+    рецепта в списке покупок пользователя
+    """
+    apply_shopping_list_delta(
+        [user_id],
+        {
+            ingredient_id: sign * amount
+            for ingredient_id, amount in recipe_amounts(recipe_id).items()
+        },
+    )
+
+
+def live_shopping_list(user_ids=None):
+    """
+    Функция агрегации списка покупок напрямую по ингредиентам рецептов
+    из списка покупок. Возвращает строки (user_id, ingredient_id, total)
+    """
+    carts = ShoppingCart.objects.all()
+    if user_ids is not None:
+        carts = carts.filter(user_id__in=user_ids)
+    return carts.values_list(
+        'user_id',
+        'recipe__recipeingredient__ingredient_id',
+    ).annotate(
+        total=Sum('recipe__recipeingredient__amount'),
+    ).filter(
+        total__gt=0,
+    ).order_by()
+
+
+def rebuild_shopping_lists(user_ids=None, batch_size=1000):
+    """
+    Функция полного пересчета списков покупок пользователей
+    """
+    with transaction.atomic():
+        items = ShoppingListItem.objects.all()
+        if user_ids is not None:
+            items = items.filter(user_id__in=user_ids)
+        items.delete()
+        batch = []
+        created = 0
+        for user_id, ingredient_id, total in live_shopping_list(
+            user_ids
+        ).iterator(chunk_size=batch_size):
+            batch.append(
+                ShoppingListItem(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=total,
+                )
+            )
+            if len(batch) >= batch_size:
+                ShoppingListItem.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        ShoppingListItem.objects.bulk_create(batch)
+        return created + len(batch)
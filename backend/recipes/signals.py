@@ -0,0 +1,374 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import (
+    post_delete,
+    pre_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import Signal, receiver
+
+from images.renditions import bulk_enqueue_renditions, renditions_ready
+from ingredients.models import Ingredient
+from users.toggles import (
+    relation_removed,
+    relation_added,
+    change_counter,
+)
+from .cache import (
+    invalidate_author_feeds,
+    invalidate_all_feeds,
+    bump_recipe_version,
+    invalidate_feeds,
+)
+from .models import (
+    FavouriteUserRecipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Recipe,
+)
+from .matching import recipe_match_index
+from .search import update_search_vectors
+from .shopping_list import (
+    apply_shopping_list_delta,
+    change_shopping_list,
+)
+
+
+# Отправляется из RecipePostPatchSerializer.save_ingredients.
+# Аргументы: recipe, previous и current - словари
+# {идентификатор ингредиента: количество} до и после сохранения
+recipe_ingredients_changed = Signal()
+
+# Отправляется после создания рецептов импортом через bulk_create,
+# при котором post_save и recipe_ingredients_changed не отправляются.
+# Аргументы: author_id, recipes - созданные рецепты, ingredients -
+# словарь {идентификатор рецепта: {идентификатор ингредиента: количество}}
+recipes_imported = Signal()
+
+# Поля пользователя, изменение которых не влияет на отображение рецептов
+USER_NON_PROFILE_FIELDS = {'last_login', 'password'}
+
+# Поля рецепта, из которых строится поисковый вектор
+RECIPE_SEARCH_FIELDS = {'name', 'text'}
+
+User = get_user_model()
+
+RECIPE_COUNTERS = {
+    FavouriteUserRecipe: 'favorites_count',
+    ShoppingCart: 'shopping_cart_count',
+}
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, raw=False, **kwargs):
+    """
+    Добавление ингредиентов рецепта в список покупок пользователя.
+    При загрузке фикстур (raw) списки покупок, как и счетчики,
+    загружаются из самой фикстуры
+    """
+    if created and not raw:
+        change_shopping_list(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    """
+    Вычитание ингредиентов рецепта из списка покупок пользователя.
+    Используется pre_delete, так как при каскадном удалении рецепта
+    его ингредиенты к моменту post_delete уже удалены
+    """
+    change_shopping_list(instance.user_id, instance.recipe_id, sign=-1)
+
+
+@receiver(relation_added, sender=ShoppingCart)
+def add_toggled_to_shopping_list(sender, user_id, target_id, **kwargs):
+    """
+    Добавление ингредиентов рецепта в список покупок пользователя
+    при добавлении рецепта через users.toggles
+    """
+    change_shopping_list(user_id, target_id)
+
+
+@receiver(relation_removed, sender=ShoppingCart)
+def remove_toggled_from_shopping_list(sender, user_id, target_id, **kwargs):
+    """
+    Вычитание ингредиентов рецепта из списка покупок пользователя
+    при удалении рецепта через users.toggles
+    """
+    change_shopping_list(user_id, target_id, sign=-1)
+
+
+@receiver(recipe_ingredients_changed)
+def update_shopping_lists(sender, recipe, previous, current, **kwargs):
+    """
+    Обновление списков покупок всех пользователей,
+    у которых рецепт находится в списке покупок
+    """
+    delta = {
+        ingredient_id: current.get(ingredient_id, 0)
+        - previous.get(ingredient_id, 0)
+        for ingredient_id in set(previous) | set(current)
+    }
+    apply_shopping_list_delta(
+        ShoppingCart.objects.filter(
+            recipe=recipe,
+        ).values_list('user_id', flat=True),
+        delta,
+    )
+
+
+@receiver(pre_save, sender=Recipe)
+def increment_recipe_version(sender, instance, raw=False, update_fields=None,
+                             **kwargs):
+    """
+    Увеличение версии рецепта при каждом сохранении тем же запросом
+    UPDATE. Прочитанная версия запоминается, чтобы после сохранения
+    заменить выражение F('version') + 1 в объекте числом
+    """
+    if instance.pk and not raw and (
+        update_fields is None or 'version' in update_fields
+    ):
+        instance._saved_version = instance.version
+        instance.version = F('version') + 1
+
+
+@receiver(post_save, sender=Recipe)
+def set_recipe_version(sender, instance, created, raw=False, **kwargs):
+    """
+    Новая версия рецепта в объекте без повторного чтения из БД.
+    Если версия не входит в update_fields, она увеличивается отдельным
+    запросом. Если версию одновременно увеличил другой запрос, в объекте
+    остается меньшее число: по нему закешированный ответ просто
+    не будет найден
+    """
+    if created or raw:
+        return
+    saved_version = instance.__dict__.pop('_saved_version', None)
+    if saved_version is None:
+        bump_recipe_version(pk=instance.pk)
+        saved_version = instance.version
+    instance.version = saved_version + 1
+
+
+@receiver(recipe_ingredients_changed)
+@receiver(post_save, sender=RecipeIngredient)
+def bump_version_on_ingredients(sender, instance=None, recipe=None,
+                                raw=False, **kwargs):
+    """
+    Увеличение версии рецепта при изменении его ингредиентов
+    """
+    if raw:
+        return
+    bump_recipe_version(pk=recipe.pk if recipe else instance.recipe_id)
+
+
+@receiver(post_save, sender=Ingredient)
+def bump_version_on_ingredient(sender, instance, created, raw=False,
+                               **kwargs):
+    """
+    Увеличение версии рецептов с ингредиентом и сброс лент при изменении
+    его названия или единицы измерения
+    """
+    if not raw and not created:
+        bump_recipe_version(ingredients=instance)
+        invalidate_all_feeds()
+
+
+@receiver(post_save, sender=User)
+def bump_version_on_author_profile(sender, instance, created,
+                                   update_fields=None, raw=False, **kwargs):
+    """
+    Увеличение версии рецептов автора при изменении его профиля
+    """
+    if created or raw:
+        return
+    if update_fields and set(update_fields) <= USER_NON_PROFILE_FIELDS:
+        return
+    bump_recipe_version(author=instance)
+    invalidate_author_feeds(instance.pk)
+
+
+@receiver(post_save, sender=FavouriteUserRecipe)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, raw=False,
+                             **kwargs):
+    """
+    Увеличение счетчика добавлений рецепта в избранное
+    или список покупок
+    """
+    if created and not raw:
+        change_counter(
+            Recipe, instance.recipe_id, RECIPE_COUNTERS[sender], 1,
+        )
+
+
+@receiver(post_delete, sender=FavouriteUserRecipe)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    """
+    Уменьшение счетчика добавлений рецепта в избранное
+    или список покупок
+    """
+    change_counter(Recipe, instance.recipe_id, RECIPE_COUNTERS[sender], -1)
+
+
+@receiver(relation_added, sender=FavouriteUserRecipe)
+@receiver(relation_added, sender=ShoppingCart)
+def increment_toggled_recipe_counter(sender, target_id, **kwargs):
+    change_counter(Recipe, target_id, RECIPE_COUNTERS[sender], 1)
+
+
+@receiver(relation_removed, sender=FavouriteUserRecipe)
+@receiver(relation_removed, sender=ShoppingCart)
+def decrement_toggled_recipe_counter(sender, target_id, **kwargs):
+    change_counter(Recipe, target_id, RECIPE_COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_author_recipes_count(sender, instance, created, raw=False,
+                                   **kwargs):
+    """
+    Увеличение счетчика рецептов автора
+    """
+    if created and not raw:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_author_recipes_count(sender, instance, **kwargs):
+    """
+    Уменьшение счетчика рецептов автора
+    """
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_feeds_on_recipe(sender, instance, raw=False, **kwargs):
+    """
+    Сброс лент подписчиков автора при публикации, изменении
+    или удалении рецепта
+    """
+    if not raw:
+        invalidate_author_feeds(instance.author_id)
+
+
+@receiver(recipe_ingredients_changed)
+def invalidate_feeds_on_ingredients(sender, recipe, **kwargs):
+    invalidate_author_feeds(recipe.author_id)
+
+
+@receiver(post_save, sender=FavouriteUserRecipe)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=FavouriteUserRecipe)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_feed_on_relation(sender, instance, raw=False, **kwargs):
+    """
+    Сброс ленты пользователя при изменении его избранного
+    или списка покупок: в ленте отображаются флаги этих рецептов
+    """
+    if not raw:
+        invalidate_feeds([instance.user_id])
+
+
+@receiver(relation_added, sender=FavouriteUserRecipe)
+@receiver(relation_added, sender=ShoppingCart)
+@receiver(relation_removed, sender=FavouriteUserRecipe)
+@receiver(relation_removed, sender=ShoppingCart)
+def invalidate_feed_on_toggle(sender, user_id, **kwargs):
+    invalidate_feeds([user_id])
+
+
+@receiver(renditions_ready, sender=Recipe)
+def refresh_recipe_on_renditions(sender, instance_id, **kwargs):
+    """
+    Обновление закешированных ответов рецепта после построения
+    уменьшенных копий его картинки
+    """
+    bump_recipe_version(pk=instance_id)
+    author_id = Recipe.objects.filter(
+        pk=instance_id,
+    ).values_list(
+        'author_id', flat=True,
+    ).first()
+    if author_id is not None:
+        invalidate_author_feeds(author_id)
+
+
+@receiver(renditions_ready, sender=User)
+def refresh_author_on_renditions(sender, instance_id, **kwargs):
+    """
+    Обновление закешированных ответов рецептов автора после построения
+    уменьшенных копий его аватара
+    """
+    bump_recipe_version(author_id=instance_id)
+    invalidate_author_feeds(instance_id)
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_vector_on_recipe(sender, instance, raw=False,
+                                   update_fields=None, **kwargs):
+    """
+    Пересчет поискового вектора при изменении названия или описания
+    рецепта
+    """
+    if raw or (
+        update_fields is not None
+        and not RECIPE_SEARCH_FIELDS & set(update_fields)
+    ):
+        return
+    update_search_vectors(Recipe.objects.filter(pk=instance.pk))
+
+
+@receiver(recipe_ingredients_changed)
+def update_search_vector_on_ingredients(sender, recipe, **kwargs):
+    update_search_vectors(Recipe.objects.filter(pk=recipe.pk))
+
+
+@receiver(post_save, sender=Ingredient)
+def update_search_vectors_on_ingredient(sender, instance, created, raw=False,
+                                        **kwargs):
+    """
+    Пересчет поисковых векторов рецептов с ингредиентом
+    при изменении его названия
+    """
+    if not raw and not created:
+        update_search_vectors(Recipe.objects.filter(ingredients=instance))
+
+
+@receiver(recipe_ingredients_changed)
+def update_match_index(sender, recipe, previous, current, **kwargs):
+    """
+    Обновление индекса подбора рецептов по ингредиентам
+    """
+    recipe_match_index.update_recipe(recipe.pk, previous, current)
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_from_match_index(sender, instance, **kwargs):
+    recipe_match_index.remove_recipe(instance.pk)
+
+
+@receiver(recipes_imported)
+def update_author_on_import(sender, author_id, recipes, **kwargs):
+    """
+    Изменение счетчика рецептов автора и сброс лент его подписчиков
+    после импорта рецептов
+    """
+    change_counter(User, author_id, 'recipes_count', len(recipes))
+    invalidate_author_feeds(author_id)
+
+
+@receiver(recipes_imported)
+def index_imported_recipes(sender, recipes, ingredients, **kwargs):
+    """
+    Заполнение поисковых векторов, индекса подбора по ингредиентам
+    и очереди уменьшенных копий картинок импортированных рецептов
+    """
+    update_search_vectors(
+        Recipe.objects.filter(pk__in=[recipe.pk for recipe in recipes]),
+    )
+    for recipe in recipes:
+        recipe_match_index.update_recipe(recipe.pk, {}, ingredients[recipe.pk])
+    bulk_enqueue_renditions(Recipe, 'image', recipes)
@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import TemporaryDirectory
+from threading import Barrier
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from benchmarks.dataset import image_bytes
+from ingredients.models import Ingredient
+from recipes.models import Recipe, RecipeIngredient
+
+User = get_user_model()
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        password='test-password',
+        first_name=username,
+        last_name=username,
+    )
+
+
+def create_ingredients(count, prefix='Ингредиент'):
+    return Ingredient.objects.bulk_create(
+        Ingredient(name=f'{prefix} {number}', measurement_unit='г')
+        for number in range(count)
+    )
+
+
+class TemporaryMediaMixin:
+    """
+    Файлы тестов сохраняются во временный MEDIA_ROOT
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = TemporaryDirectory()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root.name)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        cls.media_root.cleanup()
+
+
+def save_image(name='recipe_images/test.png'):
+    return Recipe._meta.get_field('image').storage.save(
+        name, ContentFile(image_bytes()),
+    )
+
+
+def create_recipe(author, ingredients, name='Рецепт', image=None):
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        text='Описание',
+        cooking_time=10,
+        image=image or 'recipe_images/test.png',
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+        for ingredient in ingredients
+    )
+    return recipe
+
+
+def auth_client(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+class ConcurrencyMixin:
+    """
+    Тесты одновременных запросов для TransactionTestCase. Запросы
+    выполняются в отдельных потоках со своими соединениями с БД,
+    поэтому пропускаются для SQLite в памяти, где одновременная
+    запись из нескольких соединений невозможна
+    """
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Нужна БД, доступная нескольким соединениям')
+        super().setUp()
+
+    @staticmethod
+    def run_concurrently(*functions):
+        """
+        Одновременный запуск функций в потоках, результаты - в том же
+        порядке
+        """
+        barrier = Barrier(len(functions))
+
+        def run(function):
+            try:
+                barrier.wait()
+                return function()
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(functions)) as pool:
+            return list(pool.map(run, functions))
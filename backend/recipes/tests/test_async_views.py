@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.permissions import BasePermission
+from rest_framework.throttling import BaseThrottle
+
+from recipes.tests.factories import (
+    TemporaryMediaMixin,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+from recipes.views import RecipeViewSet
+
+
+class DenyPermission(BasePermission):
+
+    def has_permission(self, request, view):
+        return False
+
+
+class DenyThrottle(BaseThrottle):
+
+    def allow_request(self, request, view):
+        return False
+
+
+class AsyncRecipeListTests(TemporaryMediaMixin, TestCase):
+    """
+    Асинхронный список рецептов выполняет проверки DRF вьюсета
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        create_recipe(create_user('author'), create_ingredients(2))
+
+    def test_json(self):
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_not_acceptable(self):
+        response = self.client.get(
+            '/api/recipes/', headers={'Accept': 'text/plain'},
+        )
+        self.assertEqual(response.status_code, 406)
+
+    def test_browsable_api(self):
+        response = self.client.get(
+            '/api/recipes/', headers={'Accept': 'text/html'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
+
+    def test_permissions(self):
+        with mock.patch.object(
+            RecipeViewSet, 'permission_classes', [DenyPermission],
+        ):
+            response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_throttles(self):
+        with mock.patch.object(
+            RecipeViewSet, 'throttle_classes', [DenyThrottle],
+        ):
+            response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 429)
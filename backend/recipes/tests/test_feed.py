@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from follows.models import Follow
+from recipes.cache import feed_generation_key
+from recipes.tests.factories import (
+    auth_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+class FeedCacheTests(TestCase):
+    """
+    Закешированные страницы ленты сбрасываются при чтении по поколениям
+    авторов из подписок, а не перебором подписчиков при записи
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.author = create_user('author')
+        cls.other = create_user('other')
+        cls.ingredient, = create_ingredients(1)
+        for author in (cls.author, cls.other):
+            Follow.objects.create(user=cls.reader, following=author)
+            create_recipe(author, [cls.ingredient], name=author.username)
+
+    def setUp(self):
+        cache.clear()
+        self.client = auth_client(self.reader)
+
+    def feed(self):
+        response = self.client.get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_author_change_does_not_touch_follower_keys(self):
+        self.assertEqual(len(self.feed()), 2)
+        generation = cache.get(feed_generation_key(self.reader.pk))
+        create_recipe(self.author, [self.ingredient], name='Новый рецепт')
+        self.assertEqual(
+            cache.get(feed_generation_key(self.reader.pk)), generation,
+        )
+        self.assertIn(
+            'Новый рецепт', [recipe['name'] for recipe in self.feed()],
+        )
+
+    def test_unfollowed_author_change_keeps_cache(self):
+        stranger = create_user('stranger')
+        self.feed()
+        create_recipe(stranger, [self.ingredient])
+        # Только проверка токена: подписки и страница берутся из кеша
+        with self.assertNumQueries(1):
+            self.client.get('/api/recipes/feed/')
+
+    def test_ingredient_rename(self):
+        self.feed()
+        self.ingredient.name = 'Переименованный ингредиент'
+        self.ingredient.save()
+        names = {
+            ingredient['name']
+            for recipe in self.feed()
+            for ingredient in recipe['ingredients']
+        }
+        self.assertEqual(names, {'Переименованный ингредиент'})
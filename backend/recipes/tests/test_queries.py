@@ -0,0 +1,124 @@
+from base64 import b64encode
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from benchmarks.dataset import image_bytes
+from follows.models import Follow
+from recipes.models import FavouriteUserRecipe, ShoppingCart
+from recipes.tests.factories import (
+    TemporaryMediaMixin,
+    auth_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+RECIPES_COUNT = 100
+IMAGE = 'data:image/png;base64,' + b64encode(image_bytes()).decode()
+
+
+class RecipeListQueriesTests(TestCase):
+    """
+    Число запросов списка рецептов не зависит от размера страницы
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        ingredients = create_ingredients(5)
+        authors = [create_user(f'author{number}') for number in range(5)]
+        recipes = [
+            create_recipe(
+                authors[number % len(authors)],
+                ingredients[:number % len(ingredients) + 1],
+                name=f'Рецепт {number}',
+            )
+            for number in range(RECIPES_COUNT)
+        ]
+        Follow.objects.create(user=cls.reader, following=authors[0])
+        FavouriteUserRecipe.objects.create(user=cls.reader, recipe=recipes[0])
+        ShoppingCart.objects.create(user=cls.reader, recipe=recipes[1])
+
+    def count_queries(self, client, limit):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f'/api/recipes/?limit={limit}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), limit)
+        return len(context.captured_queries)
+
+    def test_queries_do_not_depend_on_limit(self):
+        for title, client in (
+            ('anonymous', APIClient()),
+            ('authenticated', auth_client(self.reader)),
+        ):
+            with self.subTest(client=title):
+                counts = [
+                    self.count_queries(client, limit)
+                    for limit in (1, 10, 100)
+                ]
+                self.assertEqual(len(set(counts)), 1, counts)
+
+
+class RecipeWriteQueriesTests(TemporaryMediaMixin, TestCase):
+    """
+    Число запросов создания и изменения рецепта не зависит от числа
+    ингредиентов
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.ingredients = create_ingredients(10)
+
+    def setUp(self):
+        self.client = auth_client(self.author)
+
+    def recipe_data(self, count):
+        return {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': IMAGE,
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': 10}
+                for ingredient in self.ingredients[:count]
+            ],
+        }
+
+    def count_queries(self, method, path, count, status):
+        with CaptureQueriesContext(connection) as context:
+            response = method(path, self.recipe_data(count), format='json')
+        self.assertEqual(response.status_code, status, response.content)
+        self.assertEqual(len(response.json()['ingredients']), count)
+        return len(context.captured_queries), response.json()['id']
+
+    def test_create_and_update(self):
+        # Первое сохранение картинки создает запись о файле
+        self.client.post('/api/recipes/', self.recipe_data(1), format='json')
+        few, recipe_id = self.count_queries(
+            self.client.post, '/api/recipes/', 1, 201,
+        )
+        many, _ = self.count_queries(
+            self.client.post, '/api/recipes/', 10, 201,
+        )
+        self.assertEqual(few, many)
+        path = f'/api/recipes/{recipe_id}/'
+        few, _ = self.count_queries(self.client.patch, path, 1, 200)
+        many, _ = self.count_queries(self.client.patch, path, 10, 200)
+        self.assertEqual(few, many)
+
+    def test_unknown_ingredient(self):
+        data = self.recipe_data(2)
+        data['ingredients'][1]['id'] = 0
+        data['ingredients'].append({'id': 'x', 'amount': 10})
+        response = self.client.post('/api/recipes/', data, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['ingredients']
+        self.assertEqual(errors[0], {})
+        self.assertIn('id', errors[1])
+        self.assertIn('id', errors[2])
@@ -0,0 +1,47 @@
+from urllib.parse import urlencode, urlsplit
+
+from django.test import TestCase
+
+from recipes.tests.factories import (
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+class SearchKeysetPaginationTests(TestCase):
+    """
+    Обход результатов поиска по курсору: каждый рецепт попадает
+    ровно на одну страницу, в том числе при равной релевантности
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        ingredients = create_ingredients(3, 'Томат')
+        cls.ids = set()
+        for number in range(13):
+            name = 'Томатный суп' if number % 2 else 'Суп'
+            recipe = create_recipe(
+                author,
+                ingredients[:number % 3 + 1],
+                name=f'{name} {number}',
+            )
+            cls.ids.add(recipe.pk)
+
+    def test_cursor_walks_all_results(self):
+        seen = []
+        url = '/api/recipes/?' + urlencode(
+            {'search': 'Томат', 'limit': 4, 'cursor': ''},
+        )
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            seen.extend(recipe['id'] for recipe in data['results'])
+            url = data['next'] and '?'.join(
+                urlsplit(data['next'])[2:4],
+            )
+            self.assertLessEqual(len(seen), len(self.ids))
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(set(seen), self.ids)
@@ -0,0 +1,107 @@
+from functools import partial
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+
+from recipes.models import ShoppingCart, ShoppingListItem
+from recipes.shopping_list import apply_shopping_list_delta
+from recipes.tests.factories import (
+    ConcurrencyMixin,
+    auth_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+def shopping_list(user):
+    return dict(
+        ShoppingListItem.objects.filter(
+            user=user,
+        ).values_list('ingredient_id', 'total_amount')
+    )
+
+
+class ShoppingListDeltaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('buyer')
+        cls.ingredients = create_ingredients(3)
+
+    def test_adds_to_existing_and_deletes_empty(self):
+        first, second, third = (
+            ingredient.pk for ingredient in self.ingredients
+        )
+        apply_shopping_list_delta([self.user.pk], {first: 10, second: 5})
+        apply_shopping_list_delta(
+            [self.user.pk], {first: 7, second: -5, third: 1},
+        )
+        self.assertEqual(shopping_list(self.user), {first: 17, third: 1})
+
+
+
+class ShoppingListFixtureTests(TestCase):
+    """
+    Списки покупок загружаются из фикстуры, а не строятся сигналом
+    """
+
+    def test_loaddata(self):
+        fixture = settings.BASE_DIR / 'fixtures' / 'data.json'
+        for _ in range(2):
+            call_command('loaddata', fixture, verbosity=0)
+            call_command(
+                'rebuild_shopping_lists', check=True, stdout=StringIO(),
+            )
+        self.assertTrue(ShoppingListItem.objects.exists())
+
+    def test_raw_save_skipped(self):
+        user = create_user('buyer')
+        recipe = create_recipe(user, create_ingredients(2))
+        ShoppingCart(user=user, recipe=recipe).save_base(raw=True)
+        self.assertEqual(shopping_list(user), {})
+
+class ShoppingListConcurrencyTests(ConcurrencyMixin, TransactionTestCase):
+    """
+    Одновременное добавление в список покупок рецептов с общими
+    ингредиентами: строки общих ингредиентов вставляются обоими запросами
+    """
+    rounds = 5
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('buyer')
+        author = create_user('author')
+        self.shared = create_ingredients(3, 'Общий')
+        self.recipes = [
+            create_recipe(
+                author,
+                self.shared + create_ingredients(2, f'Рецепт {number}'),
+            )
+            for number in range(2)
+        ]
+        self.clients = [auth_client(self.user) for _ in self.recipes]
+
+    def toggle_concurrently(self, method):
+        return [
+            response.status_code
+            for response in self.run_concurrently(*(
+                partial(
+                    getattr(client, method),
+                    f'/api/recipes/{recipe.pk}/shopping_cart/',
+                )
+                for client, recipe in zip(self.clients, self.recipes)
+            ))
+        ]
+
+    def test_parallel_add_and_remove(self):
+        for _ in range(self.rounds):
+            self.assertEqual(self.toggle_concurrently('post'), [201, 201])
+            items = shopping_list(self.user)
+            self.assertEqual(len(items), 7)
+            for ingredient in self.shared:
+                self.assertEqual(items[ingredient.pk], 20)
+            self.assertEqual(self.toggle_concurrently('delete'), [204, 204])
+            self.assertEqual(shopping_list(self.user), {})
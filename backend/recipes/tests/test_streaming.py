@@ -0,0 +1,67 @@
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from django.test.client import AsyncRequestFactory, RequestFactory
+from rest_framework.authtoken.models import Token
+
+from recipes.tests.factories import (
+    TemporaryMediaMixin,
+    auth_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+    save_image,
+)
+from recipes.views import RecipeViewSet, shopping_cart_list
+
+
+async def read_async(response):
+    return b''.join([part async for part in response.streaming_content])
+
+
+class StreamingResponseTests(TemporaryMediaMixin, TestCase):
+    """
+    Потоковые ответы под ASGI отдаются асинхронным итератором
+    и не читаются Django целиком в память
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        ingredients = create_ingredients(5)
+        cls.recipe = create_recipe(cls.user, ingredients, image=save_image())
+        auth_client(cls.user).post(
+            f'/api/recipes/{cls.recipe.pk}/shopping_cart/',
+        )
+        token = Token.objects.get(user=cls.user)
+        cls.headers = {'Authorization': f'Token {token.key}'}
+
+    def assert_streams(self, view, path):
+        sync_response = view(
+            RequestFactory().get(path, headers=self.headers),
+        )
+        self.assertFalse(sync_response.is_async)
+        expected = b''.join(sync_response.streaming_content)
+        async_response = view(
+            AsyncRequestFactory().get(path, headers=self.headers),
+        )
+        self.assertEqual(async_response.status_code, 200)
+        self.assertTrue(async_response.is_async)
+        self.assertEqual(async_to_sync(read_async)(async_response), expected)
+        return expected
+
+    def test_shopping_cart(self):
+        for file_format in ('txt', 'csv', 'json'):
+            with self.subTest(file_format=file_format):
+                content = self.assert_streams(
+                    shopping_cart_list,
+                    '/api/recipes/download_shopping_cart/'
+                    f'?format={file_format}',
+                )
+                self.assertIn('Ингредиент 4'.encode(), content)
+
+    def test_export(self):
+        content = self.assert_streams(
+            RecipeViewSet.as_view({'get': 'export_recipes'}),
+            '/api/recipes/export/',
+        )
+        self.assertEqual(content.count(b'\n'), 1)
@@ -0,0 +1,53 @@
+import json
+
+from django.test import TestCase
+
+from recipes.tests.factories import (
+    TemporaryMediaMixin,
+    auth_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+    save_image,
+)
+
+
+class ExportTests(TemporaryMediaMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        ingredients = create_ingredients(2)
+        cls.with_image = create_recipe(
+            cls.author, ingredients, name='С картинкой', image=save_image(),
+        )
+        cls.missing_image = create_recipe(
+            cls.author, ingredients, name='Без файла',
+            image='recipe_images/missing.png',
+        )
+
+    def export(self):
+        response = auth_client(self.author).get('/api/recipes/export/')
+        self.assertEqual(response.status_code, 200)
+        return {
+            record['name']: record
+            for record in map(
+                json.loads,
+                b''.join(response.streaming_content).splitlines(),
+            )
+        }
+
+    def test_missing_image_does_not_stop_export(self):
+        with self.assertLogs('recipes.transfer') as logs:
+            records = self.export()
+        self.assertEqual(set(records), {'С картинкой', 'Без файла'})
+        self.assertTrue(
+            records['С картинкой']['image'].startswith('data:image/png;'),
+        )
+        self.assertNotIn('image_missing', records['С картинкой'])
+        missing = records['Без файла']
+        self.assertIsNone(missing['image'])
+        self.assertIs(missing['image_missing'], True)
+        self.assertNotIn('recipe_images', json.dumps(missing))
+        self.assertIn('recipe_images/missing.png', logs.output[0])
+        self.assertEqual(len(missing['ingredients']), 2)
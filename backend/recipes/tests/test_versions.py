@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe
+from recipes.tests.factories import (
+    auth_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+class RecipeVersionTests(TestCase):
+    """
+    Версия рецепта, по которой кешируются ответы
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('author')
+        cls.ingredient, cls.other = create_ingredients(2)
+        cls.recipe = create_recipe(cls.user, [cls.ingredient])
+        cls.unrelated = create_recipe(cls.user, [cls.other], name='Другой')
+
+    def setUp(self):
+        cache.clear()
+
+    def stored_version(self, recipe):
+        return Recipe.objects.values_list(
+            'version', flat=True,
+        ).get(pk=recipe.pk)
+
+    def test_save_keeps_version_number(self):
+        version = self.stored_version(self.recipe)
+        self.recipe.save()
+        self.assertEqual(self.recipe.version, version + 1)
+        self.recipe.name = 'Новое название'
+        self.recipe.save(update_fields=['name'])
+        self.assertEqual(self.recipe.version, version + 2)
+        self.assertEqual(self.stored_version(self.recipe), version + 2)
+
+    def test_save_does_not_read_version(self):
+        with CaptureQueriesContext(connection) as context:
+            self.recipe.save()
+        self.assertFalse([
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and '"recipes_recipe"."version"' in query['sql']
+        ])
+
+    def test_ingredient_change_bumps_recipes(self):
+        version = self.stored_version(self.recipe)
+        unrelated_version = self.stored_version(self.unrelated)
+        client = auth_client(self.user)
+        path = f'/api/recipes/{self.recipe.pk}/'
+        self.assertEqual(client.get(path).status_code, 200)
+        self.ingredient.name = 'Переименованный ингредиент'
+        self.ingredient.save()
+        self.assertEqual(self.stored_version(self.recipe), version + 1)
+        self.assertEqual(
+            self.stored_version(self.unrelated), unrelated_version,
+        )
+        response = client.get(path)
+        self.assertEqual(
+            response.json()['ingredients'][0]['name'],
+            'Переименованный ингредиент',
+        )
+
+
+class RecipeDetailTests(TestCase):
+    """
+    Получение рецепта по идентификатору
+    """
+
+    def test_non_numeric_id(self):
+        for path in ('/api/recipes/abc/', '/api/recipes/1.5/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
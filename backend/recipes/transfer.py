@@ -0,0 +1,231 @@
+import json
+import logging
+import mimetypes
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+
+from ingredients.models import Ingredient
+from .constants import (
+    RECIPE_EXPORT_CHUNK_SIZE,
+    RECIPE_IMPORT_CHUNK_SIZE,
+)
+from .models import Recipe, RecipeIngredient
+from .serializers import RecipeImportSerializer
+from .signals import recipes_imported
+
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+logger = logging.getLogger('recipes.transfer')
+
+
+def prepare_record(line_number, line):
+    """
+    Разбор и проверка строки импорта. Выполняется в потоках пула,
+    поэтому декодирование base64 и проверка изображений идут
+    параллельно. Обращений к БД здесь нет
+    """
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return line_number, None, {'non_field_errors': ['Некорректный JSON']}
+    serializer = RecipeImportSerializer(data=data)
+    if not serializer.is_valid():
+        return line_number, None, serializer.errors
+    return line_number, dict(serializer.validated_data), None
+
+
+class RecipeImporter:
+    """
+    Импорт рецептов автора из строк NDJSON. Строки обрабатываются
+    порциями по chunk_size: строки порции проверяются, а картинки
+    декодируются в workers потоков, ингредиенты порции находятся
+    одним запросом, рецепты и их ингредиенты создаются bulk_create
+    в одной транзакции на порцию.
+    Некорректные строки пропускаются и возвращаются в списке ошибок
+    """
+
+    def __init__(self, author, workers=None, chunk_size=None):
+        self.author = author
+        self.workers = workers or settings.RECIPE_IMPORT_WORKERS
+        self.chunk_size = chunk_size or RECIPE_IMPORT_CHUNK_SIZE
+        self.storage = Recipe._meta.get_field('image').storage
+
+    def run(self, lines):
+        self.created = 0
+        self.errors = []
+        numbered = (
+            (line_number, line)
+            for line_number, line in enumerate(lines, 1)
+            if line.strip()
+        )
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while chunk := list(islice(numbered, self.chunk_size)):
+                records = []
+                for line_number, record, errors in pool.map(
+                    prepare_record, *zip(*chunk),
+                ):
+                    if errors is None:
+                        records.append((line_number, record))
+                    else:
+                        self.add_error(line_number, errors)
+                self.save_chunk(records)
+        self.errors.sort(key=lambda error: error['line'])
+        return {'created': self.created, 'errors': self.errors}
+
+    def add_error(self, line_number, errors):
+        self.errors.append({'line': line_number, 'errors': errors})
+
+    def save_chunk(self, records):
+        ingredient_ids = self.resolve_ingredients(records)
+        recipes = []
+        amounts = []
+        for line_number, record in records:
+            missing = [
+                f'{ingredient["name"]}, {ingredient["measurement_unit"]}'
+                for ingredient in record['ingredients']
+                if self.ingredient_key(ingredient) not in ingredient_ids
+            ]
+            if missing:
+                self.add_error(line_number, {
+                    'ingredients': [
+                        f'Ингредиент не найден: {name}' for name in missing
+                    ],
+                })
+                continue
+            recipes.append(Recipe(
+                author=self.author,
+                name=record['name'],
+                text=record['text'],
+                cooking_time=record['cooking_time'],
+                image=self.save_image(record['image']),
+            ))
+            amounts.append({
+                ingredient_ids[self.ingredient_key(ingredient)]:
+                    ingredient['amount']
+                for ingredient in record['ingredients']
+            })
+        if not recipes:
+            return
+        try:
+            with transaction.atomic():
+                Recipe.objects.bulk_create(recipes)
+                RecipeIngredient.objects.bulk_create([
+                    RecipeIngredient(
+                        recipe=recipe,
+                        ingredient_id=ingredient_id,
+                        amount=amount,
+                    )
+                    for recipe, ingredients in zip(recipes, amounts)
+                    for ingredient_id, amount in ingredients.items()
+                ])
+                recipes_imported.send(
+                    sender=Recipe,
+                    author_id=self.author.pk,
+                    recipes=recipes,
+                    ingredients={
+                        recipe.pk: ingredients
+                        for recipe, ingredients in zip(recipes, amounts)
+                    },
+                )
+        except BaseException:
+            for recipe in recipes:
+                self.storage.delete(recipe.image.name)
+            raise
+        self.created += len(recipes)
+
+    def save_image(self, upload):
+        field = Recipe._meta.get_field('image')
+        return self.storage.save(
+            field.generate_filename(None, upload.name), upload,
+        )
+
+    @staticmethod
+    def ingredient_key(ingredient):
+        return ingredient['name'], ingredient['measurement_unit']
+
+    def resolve_ingredients(self, records):
+        """
+        Идентификаторы ингредиентов порции по названию и единице
+        измерения, одним запросом
+        """
+        names = {
+            ingredient['name']
+            for _, record in records
+            for ingredient in record['ingredients']
+        }
+        return {
+            (name, measurement_unit): pk
+            for name, measurement_unit, pk in Ingredient.objects.filter(
+                name__in=names,
+            ).values_list('name', 'measurement_unit', 'pk')
+        }
+
+
+def serialize_recipe(recipe):
+    """
+    Строка NDJSON с рецептом: картинка встраивается как data URI,
+    ингредиенты задаются названием и единицей измерения.
+    Если файл картинки не читается, рецепт выгружается без картинки
+    с признаком image_missing, чтобы экспорт не обрывался. Путь
+    к файлу и ошибка пишутся только в журнал сервера
+    """
+    record = {
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+    }
+    try:
+        with recipe.image.storage.open(recipe.image.name, 'rb') as file:
+            image = b64encode(file.read()).decode()
+    except OSError as error:
+        logger.warning(
+            'Не удалось прочитать картинку рецепта %s (%s): %s',
+            recipe.pk, recipe.image.name, error.strerror or error,
+        )
+        record['image'] = None
+        record['image_missing'] = True
+    else:
+        content_type = (
+            mimetypes.guess_type(recipe.image.name)[0]
+            or 'application/octet-stream'
+        )
+        record['image'] = f'data:{content_type};base64,{image}'
+    return json.dumps({
+        **record,
+        'ingredients': [
+            {
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.recipeingredient_set.all()
+        ],
+    }, ensure_ascii=False) + '\n'
+
+
+def export_recipes(queryset, workers=None, chunk_size=None):
+    """
+    Потоковый экспорт рецептов в NDJSON. Рецепты читаются порциями
+    вместе с ингредиентами, картинки порции читаются и кодируются
+    в workers потоков
+    """
+    chunk_size = chunk_size or RECIPE_EXPORT_CHUNK_SIZE
+    recipes = queryset.prefetch_related(
+        Prefetch(
+            'recipeingredient_set',
+            queryset=RecipeIngredient.objects.select_related(
+                'ingredient',
+            ).order_by('pk'),
+        ),
+    ).order_by('pk').iterator(chunk_size=chunk_size)
+    with ThreadPoolExecutor(
+        max_workers=workers or settings.RECIPE_IMPORT_WORKERS,
+    ) as pool:
+        while chunk := list(islice(recipes, chunk_size)):
+            yield from pool.map(serialize_recipe, chunk)
@@ -24,5 +24,9 @@ urlpatterns = [
         'recipes/download_shopping_cart/',
         views.shopping_cart_list,
     ),
+    path(
+        'recipes/',
+        views.recipe_list,
+    ),
     path('', include(router.urls)),
 ]
@@ -1,98 +1,150 @@
+import csv
+import json
+
 from rest_framework import (
     viewsets,
     status
 )
+from rest_framework.exceptions import (
+    ValidationError,
+    APIException,
+)
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.permissions import (
+    IsAuthenticatedOrReadOnly,
+    IsAuthenticated,
+)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.decorators import (
+    renderer_classes,
     api_view,
     action,
 )
-from django.shortcuts import (
-    get_object_or_404,
-    redirect,
-)
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import redirect
 from django.urls import reverse
-from django.db.models import Sum
 from django.http import (
-    HttpResponse,
+    HttpResponseNotAllowed,
     HttpRequest,
+    Http404,
 )
+from django.utils.cache import patch_vary_headers
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import (
     FavouriteUserRecipe,
-    RecipeIngredient,
+    ShoppingListItem,
     ShoppingCart,
     Recipe,
 )
 from .filters import RecipeFilter
-from users.paginators import PageLimitPagination
+from users.async_views import (
+    streaming_response,
+    exception_response,
+    async_read_view,
+    json_response,
+)
+from users.paginators import (
+    PageLimitKeysetPagination,
+    PageLimitPagination,
+)
+from users.toggles import (
+    remove_relation,
+    add_relation,
+    Toggle,
+)
 from .serializers import (
     RecipeListDetailSerializer,
     RecipePostPatchSerializer,
-    SimpleRecipeSerializer
+    SimpleRecipeSerializer,
+    RecipeMatchSerializer,
 )
 from .permissions import OwnerOrReadOnly
+from .renderers import (
+    PlainTextRenderer,
+    CSVRenderer,
+)
+from .cache import (
+    get_feed_generation,
+    set_recipe_detail,
+    feed_cache_key,
+    get_recipe_detail,
+    etag_matches,
+    recipe_etag,
+)
+from .matching import recipe_match_index
+from .transfer import (
+    NDJSON_CONTENT_TYPE,
+    RecipeImporter,
+    export_recipes,
+)
+from .constants import (
+    RECIPE_EXPORT_CHUNK_SIZE,
+    SHOPPING_CART_CHUNK_SIZE,
+    SHOPPING_CART_FILENAME,
+    MATCH_MAX_INGREDIENTS,
+)
 
 
-@api_view(['GET'])
-def redirect_from_short_link(request: HttpRequest, id):
+async def redirect_from_short_link(request: HttpRequest, id):
     """
-    Редирект с короткой ссылки
+    Редирект с короткой ссылки. Асинхронное представление без обращения
+    к БД: существование рецепта проверяет страница, на которую
+    выполняется редирект
     """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
     return redirect(f'/recipes/{id}/')
 
 
-@api_view(['POST', 'DELETE'])
-def add_favourite_recipe(request: HttpRequest, id):
+def toggle_recipe_relation(request, id, model, messages):
     """
-    Функция добавления рецепта в избранное
-    и удаления рецепта из избранного
+    Добавление рецепта в избранное или список покупок (POST)
+    и удаление из него (DELETE). Изменение выполняется одним запросом
     """
     if not request.user.is_authenticated:
         return Response(
             {'detail': 'Учетные данные не были предоставлены.'},
             status=status.HTTP_401_UNAUTHORIZED,
         )
-    recipe = get_object_or_404(
-        Recipe,
-        pk=id,
-    )
     if request.method == 'POST':
-        if FavouriteUserRecipe.objects.filter(
-            user=request.user,
-            recipe=recipe,
-        ).exists():
-            return Response(
-                {'detail': 'Рецепт уже добавлен в избранное'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        FavouriteUserRecipe.objects.create(
-            user=request.user,
-            recipe=recipe,
-        )
-        serializer = SimpleRecipeSerializer(recipe)
+        result = add_relation(model, 'recipe', request.user.pk, id)
+    else:
+        result = remove_relation(model, 'recipe', request.user.pk, id)
+    if result is Toggle.NOT_FOUND:
+        raise Http404
+    if result in (Toggle.EXISTS, Toggle.ABSENT):
         return Response(
-            data=serializer.data,
-            status=status.HTTP_201_CREATED,
-        )
-    elif request.method == 'DELETE':
-        if not FavouriteUserRecipe.objects.filter(
-            user=request.user,
-            recipe=recipe,
-        ).exists():
-            return Response(
-                {'detail': 'Рецепта нет в избранном'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        FavouriteUserRecipe.objects.filter(
-            user=request.user,
-            recipe=recipe,
-        ).delete()
+            {'detail': messages[result]},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if result is Toggle.REMOVED:
         return Response(
             status=status.HTTP_204_NO_CONTENT,
         )
+    serializer = SimpleRecipeSerializer(Recipe.objects.get(pk=id))
+    return Response(
+        data=serializer.data,
+        status=status.HTTP_201_CREATED,
+    )
+
+
+@api_view(['POST', 'DELETE'])
+def add_favourite_recipe(request: HttpRequest, id):
+    """
+    Функция добавления рецепта в избранное
+    и удаления рецепта из избранного
+    """
+    return toggle_recipe_relation(
+        request,
+        id,
+        FavouriteUserRecipe,
+        {
+            Toggle.EXISTS: 'Рецепт уже добавлен в избранное',
+            Toggle.ABSENT: 'Рецепта нет в избранном',
+        },
+    )
 
 
 @api_view(['POST', 'DELETE'])
@@ -101,80 +153,108 @@ def add_shopping_cart(request: HttpRequest, id):
     Функция добавления рецепта в список покупок
     и удаления рецепта из списка покупок
     """
-    if not request.user.is_authenticated:
-        return Response(
-            {'detail': 'Учетные данные не были предоставлены.'},
-            status=status.HTTP_401_UNAUTHORIZED,
-        )
-    recipe = get_object_or_404(
-        Recipe,
-        pk=id,
+    return toggle_recipe_relation(
+        request,
+        id,
+        ShoppingCart,
+        {
+            Toggle.EXISTS: 'Рецепт уже есть в списке покупок.',
+            Toggle.ABSENT: 'Рецепта нет в списке покупок',
+        },
     )
-    if request.method == 'POST':
-        if ShoppingCart.objects.filter(
-            user=request.user,
-            recipe=recipe,
-        ).exists():
-            return Response(
-                {'detail': 'Рецепт уже есть в списке покупок.'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        ShoppingCart.objects.create(
-            user=request.user,
-            recipe=recipe,
+
+
+class _Echo:
+    """
+    Псевдобуфер для csv.writer: вместо записи возвращает строку
+    """
+
+    def write(self, value):
+        return value
+
+
+def _shopping_cart_txt(ingredients):
+    yield 'Список ингредиентов:\n'
+    for ingredient in ingredients:
+        yield (
+            f'{ingredient["ingredient__name"]} '
+            f'({ingredient["ingredient__measurement_unit"]}) - '
+            f'{ingredient["total_amount"]}\n'
         )
-        serializer = SimpleRecipeSerializer(recipe)
-        return Response(
-            data=serializer.data,
-            status=status.HTTP_201_CREATED,
-        )
-    elif request.method == 'DELETE':
-        if not ShoppingCart.objects.filter(
-            user=request.user,
-            recipe=recipe,
-        ).exists():
-            return Response(
-                {'detail': 'Рецепта нет в списке покупок'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        ShoppingCart.objects.filter(
-            user=request.user,
-            recipe=recipe,
-        ).delete()
-        return Response(
-            status=status.HTTP_204_NO_CONTENT,
+
+
+def _shopping_cart_csv(ingredients):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['ingredient__measurement_unit'],
+            ingredient['total_amount'],
+        ))
+
+
+def _shopping_cart_json(ingredients):
+    yield '['
+    separator = ''
+    for ingredient in ingredients:
+        yield separator + json.dumps(
+            {
+                'name': ingredient['ingredient__name'],
+                'measurement_unit': ingredient[
+                    'ingredient__measurement_unit'
+                ],
+                'amount': ingredient['total_amount'],
+            },
+            ensure_ascii=False,
         )
+        separator = ','
+    yield ']'
+
+
+SHOPPING_CART_WRITERS = {
+    'txt': _shopping_cart_txt,
+    'csv': _shopping_cart_csv,
+    'json': _shopping_cart_json,
+}
 
 
 @api_view(['GET'])
+@renderer_classes([PlainTextRenderer, CSVRenderer, JSONRenderer])
 def shopping_cart_list(request: HttpRequest):
     """
-    Функция получения списка покупок пользователя в формате .txt файла
+    Функция получения списка покупок пользователя в виде файла.
+    Формат выбирается параметром ?format=txt|csv|json (по умолчанию txt).
+    Ингредиенты читаются порциями из заранее посчитанного списка покупок,
+    а файл отдается потоком, поэтому потребление памяти не зависит
+    от размера списка покупок
     """
     if not request.user.is_authenticated:
         return Response(
             status=status.HTTP_401_UNAUTHORIZED,
         )
-    _shopping_cart_list = ShoppingCart.objects.filter(
-        user=request.user
-    )
-    ingredients = RecipeIngredient.objects.filter(
-        recipe__in=_shopping_cart_list.values_list('recipe_id', flat=True)
+    renderer = request.accepted_renderer
+    ingredients = ShoppingListItem.objects.filter(
+        user=request.user,
     ).values(
-        'ingredient__id',
         'ingredient__name',
-        'ingredient__measurement_unit'
-    ).annotate(
-        total_amount=Sum('amount'),
+        'ingredient__measurement_unit',
+        'total_amount',
+    ).order_by(
+        'ingredient__name',
+    ).iterator(
+        chunk_size=SHOPPING_CART_CHUNK_SIZE,
+    )
+    response = streaming_response(
+        request,
+        SHOPPING_CART_WRITERS[renderer.format](ingredients),
+        SHOPPING_CART_CHUNK_SIZE,
+        content_type=f'{renderer.media_type}; charset=utf-8',
+    )
+    response['Content-Disposition'] = (
+        'attachment; '
+        f'filename="{SHOPPING_CART_FILENAME}.{renderer.format}"'
     )
-    content = 'Список ингредиентов:\n'
-    for ingredient in ingredients:
-        content += f'{ingredient["ingredient__name"]} ('
-        content += f'{ingredient["ingredient__measurement_unit"]}'
-        content += f') - {ingredient["total_amount"]}\n'
-    response = HttpResponse(content, content_type='text/plain')
-    response['Content-Disposition'] = 'attachment; '
-    'filename="shopping_cart_list.txt"'
     return response
 
 
@@ -187,22 +267,107 @@ class RecipeViewSet(viewsets.ModelViewSet):
         - обновление рецепта
         - удаления рецепта
         - получения короткой ссылки на рецепт
+        - получения ленты рецептов авторов из подписок
+        - подбора рецептов по имеющимся ингредиентам
+        - импорта и экспорта рецептов в формате NDJSON
     """
     queryset = Recipe.objects.all()
-    pagination_class = PageLimitPagination
+    pagination_class = PageLimitKeysetPagination
+    keyset_actions = ('feed',)
     permission_classes = [IsAuthenticatedOrReadOnly, OwnerOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        """
+        Формирование запроса к рецептам:
+            - флаги is_favorited, is_in_shopping_cart и подписка на автора
+              вычисляются подзапросами EXISTS в основном запросе
+            - автор рецепта подгружается через JOIN
+            - ингредиенты рецептов подгружаются одним запросом
+        Число запросов не зависит от количества рецептов на странице
+        """
+        queryset = Recipe.objects.all()
+        if self.action == 'feed':
+            queryset = queryset.filter(
+                author__followers__user=self.request.user,
+            )
+        if self.action in ('list', 'retrieve', 'feed', 'match'):
+            queryset = queryset.with_related()
+        return queryset.with_user_flags(self.request.user)
+
     def get_serializer_class(self):
         """
         Если метод 'безопасный', то используется сериализатор
         RecipeListDetailSerializer, иначе - RecipePostPatchSerializer
         """
-        if self.action in ('list', 'retrieve', 'get_link'):
+        if self.action == 'match':
+            return RecipeMatchSerializer
+        if self.action in ('list', 'retrieve', 'get_link', 'feed'):
             return RecipeListDetailSerializer
         return RecipePostPatchSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Получение рецепта по идентификатору.
+        Одним запросом читаются версия рецепта и флаги текущего
+        пользователя. Если ETag совпадает с If-None-Match, возвращается 304.
+        Иначе общая для всех пользователей часть ответа берется из кеша
+        по идентификатору и версии рецепта, а флаги пользователя
+        подставляются поверх нее
+        """
+        try:
+            recipe_id = int(
+                self.kwargs[self.lookup_url_kwarg or self.lookup_field],
+            )
+        except (TypeError, ValueError):
+            raise Http404
+        state = self.get_state_queryset(recipe_id).first()
+        if state is None:
+            raise Http404
+        etag = recipe_etag(
+            request, recipe_id, state, request.accepted_renderer.media_type,
+        )
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = get_recipe_detail(request, recipe_id, state['version'])
+            if data is None:
+                recipe = self.get_object()
+                data = self.get_serializer(recipe).data
+                set_recipe_detail(request, recipe_id, recipe.version, data)
+            response = Response(self.apply_user_flags(data, state))
+        return self.finalize_detail_response(response, etag)
+
+    def get_state_queryset(self, recipe_id):
+        """
+        Запрос версии рецепта и флагов текущего пользователя
+        """
+        return Recipe.objects.filter(
+            pk=recipe_id,
+        ).with_user_flags(
+            self.request.user,
+        ).values(
+            'version',
+            'is_favorited',
+            'is_in_shopping_cart',
+            'author_is_subscribed',
+        )
+
+    @staticmethod
+    def apply_user_flags(data, state):
+        data['is_favorited'] = state['is_favorited']
+        data['is_in_shopping_cart'] = state['is_in_shopping_cart']
+        data['author']['is_subscribed'] = state['author_is_subscribed']
+        return data
+
+    @staticmethod
+    def finalize_detail_response(response, etag):
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
     def get_serializer_context(self):
         """
         Добавляем request в контекст сериализатора
@@ -211,6 +376,143 @@ class RecipeViewSet(viewsets.ModelViewSet):
         context['request'] = self.request
         return context
 
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+    )
+    def feed(self, request):
+        """
+        Лента рецептов авторов, на которых подписан пользователь.
+        Рецепты выбираются одним запросом с соединением подписок
+        и постранично по курсору. Первые страницы ленты кешируются
+        для каждого пользователя до публикации или изменения рецепта
+        автором из подписок, изменения подписок, избранного
+        или списка покупок пользователя и изменения ингредиентов.
+        Поколения авторов из подписок проверяются при чтении ленты
+        """
+        cache_key = None
+        if (
+            self.paginator.get_page_index(request)
+            in range(1, settings.RECIPE_FEED_CACHED_PAGES + 1)
+        ):
+            cache_key = feed_cache_key(
+                request, get_feed_generation(request.user.pk),
+            )
+            data = cache.get(cache_key)
+            if data is not None:
+                return Response(data)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        if cache_key is not None:
+            cache.set(
+                cache_key, response.data, settings.RECIPE_FEED_CACHE_TIMEOUT,
+            )
+        return response
+
+    @action(
+        detail=False,
+        methods=['get'],
+        pagination_class=PageLimitPagination,
+    )
+    def match(self, request):
+        """
+        Подбор рецептов по ингредиентам (?ingredients=1,5,9).
+        Рецепты ранжируются по доле своих ингредиентов, которые есть
+        в запросе, затем по числу найденных ингредиентов.
+        Подбор выполняется по обратному индексу в памяти процесса,
+        из БД читаются только рецепты страницы. Число подобранных
+        рецептов ограничено настройкой RECIPE_MATCH_LIMIT
+        """
+        ingredient_ids = self.get_match_ingredients(request)
+        _, matches = recipe_match_index.match(
+            ingredient_ids, limit=settings.RECIPE_MATCH_LIMIT,
+        )
+        page = self.paginate_queryset(matches)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in page],
+        )
+        results = []
+        for recipe_id, matched, size in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.coverage = matched / size
+            recipe.matched_ingredients = matched
+            recipe.missing_ingredients = size - matched
+            results.append(recipe)
+        serializer = self.get_serializer(results, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @staticmethod
+    def get_match_ingredients(request):
+        value = request.query_params.get('ingredients', '')
+        try:
+            ingredient_ids = {
+                int(item) for item in value.split(',') if item.strip()
+            }
+        except ValueError:
+            raise ValidationError({
+                'ingredients': 'Ожидается список идентификаторов '
+                               'ингредиентов через запятую',
+            })
+        if not ingredient_ids:
+            raise ValidationError({
+                'ingredients': 'Укажите хотя бы один ингредиент',
+            })
+        if len(ingredient_ids) > MATCH_MAX_INGREDIENTS:
+            raise ValidationError({
+                'ingredients': 'Можно указать не больше '
+                               f'{MATCH_MAX_INGREDIENTS} ингредиентов',
+            })
+        return ingredient_ids
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAuthenticated],
+        url_path='import',
+    )
+    def import_recipes(self, request):
+        """
+        Импорт рецептов текущего пользователя из тела запроса в формате
+        NDJSON: по одному рецепту в строке, как в ответе export.
+        Тело читается построчно, некорректные строки пропускаются
+        и перечисляются в ответе
+        """
+        result = RecipeImporter(request.user).run(request.stream or ())
+        return Response(
+            result,
+            status=(
+                status.HTTP_201_CREATED if result['created']
+                else status.HTTP_400_BAD_REQUEST
+            ),
+        )
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        url_path='export',
+    )
+    def export_recipes(self, request):
+        """
+        Потоковый экспорт рецептов в формате NDJSON с картинками
+        в base64. Поддерживает те же фильтры, что и список рецептов
+        """
+        response = streaming_response(
+            request,
+            export_recipes(self.filter_queryset(Recipe.objects.all())),
+            RECIPE_EXPORT_CHUNK_SIZE,
+            content_type=f'{NDJSON_CONTENT_TYPE}; charset=utf-8',
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="recipes.ndjson"'
+        )
+        return response
+
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_link(self, request, pk=None):
         """
@@ -232,3 +534,25 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+
+
+async def recipe_list_async(view):
+    """
+    Асинхронное получение списка рецептов: фильтры, пагинация
+    и сериализация те же, что в RecipeViewSet, а запросы к БД
+    выполняются без блокировки цикла событий
+    """
+    try:
+        queryset = view.filter_queryset(view.get_queryset())
+        page = await view.paginator.apaginate_queryset(
+            queryset, view.request, view,
+        )
+    except APIException as exc:
+        return exception_response(exc)
+    data = view.get_serializer(page, many=True).data
+    return json_response(view.paginator.get_paginated_response(data).data)
+
+
+recipe_list = async_read_view(
+    RecipeViewSet, {'get': 'list', 'post': 'create'}, recipe_list_async,
+)
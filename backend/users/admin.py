@@ -13,6 +13,7 @@ class CustomUserAdmin(admin.ModelAdmin):
     ]
     list_display = [
         'id', 'username', 'first_name', 'last_name', 'email',
+        'recipes_count', 'followers_count',
     ]
     search_fields = [
         'email', 'username'
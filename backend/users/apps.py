@@ -5,3 +5,9 @@ class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
     verbose_name = 'Пользователи'
+
+    def ready(self):
+        from images.renditions import register_image_field
+        from .models import CustomUser
+
+        register_image_field(CustomUser, 'avatar', 'avatar_renditions')
@@ -0,0 +1,149 @@
+from functools import wraps
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+from monitoring.renderers import TimedJSONRenderer
+
+
+TOKEN_KEYWORD = 'token'
+
+
+async def aauthenticate(request):
+    """
+    Асинхронный аналог TokenAuthentication.
+    Возвращает None, если токен передан, но не подходит: такой запрос
+    обрабатывается синхронным представлением, которое вернет ошибку
+    в формате DRF
+    """
+    auth = request.headers.get('Authorization', '').split()
+    if not auth or auth[0].lower() != TOKEN_KEYWORD:
+        return AnonymousUser()
+    if len(auth) != 2:
+        return None
+    token = await Token.objects.select_related(
+        'user',
+    ).filter(
+        key=auth[1],
+    ).afirst()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+def check_request(view):
+    """
+    Проверки, которые APIView.initial выполняет до обработчика:
+    согласование формата ответа, права доступа и ограничение частоты
+    запросов. Асинхронные представления отдают только JSON, поэтому
+    запросы других форматов (browsable API, а также неприемлемые
+    форматы, на которые DRF отвечает 406) проверку не проходят.
+    Проверки выполняются в цикле событий и не должны обращаться к БД
+    """
+    request = view.request
+    try:
+        renderer, media_type = view.perform_content_negotiation(request)
+        view.check_permissions(request)
+        view.check_throttles(request)
+    except APIException:
+        return False
+    return renderer.format == 'json'
+
+
+def async_read_view(viewset, actions, async_view):
+    """
+    Представление, которое обрабатывает GET-запросы асинхронной функцией
+    async_view(view), где view - экземпляр вьюсета viewset (make_view),
+    а остальные запросы - синхронным представлением DRF вьюсета
+    с действиями actions. Запросы, не прошедшие аутентификацию или
+    проверки check_request, также передаются синхронному представлению,
+    которое вернет ошибку в формате DRF
+    """
+    sync_view = viewset.as_view(actions)
+    run_sync_view = sync_to_async(sync_view)
+
+    # Атрибуты представления DRF (cls, actions) копируются, чтобы по
+    # маршруту можно было узнать обрабатываемые методы
+    @wraps(sync_view)
+    async def view(request, *args, **kwargs):
+        if request.method == 'GET':
+            user = await aauthenticate(request)
+            if user is not None:
+                drf_view = make_view(
+                    viewset, request, user, actions['get'], **kwargs,
+                )
+                if check_request(drf_view):
+                    return await async_view(drf_view)
+        return await run_sync_view(request, *args, **kwargs)
+
+    view.csrf_exempt = True
+    return view
+
+
+def make_view(viewset, request, user, action, **kwargs):
+    """
+    Экземпляр вьюсета для использования его запросов, фильтров,
+    пагинации и сериализаторов в асинхронном представлении
+    """
+    drf_request = Request(request)
+    drf_request.user = user
+    view = viewset(
+        request=drf_request,
+        action=action,
+        args=(),
+        kwargs=kwargs,
+        format_kwarg=None,
+    )
+    view.headers = {}
+    return view
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        TimedJSONRenderer().render(data),
+        content_type=TimedJSONRenderer.media_type,
+        status=status,
+    )
+
+
+def exception_response(exc):
+    """
+    Ответ на исключение DRF в том же формате, что и у exception_handler
+    """
+    if isinstance(exc.detail, (list, dict)):
+        return json_response(exc.detail, exc.status_code)
+    return json_response({'detail': exc.detail}, exc.status_code)
+
+
+async def aiterate(iterator, chunk_size):
+    """
+    Асинхронный итератор по синхронному итератору, который обращается
+    к БД: элементы читаются порциями по chunk_size в sync_to_async,
+    в том же потоке запроса, что и синхронное представление
+    """
+    next_chunk = sync_to_async(lambda: list(islice(iterator, chunk_size)))
+    try:
+        while chunk := await next_chunk():
+            for item in chunk:
+                yield item
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def streaming_response(request, content, chunk_size, **kwargs):
+    """
+    Потоковый ответ из синхронного итератора content. Под ASGI Django
+    целиком читает синхронный итератор потокового ответа в память,
+    поэтому там ответ отдается асинхронным итератором aiterate
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        content = aiterate(content, chunk_size)
+    return StreamingHttpResponse(content, **kwargs)
@@ -36,6 +36,12 @@ class CustomUser(AbstractUser):
         blank=True,
         upload_to='avatars/',
     )
+    avatar_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии аватара',
+    )
     username = models.CharField(
         verbose_name='Имя пользователя',
         null=False,
@@ -44,6 +50,17 @@ class CustomUser(AbstractUser):
         unique=True,
     )
 
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Число подписчиков',
+        default=0,
+        editable=False,
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Число рецептов',
+        default=0,
+        editable=False,
+    )
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
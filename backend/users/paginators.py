@@ -1,8 +1,357 @@
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import (
+    PageNotAnInteger,
+    InvalidPage,
+    EmptyPage,
+    Paginator,
+)
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from users.constants import USERS_MAX_PAGE_SIZE
 
 
+COUNT_CACHE_PREFIX = 'pagination-count'
+
+
+def estimate_count(queryset):
+    """
+    Функция приблизительного подсчета числа объектов для запросов
+    без фильтрации. Возвращает пару (число объектов, признак оценки).
+    В PostgreSQL используется оценка reltuples из статистики таблицы,
+    в остальных БД - закешированный на короткое время точный подсчет.
+    Только что выполненный подсчет точен и возвращается при любом
+    числе объектов, чтобы пагинатор не считал объекты повторно.
+    Если оценка меньше порога PAGINATION_ESTIMATED_COUNT_THRESHOLD
+    или запрос содержит фильтры, возвращается None и используется
+    точный подсчет
+    """
+    query = queryset.query
+    if (
+        query.has_filters() or query.distinct or query.combinator
+        or query.is_sliced
+    ):
+        return None
+    table = queryset.model._meta.db_table
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [connection.ops.quote_name(table)],
+            )
+            row = cursor.fetchone()
+        estimate = row[0] if row else None
+    else:
+        key = f'{COUNT_CACHE_PREFIX}:{queryset.db}:{table}'
+        estimate = cache.get(key)
+        if estimate is None:
+            count = queryset.count()
+            cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+            return count, False
+    if estimate is None or (
+        estimate < settings.PAGINATION_ESTIMATED_COUNT_THRESHOLD
+    ):
+        return None
+    return estimate, True
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор, который для больших таблиц без фильтрации берет число
+    объектов из оценки вместо COUNT(*). Так как оценка может быть меньше
+    реального числа объектов, номер страницы сверху не ограничивается
+    """
+    estimated = False
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None:
+            return self.object_list.count()
+        count, self.estimated = estimate
+        return count
+
+    def validate_number(self, number):
+        self.count
+        if not self.estimated:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы должен быть числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.estimated:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self,
+        )
+
+    async def acount(self):
+        """
+        Асинхронный подсчет числа объектов. Результат сохраняется в count,
+        поэтому при построении страницы он повторно не считается
+        """
+        estimate = await sync_to_async(estimate_count)(self.object_list)
+        if estimate is None:
+            count = await self.object_list.acount()
+        else:
+            count, self.estimated = estimate
+        self.__dict__['count'] = count
+        return count
+
+
 class PageLimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     max_page_size = USERS_MAX_PAGE_SIZE
+
+
+class EstimatedCountPagination(PageLimitPagination):
+    """
+    Пагинация по страницам, в которой для больших таблиц без фильтрации
+    поле count берется из оценки, а не из COUNT(*)
+    """
+    django_paginator_class = EstimatedCountPaginator
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Асинхронный вариант paginate_queryset: число объектов и объекты
+        страницы читаются без блокировки цикла событий
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        await paginator.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc),
+            ))
+        self.page.object_list = [
+            obj async for obj in self.page.object_list
+        ]
+        return list(self.page)
+
+
+class PageLimitKeysetPagination(EstimatedCountPagination):
+    """
+    Пагинация по страницам с дополнительным режимом keyset-пагинации.
+    Режим включается параметром ?cursor= (пустое значение - первая
+    страница). В этом режиме объекты выбираются условием по полям
+    сортировки запроса (или ordering, если сортировка не задана явно;
+    последнее поле должно быть уникальным) вместо OFFSET, а общее
+    число объектов не считается, поэтому время получения страницы
+    не зависит от ее номера.
+    Без параметра cursor работает как EstimatedCountPagination.
+    Действия представления из keyset_actions всегда работают в режиме
+    keyset. Курсор хранит номер страницы (page_index), отсчитываемый
+    от первой страницы
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор'
+    ordering = ('-pub_date', '-id')
+
+    def use_keyset(self, request, view=None):
+        return self.cursor_query_param in request.query_params or (
+            getattr(view, 'action', None)
+            in getattr(view, 'keyset_actions', ())
+        )
+
+    def get_page_index(self, request):
+        """
+        Номер страницы, на которую указывает курсор запроса
+        """
+        cursor = request.query_params.get(self.cursor_query_param, '')
+        return self.decode_cursor(cursor, check_length=False)[2]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.use_keyset(request, view)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        queryset = self.get_keyset_queryset(queryset, request)
+        return self.get_keyset_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.use_keyset(request, view)
+        if not self.keyset:
+            return await super().apaginate_queryset(queryset, request, view)
+        queryset = self.get_keyset_queryset(queryset, request)
+        return self.get_keyset_page([obj async for obj in queryset])
+
+    def get_keyset_queryset(self, queryset, request):
+        """
+        Запрос объектов страницы: условие по курсору, сортировка
+        и ограничение числа объектов (на один больше размера страницы,
+        чтобы узнать, есть ли следующая)
+        """
+        self.request = request
+        self.limit = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        position, self.reverse, self.page_index = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param, '')
+        )
+        if position is not None:
+            position = self.to_python(queryset, position)
+        self.position = position
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(self.invert(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+        return queryset[:self.limit + 1]
+
+    def get_keyset_page(self, page):
+        has_more = len(page) > self.limit
+        page = page[:self.limit]
+        if self.reverse:
+            page.reverse()
+        started = self.position is not None
+        self.has_next = started if self.reverse else has_more
+        self.has_previous = has_more if self.reverse else started
+        self.page = page
+        return page
+
+    def get_ordering(self, queryset):
+        ordering = queryset.query.order_by
+        if ordering and all(isinstance(field, str) for field in ordering):
+            return tuple(ordering)
+        return type(self).ordering
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.cursor_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.cursor_link(self.page[0], reverse=True)
+
+    def cursor_link(self, obj, reverse):
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param,
+        )
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(obj, reverse),
+        )
+
+    def encode_cursor(self, obj, reverse):
+        position = [
+            getattr(obj, field.lstrip('-')) for field in self.ordering
+        ]
+        index = self.page_index - 1 if reverse else self.page_index + 1
+        data = json.dumps(
+            {'p': position, 'r': int(reverse), 'n': index},
+            default=self.encode_value,
+        )
+        return b64encode(data.encode()).decode()
+
+    @staticmethod
+    def encode_value(value):
+        """
+        Даты кодируются с микросекундами, чтобы сравнение на равенство
+        в условии курсора было точным
+        """
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return str(value)
+
+    def decode_cursor(self, cursor, check_length=True):
+        if not cursor:
+            return None, False, 1
+        try:
+            data = json.loads(b64decode(cursor.encode(), validate=True))
+            position = data['p']
+            reverse = bool(data['r'])
+            index = int(data.get('n', 0))
+        except (BinasciiError, ValueError, TypeError, KeyError,
+                AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or (
+            check_length and len(position) != len(self.ordering)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse, index
+
+    def to_python(self, queryset, position):
+        """
+        Преобразование значений курсора к типам полей сортировки.
+        Сортировка может идти и по аннотациям запроса (например,
+        по релевантности поиска)
+        """
+        annotations = queryset.query.annotations
+        try:
+            return [
+                self.get_output_field(queryset.model, annotations, field)
+                .to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (ValidationError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def get_output_field(model, annotations, field):
+        name = field.lstrip('-')
+        if name in annotations:
+            return annotations[name].output_field
+        return model._meta.get_field(name)
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def after(ordering, position):
+        """
+        Условие "следует за позицией" для лексикографической сортировки:
+        (a > x) OR (a = x AND b > y) OR ... Первое поле дополнительно
+        ограничено нестрогим условием, чтобы БД могла использовать
+        диапазонное сканирование индекса
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        first = ordering[0]
+        bound = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{bound}': position[0]}) & condition
@@ -2,8 +2,9 @@ from rest_framework import serializers
 from rest_framework.serializers import ImageField
 from djoser.serializers import UserCreateSerializer, SetPasswordSerializer
 from django.contrib.auth.validators import UnicodeUsernameValidator
-from drf_extra_fields.fields import Base64ImageField
 
+from images.fields import Base64ImageStreamField, RenditionsField
+from monitoring.serializers import TimedSerializerMixin
 from .constants import (
     USER_FIRST_NAME_MAX_LENGTH,
     USER_LAST_NAME_MAX_LENGTH,
@@ -14,11 +15,12 @@ from .models import (
 )
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Сериализатор для отображения профиля пользователя.
     """
     avatar = serializers.ImageField(use_url=True)
+    avatar_srcset = RenditionsField('avatar', 'avatar_renditions')
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -31,10 +33,13 @@ class UserSerializer(serializers.ModelSerializer):
             'last_name',
             'is_subscribed',
             'avatar',
+            'avatar_srcset',
         ]
         read_only_fields = ('id', 'is_subscribed', 'avatar')
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
@@ -93,7 +98,7 @@ class AvatarBaseSerializer(serializers.ModelSerializer):
     """
     Сериализатор для добавления и удаления аватара пользователя.
     """
-    avatar = Base64ImageField()
+    avatar = Base64ImageStreamField()
 
     class Meta:
         model = CustomUser
@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from users.paginators import COUNT_CACHE_PREFIX, EstimatedCountPaginator
+
+User = get_user_model()
+
+
+@override_settings(PAGINATION_ESTIMATED_COUNT_THRESHOLD=3)
+class EstimatedCountPaginatorTests(TestCase):
+    """
+    Число объектов считается не больше одного раза
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username=f'user{number}', email=f'user{number}@example.com')
+            for number in range(2)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def count(self):
+        paginator = EstimatedCountPaginator(User.objects.order_by('id'), 1)
+        with CaptureQueriesContext(connection) as context:
+            count = paginator.count
+        return count, paginator.estimated, len(context.captured_queries)
+
+    def test_small_table_counted_once(self):
+        self.assertEqual(self.count(), (2, False, 1))
+
+    def test_cached_small_count_recounted(self):
+        self.count()
+        self.assertEqual(self.count(), (2, False, 1))
+
+    def test_cached_large_count(self):
+        cache.set(
+            f'{COUNT_CACHE_PREFIX}:default:{User._meta.db_table}', 5,
+        )
+        self.assertEqual(self.count(), (5, True, 0))
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from follows.models import Follow
+from monitoring.testing import query_budget
+from recipes.tests.factories import auth_client, create_user
+
+User = get_user_model()
+
+USERS_COUNT = 100
+
+
+class UserListQueriesTests(TestCase):
+    """
+    Число запросов списка пользователей не зависит от размера страницы
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.users = User.objects.bulk_create(
+            User(username=f'user{number}', email=f'user{number}@example.com')
+            for number in range(USERS_COUNT)
+        )
+        Follow.objects.create(user=cls.reader, following=cls.users[0])
+
+    def count_queries(self, client, limit):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f'/api/users/?limit={limit}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), limit)
+        return len(context.captured_queries), response.data['results']
+
+    def test_queries_do_not_depend_on_limit(self):
+        for title, client in (
+            ('anonymous', APIClient()),
+            ('authenticated', auth_client(self.reader)),
+        ):
+            with self.subTest(client=title):
+                counts = [
+                    self.count_queries(client, limit)[0]
+                    for limit in (1, 10, 100)
+                ]
+                self.assertEqual(len(set(counts)), 1, counts)
+
+    def test_is_subscribed(self):
+        _, results = self.count_queries(auth_client(self.reader), 100)
+        subscribed = {
+            user['id'] for user in results if user['is_subscribed']
+        }
+        self.assertEqual(subscribed, {self.users[0].pk})
+
+    def test_query_budget(self):
+        client = auth_client(self.reader)
+        with query_budget(repeats=1):
+            client.get('/api/users/?limit=100')
+        with query_budget(repeats=1):
+            client.get(f'/api/users/{self.users[0].pk}/')
@@ -0,0 +1,72 @@
+from django.test import TransactionTestCase
+
+from recipes.tests.factories import (
+    ConcurrencyMixin,
+    auth_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+class ConcurrentToggleTests(ConcurrencyMixin, TransactionTestCase):
+    """
+    Одновременные повторные запросы на добавление и удаление избранного,
+    списка покупок и подписки: один запрос выполняется, второй получает
+    400, счетчики меняются ровно на единицу
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('reader')
+        self.author = create_user('author')
+        self.recipe = create_recipe(self.author, create_ingredients(3))
+
+    def assert_toggles(self, path, read_counter):
+        """
+        Два одновременных POST, затем два одновременных DELETE
+        """
+        client = auth_client(self.user)
+        initial = read_counter()
+        for method, success, change in (
+            (client.post, 201, 1),
+            (client.delete, 204, 0),
+        ):
+            with self.subTest(method=method.__name__):
+                responses = self.run_concurrently(
+                    lambda: method(path),
+                    lambda: method(path),
+                )
+                self.assertEqual(
+                    sorted(response.status_code for response in responses),
+                    [success, 400],
+                )
+                self.assertEqual(read_counter(), initial + change)
+
+    def test_favorite(self):
+        def favorites_count():
+            self.recipe.refresh_from_db(fields=['favorites_count'])
+            return self.recipe.favorites_count
+
+        self.assert_toggles(
+            f'/api/recipes/{self.recipe.pk}/favorite/', favorites_count,
+        )
+
+    def test_shopping_cart(self):
+        def shopping_cart_count():
+            self.recipe.refresh_from_db(fields=['shopping_cart_count'])
+            return self.recipe.shopping_cart_count
+
+        self.assert_toggles(
+            f'/api/recipes/{self.recipe.pk}/shopping_cart/',
+            shopping_cart_count,
+        )
+
+    def test_subscription(self):
+        def followers_count():
+            self.author.refresh_from_db(fields=['followers_count'])
+            return self.author.followers_count
+
+        self.assert_toggles(
+            f'/api/users/{self.author.pk}/subscribe/', followers_count,
+        )
@@ -0,0 +1,108 @@
+from enum import Enum
+
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.dispatch import Signal
+
+
+# Отправляются после успешного добавления и удаления связи.
+# sender - модель связи, аргументы: user_id, target_id
+relation_added = Signal()
+relation_removed = Signal()
+
+
+class Toggle(Enum):
+    ADDED = 'added'
+    REMOVED = 'removed'
+    EXISTS = 'exists'
+    ABSENT = 'absent'
+    NOT_FOUND = 'not_found'
+
+
+def _relation_sql(model, target_field):
+    """
+    Имена таблиц и колонок связи пользователя с объектом
+    (избранное, список покупок, подписка)
+    """
+    quote = connection.ops.quote_name
+    opts = model._meta
+    target = opts.get_field(target_field)
+    target_opts = target.related_model._meta
+    return {
+        'table': quote(opts.db_table),
+        'pk': quote(opts.pk.column),
+        'user': quote(opts.get_field('user').column),
+        'target': quote(target.column),
+        'target_table': quote(target_opts.db_table),
+        'target_pk': quote(target_opts.pk.column),
+    }
+
+
+def _target_exists(model, target_field, target_id):
+    target_model = model._meta.get_field(target_field).related_model
+    return target_model.objects.filter(pk=target_id).exists()
+
+
+def add_relation(model, target_field, user_id, target_id):
+    """
+    Добавление связи одним запросом
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING.
+    Вставка выполняется, только если объект существует, а уникальное
+    ограничение модели исключает гонку при одновременных запросах.
+    Дополнительный запрос выполняется только при неудаче, чтобы отличить
+    существующую связь от отсутствующего объекта
+    """
+    sql = _relation_sql(model, target_field)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {sql["table"]} ({sql["user"]}, {sql["target"]}) '
+                f'SELECT %s, {sql["target_pk"]} FROM {sql["target_table"]} '
+                f'WHERE {sql["target_pk"]} = %s '
+                f'ON CONFLICT DO NOTHING RETURNING {sql["pk"]}',
+                [user_id, target_id],
+            )
+            inserted = cursor.fetchone()
+        if inserted is None:
+            if _target_exists(model, target_field, target_id):
+                return Toggle.EXISTS
+            return Toggle.NOT_FOUND
+        relation_added.send(
+            sender=model, user_id=user_id, target_id=target_id,
+        )
+    return Toggle.ADDED
+
+
+def remove_relation(model, target_field, user_id, target_id):
+    """
+    Удаление связи одним запросом DELETE ... RETURNING
+    """
+    sql = _relation_sql(model, target_field)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {sql["table"]} '
+                f'WHERE {sql["user"]} = %s AND {sql["target"]} = %s '
+                f'RETURNING {sql["pk"]}',
+                [user_id, target_id],
+            )
+            deleted = cursor.fetchone()
+        if deleted is None:
+            if _target_exists(model, target_field, target_id):
+                return Toggle.ABSENT
+            return Toggle.NOT_FOUND
+        relation_removed.send(
+            sender=model, user_id=user_id, target_id=target_id,
+        )
+    return Toggle.REMOVED
+
+
+def change_counter(model, pk, field, delta):
+    """
+    Атомарное изменение денормализованного счетчика одним UPDATE.
+    Значение не опускается ниже нуля
+    """
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
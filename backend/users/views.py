@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Value
 from rest_framework import viewsets, status, mixins
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -10,12 +12,35 @@ from .serializers import (
     AvatarBaseSerializer,
     CustomSetPasswordSerializer
 )
-from .paginators import PageLimitPagination
+from .paginators import EstimatedCountPagination
+from follows.models import Follow
 
 User = get_user_model()
 
 
-class UserListCreateViewSet(viewsets.GenericViewSet,
+class SubscriptionFlagMixin:
+    """
+    Флаг is_subscribed вычисляется подзапросом EXISTS в основном запросе,
+    а не отдельным запросом для каждого пользователя
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(is_subscribed=Value(False))
+        return queryset.annotate(
+            is_subscribed=Exists(
+                Follow.objects.filter(
+                    user=user,
+                    following=OuterRef('pk'),
+                )
+            ),
+        )
+
+
+class UserListCreateViewSet(SubscriptionFlagMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """
@@ -25,7 +50,7 @@ class UserListCreateViewSet(viewsets.GenericViewSet,
     """
     queryset = User.objects.all()
     permission_classes = [AllowAny]
-    pagination_class = PageLimitPagination
+    pagination_class = EstimatedCountPagination
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -33,7 +58,8 @@ class UserListCreateViewSet(viewsets.GenericViewSet,
         return UserSerializer
 
 
-class UserDetailViewSet(viewsets.GenericViewSet,
+class UserDetailViewSet(SubscriptionFlagMixin,
+                        viewsets.GenericViewSet,
                         mixins.RetrieveModelMixin):
     """
     Вьюсет, который обеспечивает реализацию следующей функции:
@@ -62,14 +88,18 @@ class AvatarViewSet(viewsets.GenericViewSet):
             }
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        # Ссылка на сохраненный аватар отменяется, если пользователя
+        # не удалось сохранить
+        with transaction.atomic():
+            serializer.save()
         return Response({
             'avatar': serializer.data['avatar'],
         })
 
     @action(detail=False, methods=['DELETE'])
     def delete_avatar(self, request):
-        request.user.avatar.delete(save=True)
+        request.user.avatar = None
+        request.user.save(update_fields=['avatar'])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
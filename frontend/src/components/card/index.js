@@ -10,6 +10,7 @@ const Card = ({
   name = "Без названия",
   id,
   image,
+  image_srcset,
   is_favorited,
   is_in_shopping_cart,
   cooking_time,
@@ -44,7 +45,9 @@ const Card = ({
         title={
           <div
             className={styles.card__image}
-            style={{ backgroundImage: `url(${image})` }}
+            style={{
+              backgroundImage: `url(${image_srcset?.card?.webp || image})`,
+            }}
           />
         }
       />
@@ -65,7 +68,11 @@ const Card = ({
           <div
             className={styles["card__author-image"]}
             style={{
-              "background-image": `url(${author.avatar || DefaultImage})`,
+              "background-image": `url(${
+                author.avatar_srcset?.thumbnail?.webp ||
+                author.avatar ||
+                DefaultImage
+              })`,
             }}
           />
           <div className={styles.card__author}>
@@ -26,6 +26,7 @@ const Subscription = ({
   id,
   recipes,
   avatar,
+  avatar_srcset,
 }) => {
   const shouldShowButton = recipes_count > 3;
   const moreRecipes = recipes_count - 3;
@@ -54,7 +55,7 @@ const Subscription = ({
           <div
             className={styles.subscriptionAvatar}
             style={{
-              "background-image": `url(${avatar || DefaultImage})`,
+              "background-image": `url(${avatar_srcset?.thumbnail?.webp || avatar || DefaultImage})`,
             }}
           />
           <LinkComponent
@@ -75,7 +76,7 @@ const Subscription = ({
                   title={
                     <div className={styles.subscriptionRecipe}>
                       <img
-                        src={recipe.image}
+                        src={recipe.image_srcset?.thumbnail?.webp || recipe.image}
                         alt={recipe.name}
                         className={styles.subscriptionRecipeImage}
                       />
@@ -0,0 +1,155 @@
+"""
+Нагрузочный тест API без сторонних зависимостей.
+
+Для каждого уровня конкурентности открывает заданное число соединений,
+каждое из которых в течение duration секунд последовательно выполняет
+GET-запросы к url, и выводит число запросов в секунду, перцентили
+времени ответа и число ошибок (статус не 2xx/3xx или таймаут).
+
+Пример сравнения синхронных и асинхронных обработчиков:
+    gunicorn --bind 0.0.0.0:8000 backend.wsgi
+    python loadtest.py http://localhost:8000/api/recipes/ -c 1 10 100 500
+    gunicorn --bind 0.0.0.0:8000 \\
+        --worker-class uvicorn_worker.UvicornWorker backend.asgi
+    python loadtest.py http://localhost:8000/api/recipes/ -c 1 10 100 500
+"""
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+
+class Target:
+    def __init__(self, url, headers):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        path = parts.path or '/'
+        if parts.query:
+            path = f'{path}?{parts.query}'
+        lines = [f'GET {path} HTTP/1.1', f'Host: {parts.netloc}']
+        lines.extend(headers)
+        self.request = ('\r\n'.join(lines) + '\r\n\r\n').encode()
+
+
+async def read_response(reader):
+    """
+    Чтение ответа, возвращает статус и признак закрытия соединения
+    """
+    status_line = await reader.readuntil(b'\r\n')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readuntil(b'\r\n')
+        if line == b'\r\n':
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        return status, True
+    return status, headers.get('connection') == 'close'
+
+
+async def client(target, deadline, timeout, latencies, errors):
+    reader = writer = None
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(target.host, target.port),
+                    timeout,
+                )
+            writer.write(target.request)
+            status, closed = await asyncio.wait_for(
+                read_response(reader), timeout,
+            )
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                ValueError, IndexError):
+            errors.append(time.monotonic() - started)
+            closed = True
+        else:
+            if 200 <= status < 400:
+                latencies.append(time.monotonic() - started)
+            else:
+                errors.append(time.monotonic() - started)
+        if closed and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(target, connections, duration, timeout):
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    await asyncio.gather(*(
+        client(target, deadline, timeout, latencies, errors)
+        for _ in range(connections)
+    ))
+    elapsed = time.monotonic() - started
+    return {
+        'connections': connections,
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(latencies, 0.5) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('url')
+    parser.add_argument(
+        '-c', '--connections', type=int, nargs='+', default=[1, 10, 100],
+        help='Уровни числа одновременных соединений',
+    )
+    parser.add_argument(
+        '-d', '--duration', type=float, default=10,
+        help='Длительность каждого уровня в секундах',
+    )
+    parser.add_argument(
+        '-t', '--timeout', type=float, default=10,
+        help='Таймаут запроса в секундах',
+    )
+    parser.add_argument(
+        '-H', '--header', action='append', default=[],
+        help='Дополнительный заголовок, например "Authorization: Token ..."',
+    )
+    options = parser.parse_args()
+    target = Target(options.url, options.header)
+    print(
+        f'{"conn":>6} {"requests":>9} {"rps":>8} '
+        f'{"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7}'
+    )
+    for connections in options.connections:
+        result = asyncio.run(
+            run(target, connections, options.duration, options.timeout)
+        )
+        print(
+            '{connections:>6} {requests:>9} {rps:>8.1f} {p50:>8.1f} '
+            '{p95:>8.1f} {p99:>8.1f} {errors:>7}'.format(**result)
+        )
+
+
+if __name__ == '__main__':
+    main()